@@ -1,39 +1,244 @@
 """
 CLI entrypoints:
 - replay: replay a market log into the backtest engine
-- report: generate quantstats report (optional)
+- live: ingest a live feed (TCP ndjson, e.g. simulator.local_exchange) into the backtest engine
+- report: generate quantstats report (optional) from a replay out_dir
+- walkforward: rolling train/test parameter optimization over cached bars
+- runs: query the run registry (list / top-N by metric / show)
+- daemon: keep market logs hot in a long-running replay server (start) and send it jobs (submit)
+
+Each subcommand imports what it needs when it runs, so starting the CLI (and a plain replay)
+never pays for quantstats/matplotlib.
 """
-import argparse, yaml, os
+import argparse, os
 from framework.logger import setup_logger
-from backtest.engine import BacktestEngine
-from framework.replay import ReplayEngine
-from backtest.quantstats_report import generate_report
 
 logger = setup_logger('cli')
 
 def load_config(path):
+    import yaml
     with open(path,'r') as f:
         return yaml.safe_load(f)
 
-def main():
+def cmd_replay(args, cfg):
+    from backtest.engine import BacktestEngine
+    from framework.replay import ReplayEngine
+    from framework.instrumentation import Instrumentation, run_profiled
+    from framework.ndjson import compression_of
+    from framework.run_registry import open_registry, config_hash, input_key
+    name = os.path.basename(args.market_log)
+    if compression_of(name):
+        name = os.path.splitext(name)[0]
+    out_dir = args.out_dir or os.path.join(cfg['storage']['base_path'],'replay_'+name.replace('.ndjson',''))
+    registry = open_registry(cfg)
+    key = market_fp = None
+    if registry is not None:
+        market_fp = registry.fingerprint(args.market_log)
+        # storage is outside config_hash, but compression decides the artifact file names
+        key = input_key('replay', config_hash(cfg), cfg.get('seed'), market_fp, args.start,
+                        cfg['storage'].get('compression') or 'none')
+        # serving from cache is opt-in; instrumented/profiled runs are measurements, never served
+        cached = registry.find(key) if (args.cached and not (args.instrument or args.profile)) else None
+        if cached is not None:
+            _serve_cached(cached, out_dir)
+            registry.close()
+            return
+    os.makedirs(out_dir, exist_ok=True)
+    logger.info('Starting replay: market_log=%s out_dir=%s', args.market_log, out_dir)
+    instr = Instrumentation(enabled=args.instrument or args.profile or cfg.get('instrumentation',{}).get('enabled', False))
+    be = BacktestEngine(cfg, instrumentation=instr)
+    if cfg['backtest'].get('mode', 'tick') == 'bar':
+        # bar mode: bars come from the on-disk cache (built from the log once), ticks are never replayed
+        from framework.bar_cache import load_bars
+        run, source = be.run_bars, load_bars(cfg, args.market_log, registry=registry, workers=args.workers)
+    else:
+        run, source = be.run_replay, ReplayEngine(args.market_log, seed=cfg.get('seed',0), instrumentation=instr,
+                                                  workers=args.workers, start_ts=args.start)
+    if args.profile:
+        run_profiled(run, out_dir, source, out_dir)
+    else:
+        run(source, out_dir)
+    if registry is not None:
+        artifacts = {'market_log': be.market_log_path, 'order_log': be.order_log_path, 'fill_log': be.fill_log_path,
+                     'metadata': os.path.join(out_dir, 'replay_metadata.json')}
+        if be.metrics is not None:
+            artifacts['metrics'] = os.path.join(out_dir, 'metrics.json')
+            artifacts['equity_curve'] = be.equity_log_path
+        run_id = registry.register('replay', key, out_dir=out_dir, cfg=cfg, seed=cfg.get('seed'), market_fp=market_fp,
+                                   metrics=be.metrics.summary() if be.metrics is not None else None,
+                                   artifacts=artifacts, params={'market_log': args.market_log, 'start': args.start})
+        registry.close()
+        logger.info('Registered run %s', run_id)
+    logger.info('Replay completed, outputs in %s', out_dir)
+
+def _serve_cached(run, out_dir):
+    import shutil
+    if os.path.abspath(run['out_dir']) != os.path.abspath(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        for path in run['artifacts'].values():
+            shutil.copy2(path, os.path.join(out_dir, os.path.basename(path)))
+    logger.info('Identical inputs already replayed as run %s (%s); served from cache into %s (drop --cached to rerun)',
+                run['run_id'], run['out_dir'], out_dir)
+
+def cmd_live(args, cfg):
+    import asyncio
+    from backtest.engine import BacktestEngine
+    from live.feeds import TCPFeedAdapter
+    from live.pipeline import IngestionPipeline
+    lcfg = cfg.get('live', {})
+    out_dir = args.out_dir or os.path.join(cfg['storage']['base_path'], 'live')
+    be = BacktestEngine(cfg)
+    be._make_writers(out_dir)
+    feed = TCPFeedAdapter(args.host or lcfg.get('host','127.0.0.1'), args.port or lcfg.get('port',9100))
+    pipeline = IngestionPipeline([feed], be.on_event,
+                                 tick_queue_size=lcfg.get('tick_queue_size',10000),
+                                 l2_queue_size=lcfg.get('l2_queue_size',1000),
+                                 l2_policy=lcfg.get('l2_policy','conflate'),
+                                 batch_size=lcfg.get('batch_size',512))
+    logger.info('Starting live ingestion: out_dir=%s', out_dir)
+    try:
+        asyncio.run(pipeline.run(duration=args.duration))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        be.finish(out_dir)
+    logger.info('Live ingestion stopped, outputs in %s', out_dir)
+
+def cmd_report(args, cfg):
+    # the only command that loads quantstats/matplotlib/pandas for reporting
+    from backtest.quantstats_report import equity_series, generate_report
+    out_html = args.out_html or os.path.join(args.replay_dir, 'quantstats.html')
+    equity = equity_series(args.replay_dir, initial_cash=cfg['backtest'].get('initial_cash', 100000.0),
+                           sample_interval=cfg.get('metrics', {}).get('sample_interval', '1min'))
+    if equity.empty:
+        logger.warning('No equity samples in %s, nothing to report', args.replay_dir)
+        return
+    generate_report(equity, out_html)
+    logger.info('Report written to %s', out_html)
+
+def cmd_walkforward(args, cfg):
+    import json
+    from backtest.walkforward import walk_forward
+    from framework.run_registry import open_registry, config_hash, input_key
+    out_dir = args.out_dir or os.path.join(cfg['storage']['base_path'], 'walkforward')
+    registry = open_registry(cfg)
+    result = walk_forward(cfg, args.market_log, out_dir=out_dir, workers=args.workers, n_trials=args.trials, registry=registry)
+    if registry is not None:
+        wcfg = dict(cfg.get('walkforward', {}), n_trials=args.trials or cfg.get('walkforward', {}).get('n_trials'))
+        market_fp = registry.fingerprint(args.market_log)
+        key = input_key('walkforward', config_hash(cfg), cfg.get('seed'), market_fp, json.dumps(wcfg, sort_keys=True, default=str))
+        registry.register('walkforward', key, out_dir=out_dir, cfg=cfg, seed=cfg.get('seed'), market_fp=market_fp,
+                          metrics=result['summary'], artifacts={'walkforward': os.path.join(out_dir, 'walkforward.json')},
+                          params={'market_log': args.market_log})
+        registry.close()
+    logger.info('Walk-forward done: %s', json.dumps(result['summary']))
+
+def cmd_daemon(args, cfg):
+    import json
+    from backtest import daemon
+    dcfg = cfg.get('daemon', {})
+    host, port = args.host or dcfg.get('host','127.0.0.1'), args.port or dcfg.get('port',9200)
+    if args.action == 'start':
+        logs = args.market_log or dcfg.get('market_logs') or []
+        if not logs:
+            raise SystemExit('daemon start: no --market_log given and daemon.market_logs is empty')
+        daemon.ReplayDaemon(cfg, logs, host=host, port=port,
+                            workers=args.workers or dcfg.get('workers'),
+                            modes=tuple(dcfg.get('modes', ['tick','bar']))).start().serve_forever()
+        return
+    if args.action == 'status':
+        print(json.dumps(daemon.submit('/status', host=host, port=port), indent=2))
+        return
+    if args.action == 'shutdown':
+        daemon.submit('/shutdown', {}, host=host, port=port)
+        return
+    job = {'market_log': (args.market_log or [None])[0], 'mode': args.mode,
+           'params': json.loads(args.params) if args.params else {}, 'out_dir': args.out_dir}
+    if args.trials:
+        with open(args.trials) as f:
+            job['trials'] = json.load(f)
+        result = daemon.submit('/sweep', job, host=host, port=port)
+    else:
+        result = daemon.submit('/replay', job, host=host, port=port)
+    print(json.dumps(result, indent=2, default=str))
+
+def cmd_runs(args, cfg):
+    import json
+    from framework.run_registry import open_registry
+    registry = open_registry(cfg)
+    if registry is None:
+        raise SystemExit('runs: storage.registry is null in the config, there is no run registry to query')
+    with registry:
+        if args.action == 'top':
+            rows = registry.top(args.metric, n=args.limit, kind=args.kind, ascending=args.ascending)
+        elif args.action == 'show':
+            rows = [registry.get(args.run_id)]
+        else:
+            rows = registry.list_runs(kind=args.kind, limit=args.limit)
+    for row in rows:
+        print(json.dumps(row, default=str))
+
+COMMANDS = {'replay': cmd_replay, 'live': cmd_live, 'report': cmd_report,
+            'walkforward': cmd_walkforward, 'runs': cmd_runs, 'daemon': cmd_daemon}
+
+def build_parser():
     p = argparse.ArgumentParser()
     sub = p.add_subparsers(dest='cmd')
     r = sub.add_parser('replay')
     r.add_argument('--config', default='configs/config.yaml')
     r.add_argument('--market_log', required=True)
     r.add_argument('--out_dir', default=None)
-    args = p.parse_args()
-    cfg = load_config(args.config)
-    if args.cmd == 'replay':
-        out_dir = args.out_dir or os.path.join(cfg['storage']['base_path'],'replay_'+os.path.basename(args.market_log).replace('.ndjson',''))
-        os.makedirs(out_dir, exist_ok=True)
-        logger.info('Starting replay: market_log=%s out_dir=%s', args.market_log, out_dir)
-        re = ReplayEngine(args.market_log, seed=cfg.get('seed',0))
-        be = BacktestEngine(cfg)
-        be.run_replay(re, out_dir)
-        logger.info('Replay completed, outputs in %s', out_dir)
-    else:
+    r.add_argument('--instrument', action='store_true', help='record per-stage latency histograms to instrumentation.json')
+    r.add_argument('--profile', action='store_true', help='also run under cProfile (profile.pstats, profile.folded)')
+    r.add_argument('--workers', type=int, default=None, help='decompression threads for block-framed (.bgz) market logs')
+    r.add_argument('--cached', action='store_true',
+                   help='serve from the registry if a run with identical inputs (config, seed, log, code) exists')
+    r.add_argument('--start', default=None, help='skip events before this ISO timestamp (seeks in indexed .bgz logs)')
+    l = sub.add_parser('live')
+    l.add_argument('--config', default='configs/config.yaml')
+    l.add_argument('--host', default=None)
+    l.add_argument('--port', type=int, default=None)
+    l.add_argument('--duration', type=float, default=None)
+    l.add_argument('--out_dir', default=None)
+    rp = sub.add_parser('report')
+    rp.add_argument('--config', default='configs/config.yaml')
+    rp.add_argument('--replay_dir', required=True)
+    rp.add_argument('--out_html', default=None)
+    wf = sub.add_parser('walkforward')
+    wf.add_argument('--config', default='configs/config.yaml')
+    wf.add_argument('--market_log', required=True)
+    wf.add_argument('--out_dir', default=None)
+    wf.add_argument('--workers', type=int, default=None, help='fold processes (default walkforward.workers)')
+    wf.add_argument('--trials', type=int, default=None, help='trials per train window (default walkforward.n_trials)')
+    rn = sub.add_parser('runs')
+    rn.add_argument('action', choices=['list', 'top', 'show'])
+    rn.add_argument('run_id', nargs='?')
+    rn.add_argument('--config', default='configs/config.yaml')
+    rn.add_argument('--kind', default=None, help='replay | simulate | compare | walkforward')
+    rn.add_argument('--metric', default='sharpe')
+    rn.add_argument('--limit', type=int, default=20)
+    rn.add_argument('--ascending', action='store_true', help='rank lowest first (e.g. turnover)')
+    dm = sub.add_parser('daemon')
+    dm.add_argument('action', choices=['start', 'submit', 'status', 'shutdown'])
+    dm.add_argument('--config', default='configs/config.yaml')
+    dm.add_argument('--market_log', action='append', help='start: log to keep loaded (repeatable); submit: log to replay')
+    dm.add_argument('--host', default=None)
+    dm.add_argument('--port', type=int, default=None)
+    dm.add_argument('--workers', type=int, default=None)
+    dm.add_argument('--mode', default='tick', choices=['tick', 'bar'])
+    dm.add_argument('--params', default=None, help='JSON object of dotted config overrides')
+    dm.add_argument('--trials', default=None, help='JSON file with a list of param objects (sweep)')
+    dm.add_argument('--out_dir', default=None, help='write logs/metrics here (default: summary only)')
+    return p
+
+def main(argv=None):
+    p = build_parser()
+    args = p.parse_args(argv)
+    if args.cmd not in COMMANDS:
         p.print_help()
+        return
+    cfg = load_config(args.config)
+    COMMANDS[args.cmd](args, cfg)
 
 if __name__ == '__main__':
     main()
@@ -1,20 +1,75 @@
-import pandas as pd
+class _EMA:
+    """Incremental equivalent of pandas Series.ewm(span=span).mean() (adjust=True), O(1) per update."""
+    __slots__ = ('decay', 'num', 'den')
+
+    def __init__(self, span):
+        self.decay = 1.0 - 2.0 / (span + 1)
+        self.num = 0.0
+        self.den = 0.0
+
+    def update(self, x):
+        self.num = x + self.decay * self.num
+        self.den = 1.0 + self.decay * self.den
+        return self.num / self.den
+
+    def peek(self, x):
+        """Value update(x) would return, without committing x."""
+        return (x + self.decay * self.num) / (1.0 + self.decay * self.den)
 
 class AlphaMTF:
-    def __init__(self, symbol, fast=8, slow=34):
+    """
+    Multi-timeframe EMA crossover.
+    on_bar_minute(bar, ts): fast/slow EMA crossover on minute closes. It may be called on every tick
+    with the forming bar: the EMAs advance once per minute bar (a bar's close is committed when the
+    next bar starts) and the forming bar's close is only used provisionally, matching the HTF filter,
+    which advances per completed HTF bar.
+    on_htf_bar(symbol, timeframe, bar): completed higher-timeframe bars (subscribe via
+    DataHandler.subscribe(symbol, htf, alpha.on_htf_bar)) feed an EMA trend filter; when htf is set,
+    longs are only taken while the minute close is above the HTF EMA and shorts only below it,
+    and no signal is emitted until htf_span HTF bars have completed.
+    """
+    def __init__(self, symbol, fast=8, slow=34, htf=None, htf_span=6):
         self.symbol = symbol
         self.fast = fast; self.slow = slow
-        self.minute_prices = []
+        self.fast_ema = _EMA(fast)
+        self.slow_ema = _EMA(slow)
+        self.n_bars = 0          # committed (completed) minute bars
+        self.bar_ts = None       # start of the minute bar currently forming
+        self.bar_close = None
+        self.htf = htf
+        self.htf_span = htf_span
+        self.htf_bars = 0
+        self.htf_ema = None
+
+    def on_htf_bar(self, symbol, timeframe, bar):
+        a = 2.0 / (self.htf_span + 1)
+        close = float(bar['close'])
+        self.htf_ema = close if self.htf_ema is None else a * close + (1 - a) * self.htf_ema
+        self.htf_bars += 1
+
+    def htf_trend(self, price):
+        """+1 above the HTF EMA, -1 below, 0 when flat or not yet established."""
+        if self.htf_bars < self.htf_span:
+            return 0
+        return (price > self.htf_ema) - (price < self.htf_ema)
 
     def on_bar_minute(self, bar, ts):
-        self.minute_prices.append(bar['close'])
-        if len(self.minute_prices) < self.slow:
+        close = float(bar['close'])
+        bar_ts = bar.get('ts_ns', bar.get('ts'))
+        if bar_ts != self.bar_ts:
+            if self.bar_ts is not None:
+                self.fast_ema.update(self.bar_close)
+                self.slow_ema.update(self.bar_close)
+                self.n_bars += 1
+            self.bar_ts = bar_ts
+        self.bar_close = close
+        if self.n_bars + 1 < self.slow:
             return None
-        s = pd.Series(self.minute_prices)
-        fast_ema = s.ewm(span=self.fast).mean().iloc[-1]
-        slow_ema = s.ewm(span=self.slow).mean().iloc[-1]
-        if fast_ema > slow_ema:
+        fast_ema = self.fast_ema.peek(close)
+        slow_ema = self.slow_ema.peek(close)
+        trend = self.htf_trend(bar['close']) if self.htf else None
+        if fast_ema > slow_ema and trend in (None, 1):
             return {'alpha': 'alpha_3_mtf', 'signal': 'long', 'size': 1, 'symbol': self.symbol, 'ts': ts}
-        elif fast_ema < slow_ema:
+        elif fast_ema < slow_ema and trend in (None, -1):
             return {'alpha': 'alpha_3_mtf', 'signal': 'short', 'size': 1, 'symbol': self.symbol, 'ts': ts}
         return None
@@ -5,33 +5,82 @@ class AlphaPairs:
     """
     Pairs mean reversion alpha.
     on_bar(bar_a, bar_b, ts) -> signal dict or None
+    The spread is close_a - hedge_ratio * close_b. Closes are kept rather than spreads, so the
+    z-score window is always computed with the current hedge_ratio (it may be re-estimated).
+    Entry signals carry size (units of symbol_a) and hedge_ratio; the symbol_b leg is
+    size * hedge_ratio units.
     """
-    def __init__(self, symbol_a, symbol_b, lookback=60, z_enter=2.0, z_exit=0.5, seed=0):
+    def __init__(self, symbol_a, symbol_b, lookback=60, z_enter=2.0, z_exit=0.5, seed=0, hedge_ratio=1.0, size=1):
         self.symbol_a = symbol_a
         self.symbol_b = symbol_b
+        self.hedge_ratio = hedge_ratio
+        self.size = size
         self.lookback = lookback
         self.z_enter = z_enter
         self.z_exit = z_exit
-        self.spread_hist = deque(maxlen=lookback)
+        self.px_hist = deque(maxlen=lookback)  # (close_a, close_b)
         self.seed = seed
         import numpy as _np, random as _random
         _np.random.seed(seed); _random.seed(seed)
 
     def on_bar(self, bar_a, bar_b, ts):
         px_a = float(bar_a['close']); px_b = float(bar_b['close'])
-        spread = px_a - px_b
-        self.spread_hist.append(spread)
-        if len(self.spread_hist) < self.lookback:
+        self.px_hist.append((px_a, px_b))
+        if len(self.px_hist) < self.lookback:
             return None
-        arr = np.array(self.spread_hist)
+        px = np.array(self.px_hist)
+        arr = px[:, 0] - self.hedge_ratio * px[:, 1]
+        spread = arr[-1]
         std = arr.std(ddof=0)
         if std == 0:
             return None
         z = (spread - arr.mean())/std
         if z > self.z_enter:
-            return {'alpha': 'alpha_1_pairs', 'signal': 'short_a_long_b', 'size': 1, 'symbols': (self.symbol_a,self.symbol_b), 'ts': ts}
+            return {'alpha': 'alpha_1_pairs', 'signal': 'short_a_long_b', 'size': self.size, 'hedge_ratio': self.hedge_ratio,
+                    'symbols': (self.symbol_a,self.symbol_b), 'ts': ts}
         if z < -self.z_enter:
-            return {'alpha': 'alpha_1_pairs', 'signal': 'long_a_short_b', 'size': 1, 'symbols': (self.symbol_a,self.symbol_b), 'ts': ts}
+            return {'alpha': 'alpha_1_pairs', 'signal': 'long_a_short_b', 'size': self.size, 'hedge_ratio': self.hedge_ratio,
+                    'symbols': (self.symbol_a,self.symbol_b), 'ts': ts}
         if abs(z) < self.z_exit:
-            return {'alpha': 'alpha_1_pairs', 'signal': 'exit', 'ts': ts}
+            return {'alpha': 'alpha_1_pairs', 'signal': 'exit', 'symbols': (self.symbol_a,self.symbol_b), 'ts': ts}
         return None
+
+class MultiPairAlpha:
+    """
+    AlphaPairs over a changing set of pairs (e.g. the PairScreener top-K).
+    set_pairs(pairs) keeps the instance (and price history) of pairs that stay selected, updating
+    their hedge_ratio to the latest estimate, creates new ones and drops the rest; on_bar(bar_a, bar_b, ts) style evaluation is per pair
+    via pairs_for(symbol) / on_pair_bar(pair, bar_a, bar_b, ts).
+    """
+    def __init__(self, lookback=60, z_enter=2.0, z_exit=0.5, seed=0, size=1):
+        self.lookback = lookback
+        self.size = size
+        self.z_enter = z_enter
+        self.z_exit = z_exit
+        self.seed = seed
+        self.alphas = {}      # (symbol_a, symbol_b) -> AlphaPairs
+        self.by_symbol = {}   # symbol -> [pair]
+
+    def set_pairs(self, pairs):
+        """pairs: screener dicts ({'pair': (a, b), 'hedge_ratio': h}) or (a, b) tuples."""
+        alphas = {}
+        for p in pairs:
+            key, hedge = (tuple(p['pair']), p.get('hedge_ratio', 1.0)) if isinstance(p, dict) else (tuple(p), 1.0)
+            alpha = self.alphas.get(key)
+            if alpha is None:
+                alpha = AlphaPairs(key[0], key[1], lookback=self.lookback, z_enter=self.z_enter,
+                                   z_exit=self.z_exit, seed=self.seed, hedge_ratio=hedge, size=self.size)
+            else:
+                alpha.hedge_ratio = hedge
+            alphas[key] = alpha
+        self.alphas = alphas
+        self.by_symbol = {}
+        for key in alphas:
+            for sym in key:
+                self.by_symbol.setdefault(sym, []).append(key)
+
+    def pairs_for(self, symbol):
+        return self.by_symbol.get(symbol, ())
+
+    def on_pair_bar(self, pair, bar_a, bar_b, ts):
+        return self.alphas[pair].on_bar(bar_a, bar_b, ts)
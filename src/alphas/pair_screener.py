@@ -0,0 +1,155 @@
+import numpy as np
+
+class PairScreener:
+    """
+    Universe-wide pair screening on 1min closes, updated incrementally per bar.
+    Keeps a ring buffer of the last window+1 log-price rows (N symbols) and running sums of
+    x_t, x_{t-1}, x_t x_t^T, x_{t-1} x_{t-1}^T and x_t x_{t-1}^T over the window, so each bar is
+    a few rank-1 N x N updates instead of per-pair Python objects (N=500 -> 125k pairs).
+    Sums are rebuilt from the ring every `window` bars to stop floating-point drift.
+    rank() scores every pair (i, j) at once from those moments:
+    - log-price hedge ratio beta = cov(i, j) / var(j), spread s = x_i - beta * x_j
+      (reported hedge_ratio is beta converted to price units at the latest prices)
+    - AR(1) coefficient phi = cov(s_t, s_{t-1}) / var(s_{t-1}) and its Dickey-Fuller style
+      t-statistic (phi - 1) / se: more negative = more stationary spread
+    - half-life = -ln 2 / ln(phi)
+    Pairs pass when |corr| >= min_corr and min_half_life <= half-life <= max_half_life, and are
+    ranked by the DF statistic. on_bar(symbol, timeframe, bar) matches DataHandler subscribers;
+    every `refresh_every` bars the top_k pairs are passed to on_refresh(pairs). A bar older than the
+    row being collected (or already committed) cannot be placed and is counted in late_bars.
+    """
+    def __init__(self, symbols, window=240, top_k=5, refresh_every=60, min_corr=0.7,
+                 min_half_life=1.0, max_half_life=None, on_refresh=None):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.window = int(window)
+        self.top_k = top_k
+        self.refresh_every = refresh_every
+        self.min_corr = min_corr
+        self.min_half_life = min_half_life
+        self.max_half_life = max_half_life or window / 2
+        self.on_refresh = on_refresh
+        n = len(self.symbols)
+        self.ring = np.zeros((self.window + 1, n))
+        self.count = 0          # rows pushed
+        self.ref = None         # first log prices; rows are stored relative to them (less cancellation)
+        self._last = np.full(n, np.nan)
+        self._row_ts = None
+        self._committed_ts = None
+        self._row = {}
+        self.late_bars = 0
+        self.pairs = []
+        self._reset_sums()
+
+    def _reset_sums(self):
+        n = len(self.symbols)
+        self.s_cur = np.zeros(n)
+        self.s_prev = np.zeros(n)
+        self.q_cur = np.zeros((n, n))
+        self.q_prev = np.zeros((n, n))
+        self.lag = np.zeros((n, n))
+
+    def on_bar(self, symbol, timeframe, bar):
+        i = self.index.get(symbol)
+        if i is None:
+            return
+        ts_ns = bar['ts_ns']
+        if (self._row_ts is not None and ts_ns < self._row_ts) or \
+                (self._committed_ts is not None and ts_ns <= self._committed_ts):
+            self.late_bars += 1
+            return
+        if self._row_ts is not None and ts_ns > self._row_ts:
+            self._commit()
+        self._row_ts = ts_ns
+        self._row[i] = float(bar['close'])
+
+    def flush(self):
+        """Commit the row being collected (call after the last bar of a time step when driving it directly)."""
+        if self._row:
+            self._commit()
+
+    def _commit(self):
+        for i, px in self._row.items():
+            self._last[i] = px
+        self._row = {}
+        self._committed_ts, self._row_ts = self._row_ts, None
+        if np.isnan(self._last).any():
+            return  # wait until every symbol has printed once
+        self.update(self._last)
+
+    def update(self, prices):
+        """Push one row of prices aligned with self.symbols."""
+        x = np.log(np.asarray(prices, dtype=float))
+        if self.ref is None:
+            self.ref = x.copy()
+        x = x - self.ref
+        w = self.window
+        pos = self.count % (w + 1)
+        if self.count >= 1:
+            last = self.ring[(self.count - 1) % (w + 1)]
+            if self.count >= w + 1:
+                # also drop the oldest (x_1, x_0) pair; x_0 is the row being overwritten.
+                # add + drop is one rank-2 product per matrix: [a, b]^T [c, -d] = a c^T - b d^T
+                x0 = self.ring[pos]
+                x1 = self.ring[(pos + 1) % (w + 1)]
+                self.s_cur += x - x1
+                self.s_prev += last - x0
+                self.q_cur += np.stack([x, x1]).T @ np.stack([x, -x1])
+                self.q_prev += np.stack([last, x0]).T @ np.stack([last, -x0])
+                self.lag += np.stack([x, x1]).T @ np.stack([last, -x0])
+            else:
+                self.s_cur += x
+                self.s_prev += last
+                self.q_cur += np.outer(x, x)
+                self.q_prev += np.outer(last, last)
+                self.lag += np.outer(x, last)
+        self.ring[pos] = x
+        self.count += 1
+        if self.count > w + 1 and self.count % w == 0:
+            self._rebuild()
+        if self.refresh_every and self.count > w and self.count % self.refresh_every == 0:
+            self.pairs = self.rank()
+            if self.on_refresh is not None:
+                self.on_refresh(self.pairs)
+
+    def _rebuild(self):
+        w = self.window
+        rows = np.roll(self.ring, -(self.count % (w + 1)), axis=0)  # oldest first
+        cur, prev = rows[1:], rows[:-1]
+        self.s_cur, self.s_prev = cur.sum(axis=0), prev.sum(axis=0)
+        self.q_cur, self.q_prev = cur.T @ cur, prev.T @ prev
+        self.lag = cur.T @ prev
+
+    def rank(self, top_k=None):
+        """Top pairs by DF statistic as dicts (pair, beta, hedge_ratio, corr, phi, half_life, df_stat)."""
+        n_obs = min(self.count - 1, self.window)
+        if n_obs < 3:
+            return []
+        m_cur, m_prev = self.s_cur / n_obs, self.s_prev / n_obs
+        c = self.q_cur / n_obs - np.outer(m_cur, m_cur)
+        cp = self.q_prev / n_obs - np.outer(m_prev, m_prev)
+        cl = self.lag / n_obs - np.outer(m_cur, m_prev)
+        i, j = np.triu_indices(len(self.symbols), k=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var_i, var_j = c[i, i], c[j, j]
+            corr = c[i, j] / np.sqrt(var_i * var_j)
+            beta = c[i, j] / var_j
+            var_s = var_i - 2 * beta * c[i, j] + beta ** 2 * var_j
+            var_sp = cp[i, i] - 2 * beta * cp[i, j] + beta ** 2 * cp[j, j]
+            cov_lag = cl[i, i] - beta * (cl[i, j] + cl[j, i]) + beta ** 2 * cl[j, j]
+            phi = cov_lag / var_sp
+            resid = np.maximum(var_s - phi * cov_lag, 0.0)
+            df_stat = (phi - 1.0) / np.sqrt(resid / (n_obs * var_sp))
+            half_life = np.where((phi > 0) & (phi < 1), -np.log(2.0) / np.log(phi), np.inf)
+        ok = (np.abs(corr) >= self.min_corr) & (half_life >= self.min_half_life) & \
+             (half_life <= self.max_half_life) & np.isfinite(df_stat)
+        idx = np.flatnonzero(ok)
+        k = top_k or self.top_k
+        if len(idx) > k:
+            idx = idx[np.argpartition(df_stat[idx], k - 1)[:k]]
+        idx = idx[np.argsort(df_stat[idx], kind='stable')]
+        logp = self.ring[(self.count - 1) % (self.window + 1)] + self.ref
+        return [{'pair': (self.symbols[i[p]], self.symbols[j[p]]), 'beta': float(beta[p]),
+                 'hedge_ratio': float(beta[p] * np.exp(logp[i[p]] - logp[j[p]])),
+                 'corr': float(corr[p]), 'phi': float(phi[p]), 'half_life': float(half_life[p]),
+                 'df_stat': float(df_stat[p])} for p in idx]
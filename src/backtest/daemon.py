@@ -0,0 +1,307 @@
+"""
+Long-running replay daemon with hot market data.
+Startup loads each configured market log once: events are parsed and packed into flat numpy
+arrays (tick mode, see PackedEvents) and bars are opened from the bar cache (bar mode, one
+memory-mapped file per log). A fork-based worker pool is then created. Workers read the packed
+arrays and bar maps in place, rebuilding event dicts as they replay; array data carries no
+per-event Python objects, so reading it never writes to (and un-shares) the inherited pages.
+Jobs never re-read or re-parse a log, and every job is recorded in the run registry (kind
+'replay'; summary-only jobs under their own key so they never replace a run with logs).
+Jobs arrive over local HTTP (ThreadingHTTPServer, 127.0.0.1 by default):
+  GET  /status                  loaded logs and event/bar counts
+  POST /replay   {"market_log": <name or path>, "mode": "tick"|"bar", "params": {dotted: value},
+                  "out_dir": optional}  -> metrics summary (logs written only with out_dir)
+  POST /sweep    {"market_log": ..., "mode": ..., "trials": [{params}, ...]} -> list of summaries
+  POST /shutdown
+"""
+import json, multiprocessing, os, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+import numpy as np
+from framework.logger import setup_logger
+from framework.ndjson import iter_ndjson
+
+logger = setup_logger('daemon')
+
+# loaded before the pool forks; read-only afterwards (workers see it through fork)
+_DATA = {'cfg': None, 'events': {}, 'bars': {}, 'fp': {}}
+_CHUNK = 1 << 16
+
+TICK, L2, RAW = 0, 1, 2
+PRICE_INT, SIZE_INT = 1, 2  # `ints` bits: the value was a JSON integer
+EVENT_DTYPE = np.dtype([('ts', 'i4'), ('sym', 'i4'), ('kind', 'u1'), ('ints', 'u1'), ('price', 'f8'), ('size', 'f8'),
+                        ('lvl', 'i8'), ('n_bids', 'u2'), ('n_asks', 'u2')])
+LEVEL_DTYPE = np.dtype([('price', 'f8'), ('size', 'f8'), ('ints', 'u1')])
+
+def _num(v):
+    # (float value, ints bit) with the JSON integer/float distinction kept
+    return float(v), type(v) is int
+
+def _unpack(row, ts, symbol, levels):
+    """Rebuild an event dict from an EVENT_DTYPE row tuple and its LEVEL_DTYPE tuples."""
+    _, _, kind, ints, price, size, _, nb, _ = row
+    if kind == TICK:
+        return {'msg_type': 'tick', 'symbol': symbol, 'ts': ts,
+                'price': int(price) if ints & PRICE_INT else price, 'size': int(size) if ints & SIZE_INT else size}
+    book = [{'price': int(p) if f & PRICE_INT else p, 'size': int(q) if f & SIZE_INT else q} for p, q, f in levels]
+    return {'msg_type': 'l2_update', 'symbol': symbol, 'ts': ts, 'bids': book[:nb], 'asks': book[nb:]}
+
+def _blob(parts):
+    return (np.frombuffer(b''.join(parts), dtype=np.uint8),
+            np.concatenate([[0], np.cumsum([len(b) for b in parts], dtype=np.int64)]))
+
+class PackedEvents:
+    """
+    A market log packed into flat numpy arrays, iterable as event dicts (a ReplayEngine stand-in).
+    - events: one EVENT_DTYPE row per event; ts indexes the timestamp table, sym the symbol list;
+      l2 rows point at n_bids + n_asks rows of levels (bids first)
+    - timestamps: original ts strings, consecutive duplicates stored once, as one byte blob + offsets
+    - raw: events the packed form cannot reproduce exactly (extra fields, other key order or
+      message types), kept as their JSON text; `n_raw` counts them
+    stream_events() yields events whose json.dumps matches the log's, so a job's market_replayed
+    log is identical to a `replay` of the same log (checked per event while packing).
+    """
+    def __init__(self, path):
+        self.symbols = []
+        self.n_raw = 0
+        sym_index = {}
+        dumps = json.dumps
+        rows, levels, ts_bytes, raw_bytes = [], [], [], []
+        ev_parts, lvl_parts = [], []
+        last_ts = None
+        n_levels = 0
+        for ev in iter_ndjson(path):
+            row, lvls = self._pack(ev, n_levels)
+            if row is None or dumps(_unpack(row, ev['ts'], ev['symbol'], lvls)) != dumps(ev):
+                rows.append((-1, -1, RAW, 0, 0.0, 0.0, len(raw_bytes), 0, 0))
+                raw_bytes.append(dumps(ev).encode())
+                self.n_raw += 1
+            else:
+                if ev['ts'] != last_ts:
+                    last_ts = ev['ts']
+                    ts_bytes.append(last_ts.encode())
+                sym = sym_index.get(ev['symbol'])
+                if sym is None:
+                    sym = sym_index[ev['symbol']] = len(self.symbols)
+                    self.symbols.append(ev['symbol'])
+                rows.append((len(ts_bytes) - 1, sym) + row[2:])
+                levels.extend(lvls)
+                n_levels += len(lvls)
+            if len(rows) >= _CHUNK:
+                ev_parts.append(np.array(rows, dtype=EVENT_DTYPE)); rows = []
+            if len(levels) >= _CHUNK:
+                lvl_parts.append(np.array(levels, dtype=LEVEL_DTYPE)); levels = []
+        ev_parts.append(np.array(rows, dtype=EVENT_DTYPE))
+        lvl_parts.append(np.array(levels, dtype=LEVEL_DTYPE))
+        self.events = np.concatenate(ev_parts)
+        self.levels = np.concatenate(lvl_parts)
+        self.ts_blob, self.ts_offsets = _blob(ts_bytes)
+        self.raw_blob, self.raw_offsets = _blob(raw_bytes)
+
+    @staticmethod
+    def _pack(ev, lvl):
+        """(row tuple, level tuples) for a tick/l2_update, or (None, None) if it has no packed form."""
+        try:
+            if not isinstance(ev['ts'], str) or not isinstance(ev['symbol'], str):
+                return None, None
+            if ev['msg_type'] == 'tick':
+                (price, pi), (size, si) = _num(ev['price']), _num(ev['size'])
+                return (0, 0, TICK, pi * PRICE_INT | si * SIZE_INT, price, size, 0, 0, 0), []
+            if ev['msg_type'] == 'l2_update':
+                bids, asks = ev['bids'], ev['asks']
+                lvls = []
+                for lv in bids + asks:
+                    (price, pi), (size, si) = _num(lv['price']), _num(lv['size'])
+                    lvls.append((price, size, pi * PRICE_INT | si * SIZE_INT))
+                return (0, 0, L2, 0, 0.0, 0.0, lvl, len(bids), len(asks)), lvls
+        except (KeyError, TypeError, ValueError, OverflowError):
+            pass
+        return None, None
+
+    def __len__(self):
+        return len(self.events)
+
+    def stream_events(self):
+        symbols, levels = self.symbols, self.levels
+        ts_blob, ts_offsets, raw_blob, raw_offsets = self.ts_blob, self.ts_offsets, self.raw_blob, self.raw_offsets
+        loads = json.loads
+        ts_i, ts = -1, None
+        for lo in range(0, len(self.events), _CHUNK):
+            # one chunk of rows as tuples at a time: fast to read, bounded per-job memory
+            for row in self.events[lo:lo + _CHUNK].tolist():
+                i, sym, kind = row[0], row[1], row[2]
+                if kind == RAW:
+                    j = row[6]
+                    yield loads(raw_blob[raw_offsets[j]:raw_offsets[j + 1]].tobytes())
+                    continue
+                if i != ts_i:
+                    ts_i, ts = i, ts_blob[ts_offsets[i]:ts_offsets[i + 1]].tobytes().decode()
+                lvls = levels[row[6]:row[6] + row[7] + row[8]].tolist() if kind == L2 else ()
+                yield _unpack(row, ts, symbols[sym], lvls)
+
+def load_market_data(cfg, market_logs, modes=('tick', 'bar')):
+    """Parse/open every log once into _DATA (keyed by path and basename)."""
+    from framework.bar_cache import bars_key, load_bars, open_bar_cache
+    from framework.run_registry import open_registry
+    _DATA['cfg'] = cfg
+    registry = open_registry(cfg)
+    try:
+        for path in market_logs:
+            names = (path, os.path.basename(path))
+            fp = registry.fingerprint(path) if registry is not None else None
+            if 'tick' in modes:
+                events = PackedEvents(path)
+                for n in names:
+                    _DATA['events'][n] = events
+            if 'bar' in modes:
+                key = bars_key(cfg, path, registry=registry) if open_bar_cache(cfg) is not None else None
+                bars = load_bars(cfg, path, key=key)
+                for n in names:
+                    _DATA['bars'][n] = bars
+            for n in names:
+                _DATA['fp'][n] = fp
+            logger.info('Loaded %s', path)
+    finally:
+        if registry is not None:
+            registry.close()
+
+_WORKER_REGISTRY = {}  # pid -> RunRegistry; sqlite connections must not cross fork
+
+def _registry(cfg):
+    from framework.run_registry import open_registry
+    pid = os.getpid()
+    if pid not in _WORKER_REGISTRY:
+        _WORKER_REGISTRY[pid] = open_registry(cfg)
+    return _WORKER_REGISTRY[pid]
+
+def _register(cfg, engine, name, mode, out_dir):
+    from framework.run_registry import config_hash, input_key
+    registry = _registry(_DATA['cfg'])
+    if registry is None:
+        return None
+    fp = _DATA['fp'].get(name)
+    # a job with out_dir is the same run as `replay` with this config; summary-only jobs get their own key
+    parts = (config_hash(cfg), cfg.get('seed'), fp, None, cfg.get('storage', {}).get('compression') or 'none')
+    key = input_key('replay', *parts) if out_dir else input_key('replay', *parts, 'summary')
+    artifacts = {}
+    if out_dir:
+        artifacts = {'market_log': engine.market_log_path, 'order_log': engine.order_log_path,
+                     'fill_log': engine.fill_log_path, 'metadata': os.path.join(out_dir, 'replay_metadata.json'),
+                     'metrics': os.path.join(out_dir, 'metrics.json'), 'equity_curve': engine.equity_log_path}
+    return registry.register('replay', key, out_dir=out_dir, cfg=cfg, seed=cfg.get('seed'), market_fp=fp,
+                             metrics=engine.metrics.summary(), artifacts=artifacts,
+                             params={'market_log': name, 'mode': mode, 'daemon': True})
+
+def run_job(job):
+    """Worker entrypoint: one replay on in-memory data; returns the metrics summary."""
+    from backtest.engine import BacktestEngine
+    from backtest.walkforward import apply_params
+    try:
+        name, mode = job['market_log'], job.get('mode', 'tick')
+        cfg = apply_params(_DATA['cfg'], job.get('params') or {})
+        cfg['metrics'] = dict(cfg.get('metrics') or {}, enabled=True)
+        cfg['backtest'] = dict(cfg['backtest'], mode=mode)  # keys match `replay` runs of the same mode
+        engine = BacktestEngine(cfg)
+        out_dir = job.get('out_dir')
+        if mode == 'bar':
+            if name not in _DATA['bars']:
+                raise KeyError(f"market log {name!r} is not loaded for bar mode")
+            engine.run_bars(_DATA['bars'][name], out_dir)
+        else:
+            if name not in _DATA['events']:
+                raise KeyError(f"market log {name!r} is not loaded for tick mode")
+            engine.run_replay(_DATA['events'][name], out_dir)
+        run_id = _register(cfg, engine, name, mode, out_dir)
+        return {'ok': True, 'metrics': engine.metrics.summary(), 'out_dir': out_dir, 'run_id': run_id}
+    except Exception as e:
+        return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+class ReplayDaemon:
+    def __init__(self, cfg, market_logs, host='127.0.0.1', port=9200, workers=None, modes=('tick', 'bar')):
+        self.cfg = cfg
+        self.market_logs = list(market_logs)
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.modes = modes
+        self.pool = None
+        self.server = None
+
+    def start(self):
+        load_market_data(self.cfg, self.market_logs, self.modes)
+        # fork after loading (and before any server thread exists) so workers inherit the data
+        self.pool = multiprocessing.get_context('fork').Pool(self.workers)
+        self.server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self.port = self.server.server_address[1]
+        logger.info('Replay daemon on http://%s:%s with %d workers', self.host, self.port, self.workers)
+        return self
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def status(self):
+        return {'workers': self.workers,
+                'market_logs': {p: {'events': len(_DATA['events'].get(p, ())),
+                                    'symbols': len(_DATA['bars'].get(p, ()))} for p in self.market_logs}}
+
+    def replay(self, job):
+        return self.pool.apply(run_job, (job,))
+
+    def sweep(self, job):
+        base = {k: v for k, v in job.items() if k != 'trials'}
+        return self.pool.map(run_job, [dict(base, params=p) for p in job.get('trials', [])])
+
+def _handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, obj):
+            body = json.dumps(obj, default=str).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self._send(200, daemon.status())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            try:
+                job = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except json.JSONDecodeError as e:
+                self._send(400, {'error': f"invalid JSON: {e}"})
+                return
+            if self.path == '/replay':
+                self._send(200, daemon.replay(job))
+            elif self.path == '/sweep':
+                self._send(200, daemon.sweep(job))
+            elif self.path == '/shutdown':
+                self._send(200, {'ok': True})
+                threading.Thread(target=daemon.server.shutdown, daemon=True).start()
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt, *args)
+    return Handler
+
+def submit(path, job=None, host='127.0.0.1', port=9200, timeout=None):
+    """Client helper: POST a job (or GET when job is None) and return the decoded JSON response."""
+    url = f"http://{host}:{port}{path}"
+    data = json.dumps(job).encode() if job is not None else None
+    req = urlrequest.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urlrequest.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
@@ -1,127 +1,334 @@
-import os, json
+import os, json, importlib
 from framework.execution_model import DeterministicExecutionModel
 from framework.order_manager import OrderManager
-from framework.datahandler import DataHandler
 from framework.portfolio import Portfolio
 from framework.logger import setup_logger, save_json
-from alphas.alpha_pairs import AlphaPairs
-from alphas.alpha_breakout import AlphaBreakout
-from alphas.alpha_mtf import AlphaMTF
-from alphas.alpha_multiasset import AlphaMultiAsset
-from alphas.alpha_orderbook import AlphaOrderbook
+from framework.ndjson import BufferedNDJSONWriter, with_compression
+from framework.instrumentation import Instrumentation
+from framework.metrics import OnlineMetrics
+from framework.bars import timeframe_ns
+from framework.timestamps import parse_iso_ns, format_bar_ts, format_iso_ns
 
 logger = setup_logger('backtest')
 
+# alpha config key -> "module:Class"; imported on first use so importing the engine stays cheap
+ALPHA_CLASSES = {
+    'alpha_1_pairs': 'alphas.alpha_pairs:AlphaPairs',
+    'alpha_2_breakout': 'alphas.alpha_breakout:AlphaBreakout',
+    'alpha_3_mtf': 'alphas.alpha_mtf:AlphaMTF',
+    'alpha_4_multi_asset': 'alphas.alpha_multiasset:AlphaMultiAsset',
+    'alpha_5_orderbook': 'alphas.alpha_orderbook:AlphaOrderbook',
+}
+
+def load_alpha_class(key):
+    module, cls = ALPHA_CLASSES[key].split(':')
+    return getattr(importlib.import_module(module), cls)
+
 class BacktestEngine:
     """
     BacktestEngine can run a replay (ReplayEngine.stream_events) and:
     - feed events to DataHandler
     - run all alphas on appropriate events (bars/ticks/book)
     - submit orders to OrderManager (deterministic) and write logs (order_log.ndjson, fill_log.ndjson)
+    - apply fills to the Portfolio, mark it on every tick and write online summary metrics (metrics.json)
+      and the sampled mark-to-market equity curve (equity_curve.ndjson)
+    run_bars(bars, out_dir) is bar mode (backtest.mode: bar), a separate, coarser simulation for
+    parameter research, not a faster equivalent of run_replay: alphas are evaluated once per
+    completed 1min bar from precomputed (cached) bars and orders fill at the bar close, so signals,
+    fills and metrics differ from a tick replay of the same log. The orderbook alpha needs L2 events
+    and does not run, and no market_replayed log is written (there are no events to record).
     """
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, instrumentation=None):
         self.config = config
+        self.instr = instrumentation or Instrumentation(config.get('instrumentation',{}).get('enabled', False))
         self.exec_model = DeterministicExecutionModel(
             slippage_abs=config['backtest'].get('slippage_abs',0.0),
             slippage_pct=config['backtest'].get('slippage_pct',0.0),
             tick_size=0.01, lot_size=1.0, seed=config.get('seed',0)
         )
         # writers
+        self.market_log_path = None
         self.order_log_path = None
         self.fill_log_path = None
+        self.equity_log_path = None
         self.market_writer = None
         self.order_writer = None
         self.fill_writer = None
-        self.datahandler = DataHandler()
-        self.portfolio = Portfolio(initial_cash=config['backtest'].get('initial_cash',100000.0))
+        self.equity_writer = None
+        from framework.datahandler import DataHandler
+        bcfg = config.get('bars',{})
+        self.datahandler = DataHandler(timeframes=bcfg.get('timeframes',['1min']),
+                                       session_start=bcfg.get('session_start','00:00'),
+                                       history=bcfg.get('history',10000))
+        self.reset_portfolio()
+        self.last_close = {}  # symbol -> last bar close (bar mode prices)
         # instantiate alphas using config
         acfg = config.get('alphas',{})
+        AlphaPairs = load_alpha_class('alpha_1_pairs')
+        AlphaBreakout = load_alpha_class('alpha_2_breakout')
+        AlphaMTF = load_alpha_class('alpha_3_mtf')
+        AlphaMultiAsset = load_alpha_class('alpha_4_multi_asset')
+        AlphaOrderbook = load_alpha_class('alpha_5_orderbook')
         self.alpha1 = AlphaPairs(acfg.get('alpha_1_pairs',{}).get('symbol_a','SYM_A'),
                                  acfg.get('alpha_1_pairs',{}).get('symbol_b','SYM_B'),
                                  lookback=acfg.get('alpha_1_pairs',{}).get('lookback',60),
                                  z_enter=acfg.get('alpha_1_pairs',{}).get('z_enter',2.0),
                                  z_exit=acfg.get('alpha_1_pairs',{}).get('z_exit',0.5),
-                                 seed=config.get('seed',0))
+                                 seed=config.get('seed',0), size=acfg.get('alpha_1_pairs',{}).get('size',1))
+        # optional universe screening: alpha_1 then trades the screener's top-K pairs instead of symbol_a/symbol_b
+        self.screener = self.pairs_book = None
+        scfg = acfg.get('alpha_1_pairs',{}).get('screener') or {}
+        if scfg.get('enabled'):
+            from alphas.pair_screener import PairScreener
+            from alphas.alpha_pairs import MultiPairAlpha
+            self.pairs_book = MultiPairAlpha(lookback=acfg.get('alpha_1_pairs',{}).get('lookback',60),
+                                             z_enter=acfg.get('alpha_1_pairs',{}).get('z_enter',2.0),
+                                             z_exit=acfg.get('alpha_1_pairs',{}).get('z_exit',0.5),
+                                             seed=config.get('seed',0), size=acfg.get('alpha_1_pairs',{}).get('size',1))
+            self.screener = PairScreener(scfg.get('universe') or ['SYM_A','SYM_B','SYM_C','SYM_D','SYM_E'],
+                                         window=scfg.get('window',240), top_k=scfg.get('top_k',5),
+                                         refresh_every=scfg.get('refresh_every',60),
+                                         min_corr=scfg.get('min_corr',0.7),
+                                         on_refresh=self.pairs_book.set_pairs)
+            for sym in self.screener.symbols:
+                self.datahandler.subscribe(sym, '1min', self.screener.on_bar)
         self.alpha2 = AlphaBreakout(acfg.get('alpha_2_breakout',{}).get('symbol','SYM_C'),
                                     lookback=acfg.get('alpha_2_breakout',{}).get('lookback',20))
         self.alpha3 = AlphaMTF(acfg.get('alpha_3_mtf',{}).get('symbol','SYM_D'),
                                fast=acfg.get('alpha_3_mtf',{}).get('fast',8),
-                               slow=acfg.get('alpha_3_mtf',{}).get('slow',34))
+                               slow=acfg.get('alpha_3_mtf',{}).get('slow',34),
+                               htf=acfg.get('alpha_3_mtf',{}).get('htf'),
+                               htf_span=acfg.get('alpha_3_mtf',{}).get('htf_span',6))
+        if self.alpha3.htf:
+            # higher-timeframe trend filter fed with completed rollup bars
+            self.datahandler.subscribe(self.alpha3.symbol, self.alpha3.htf, self.alpha3.on_htf_bar)
         self.alpha4 = AlphaMultiAsset(acfg.get('alpha_4_multi_asset',{}).get('symbols',['SYM_A','SYM_B','SYM_C']))
         self.alpha5 = AlphaOrderbook(acfg.get('alpha_5_orderbook',{}).get('symbol','SYM_E'),
                                      imbalance_threshold=acfg.get('alpha_5_orderbook',{}).get('imbalance_threshold',0.2))
+        # hot-path callables; wrapped with timers only when instrumentation is enabled
+        instr = self.instr
+        self._ingest = instr.wrap('ingest', self.datahandler.ingest_tick)
+        self._last_bar = instr.wrap('bar_build', self.datahandler.get_last_bar)
+        self._alpha1_on_bar = instr.wrap('alpha.alpha_1_pairs', self.alpha1.on_bar)
+        if self.pairs_book is not None:
+            self._alpha1_on_pair = instr.wrap('alpha.alpha_1_pairs', self.pairs_book.on_pair_bar)
+        self._alpha2_on_bar = instr.wrap('alpha.alpha_2_breakout', self.alpha2.on_bar)
+        self._alpha3_on_bar = instr.wrap('alpha.alpha_3_mtf', self.alpha3.on_bar_minute)
+        self._alpha4_on_bar = instr.wrap('alpha.alpha_4_multi_asset', self.alpha4.on_bar)
+        self._alpha5_on_book = instr.wrap('alpha.alpha_5_orderbook', self.alpha5.on_book)
 
-    def _make_writers(self, out_dir):
+    def _make_writers(self, out_dir, market=True):
+        instr = self.instr
+        fee = self.config['backtest'].get('commission_per_trade',0.0)
+        history = self.config['backtest'].get('trade_history', 0)
+        if out_dir is None:
+            # summary-only runs (sweeps/walk-forward trials): no logs, metrics stay in memory
+            self.order_manager = OrderManager(self.exec_model, _discard, _discard, fee_per_trade=fee, history=history)
+            self._write_market = _discard
+            self._submit_order = instr.wrap('order', self.order_manager.submit_market_order)
+            return
         os.makedirs(out_dir, exist_ok=True)
-        self.market_log_path = os.path.join(out_dir,'market_replayed.ndjson')
-        self.order_log_path = os.path.join(out_dir,'order_log.ndjson')
-        self.fill_log_path = os.path.join(out_dir,'fill_log.ndjson')
-        # open files and write via append
-        def mw(obj):
-            with open(self.market_log_path,'a') as f:
-                f.write(json.dumps(obj, default=str) + '\\n')
-        def ow(obj):
-            with open(self.order_log_path,'a') as f:
-                f.write(json.dumps(obj, default=str) + '\\n')
-        def fw(obj):
-            with open(self.fill_log_path,'a') as f:
-                f.write(json.dumps(obj, default=str) + '\\n')
-        self.market_writer = mw
-        self.order_writer = ow
-        self.fill_writer = fw
+        comp = self.config.get('storage',{}).get('compression')
+        self.order_log_path = with_compression(os.path.join(out_dir,'order_log.ndjson'), comp)
+        self.fill_log_path = with_compression(os.path.join(out_dir,'fill_log.ndjson'), comp)
+        # buffered writers (append mode, flushed in batches and on close)
+        if market:
+            self.market_log_path = with_compression(os.path.join(out_dir,'market_replayed.ndjson'), comp)
+            self.market_writer = BufferedNDJSONWriter(self.market_log_path)
+        self.order_writer = BufferedNDJSONWriter(self.order_log_path)
+        self.fill_writer = BufferedNDJSONWriter(self.fill_log_path)
         # Setup order manager with deterministic exec model
-        self.order_manager = OrderManager(self.exec_model, self.order_writer, self.fill_writer,
-                                          fee_per_trade=self.config['backtest'].get('commission_per_trade',0.0))
+        self.order_manager = OrderManager(self.exec_model,
+                                          instr.wrap('write.order', self.order_writer),
+                                          instr.wrap('write.fill', self.fill_writer),
+                                          fee_per_trade=fee, history=history)
+        self._write_market = instr.wrap('write.market', self.market_writer) if market else _discard
+        self._submit_order = instr.wrap('order', self.order_manager.submit_market_order)
+        if self.metrics is not None:
+            # sampled mark-to-market equity, the input of the quantstats report
+            self.equity_log_path = with_compression(os.path.join(out_dir,'equity_curve.ndjson'), comp)
+            self.equity_writer = BufferedNDJSONWriter(self.equity_log_path)
+            self.metrics.equity_writer = self.equity_writer
+
+    def reset_portfolio(self):
+        """Fresh flat portfolio and metrics, keeping alpha state (e.g. warm indicators for an out-of-sample window)."""
+        mcfg = self.config.get('metrics',{})
+        initial_cash = self.config['backtest'].get('initial_cash',100000.0)
+        self.metrics = None
+        if mcfg.get('enabled', True):
+            self.metrics = OnlineMetrics(initial_cash,
+                                         sample_interval=mcfg.get('sample_interval','1min'),
+                                         periods_per_year=mcfg.get('periods_per_year'))
+        self.portfolio = Portfolio(initial_cash=initial_cash, metrics=self.metrics,
+                                   history=self.config['backtest'].get('trade_history', 0))
 
     def run_replay(self, replay_engine, out_dir):
         logger.info('BacktestEngine: starting replay -> out_dir: %s', out_dir)
         self._make_writers(out_dir)
-        # stream events
-        for ev in replay_engine.stream_events():
-            # write raw event to market writer
-            self.market_writer(ev)
-            # handle event types
-            mtype = ev.get('msg_type','tick')
-            ts = ev['ts']
-            if mtype == 'tick':
-                # ingest tick
-                self.datahandler.ingest_tick(ev)
-                # run orderbook alpha if book available? no
-                # run breakout/mtf periodically via built bars: for simplicity, run all alphas when possible
-                # Build 1min bars and feed
-                bar = self.datahandler.get_last_bar(ev['symbol'], timeframe='1min')
+        try:
+            # stream events
+            for ev in replay_engine.stream_events():
+                self.on_event(ev)
+        finally:
+            self.finish(out_dir)
+
+    def run_bars(self, bars, out_dir, timeframe='1min'):
+        """
+        Replay precomputed bars ({symbol: {timeframe: {column: array}}}, see framework.bar_cache)
+        in timestamp order; symbols sharing a bar time are applied before the alphas run.
+        out_dir=None runs summary-only (no logs; read self.metrics afterwards).
+        """
+        import numpy as np
+        if out_dir is not None:
+            logger.info('BacktestEngine: starting bar replay -> out_dir: %s', out_dir)
+        self._make_writers(out_dir, market=False)
+        try:
+            span = timeframe_ns(timeframe)
+            symbols = sorted(bars)
+            series = [bars[s][timeframe] for s in symbols]
+            ts_all = np.concatenate([c['ts_ns'] for c in series]) if series else np.empty(0, dtype=np.int64)
+            sym_all = np.concatenate([np.full(len(c['ts_ns']), i) for i, c in enumerate(series)]) if series else ts_all
+            row_all = np.concatenate([np.arange(len(c['ts_ns'])) for c in series]) if series else ts_all
+            order = np.lexsort((sym_all, ts_all))
+            # higher-timeframe bars for the MTF trend filter, fed once their bucket has closed
+            htf = self.alpha3.htf if self.alpha3.symbol in bars else None
+            if htf and htf not in bars[self.alpha3.symbol]:
+                raise ValueError(f"bar mode needs {htf} bars for alpha_3_mtf; add it to bars.timeframes")
+            htf_cols = bars[self.alpha3.symbol][htf] if htf else None
+            htf_span = timeframe_ns(htf) if htf else 0
+            htf_next = 0
+            group_ts = None
+            group = {}
+            for k in order:
+                ts_ns = int(ts_all[k])
+                if ts_ns != group_ts:
+                    if group:
+                        self._on_bar_group(group, group_ts + span)
+                    group_ts, group = ts_ns, {}
+                    while htf and htf_next < len(htf_cols['ts_ns']) and int(htf_cols['ts_ns'][htf_next]) + htf_span <= ts_ns:
+                        self.alpha3.on_htf_bar(self.alpha3.symbol, htf, _bar_at(htf_cols, htf_next))
+                        htf_next += 1
+                sym = symbols[sym_all[k]]
+                group[sym] = _bar_at(series[sym_all[k]], int(row_all[k]))
+            if group:
+                self._on_bar_group(group, group_ts + span)
+        finally:
+            self.finish(out_dir)
+
+    def _on_bar_group(self, group, close_ns):
+        """Completed bars that closed at close_ns, one per symbol."""
+        ts = format_iso_ns(close_ns)
+        for sym, bar in group.items():
+            self.last_close[sym] = bar['close']
+            self.portfolio.mark(sym, bar['close'], close_ns)
+        ev = {'ts': ts}
+        if self.pairs_book is not None:
+            for sym, bar in group.items():
+                self.screener.on_bar(sym, '1min', bar)
+            self.screener.flush()
+            for pair in list(self.pairs_book.alphas):
+                bar_a, bar_b = group.get(pair[0]), group.get(pair[1])
+                if bar_a and bar_b:
+                    sig = self._alpha1_on_pair(pair, bar_a, bar_b, ts)
+                    if sig:
+                        self._process_signal(sig, ev)
+        else:
+            bar_a = group.get(self.alpha1.symbol_a)
+            bar_b = group.get(self.alpha1.symbol_b)
+            if bar_a and bar_b:
+                sig = self._alpha1_on_bar(bar_a, bar_b, ts)
+                if sig:
+                    self._process_signal(sig, ev)
+        bar2 = group.get(self.alpha2.symbol)
+        if bar2:
+            sig2 = self._alpha2_on_bar(bar2, ts)
+            if sig2:
+                self._process_signal(sig2, ev)
+        bar3 = group.get(self.alpha3.symbol)
+        if bar3:
+            sig3 = self._alpha3_on_bar(bar3, ts)
+            if sig3:
+                self._process_signal(sig3, ev)
+        snapshot = {s: group.get(s) for s in self.alpha4.symbols}
+        if any(snapshot.values()):
+            sig4 = self._alpha4_on_bar(snapshot, ts)
+            if sig4:
+                self._process_signal(sig4, ev)
+
+    def on_event(self, ev):
+        """
+        Process one normalized market event (tick or l2_update).
+        Shared by the replay loop and the live ingestion pipeline.
+        """
+        # write raw event to market writer
+        self._write_market(ev)
+        # handle event types
+        mtype = ev.get('msg_type','tick')
+        if self.instr.enabled:
+            self.instr.incr('events.' + mtype)
+        ts = ev['ts']
+        if mtype == 'tick':
+            # ingest tick (timestamp parsed once, shared with the portfolio mark)
+            ts_ns = parse_iso_ns(ts)
+            self._ingest(ev, ts_ns)
+            self.portfolio.mark(ev['symbol'], float(ev['price']), ts_ns)
+            # run orderbook alpha if book available? no
+            # run breakout/mtf periodically via built bars: for simplicity, run all alphas when possible
+            # Build 1min bars and feed
+            bar = self._last_bar(ev['symbol'], timeframe='1min')
+            if self.pairs_book is not None:
+                # screened pairs: only the pairs containing the ticked symbol are re-evaluated
+                for pair in self.pairs_book.pairs_for(ev['symbol']):
+                    bar_a = self._last_bar(pair[0], timeframe='1min')
+                    bar_b = self._last_bar(pair[1], timeframe='1min')
+                    if bar_a and bar_b:
+                        sig = self._alpha1_on_pair(pair, bar_a, bar_b, ts)
+                        if sig:
+                            self._process_signal(sig, ev)
+            else:
                 # For alpha 1 pairs, need both bars for A and B; try to get last bars for both
-                bar_a = self.datahandler.get_last_bar(self.alpha1.symbol_a, timeframe='1min')
-                bar_b = self.datahandler.get_last_bar(self.alpha1.symbol_b, timeframe='1min')
+                bar_a = self._last_bar(self.alpha1.symbol_a, timeframe='1min')
+                bar_b = self._last_bar(self.alpha1.symbol_b, timeframe='1min')
                 if bar_a and bar_b:
-                    sig = self.alpha1.on_bar(bar_a, bar_b, ts)
+                    sig = self._alpha1_on_bar(bar_a, bar_b, ts)
                     if sig:
                         self._process_signal(sig, ev)
-                # alpha2 breakout operates on single symbol
-                bar2 = self.datahandler.get_last_bar(self.alpha2.symbol, timeframe='1min')
-                if bar2:
-                    sig2 = self.alpha2.on_bar(bar2, ts)
-                    if sig2:
-                        self._process_signal(sig2, ev)
-                # alpha3 uses minute bars
-                bar3 = self.datahandler.get_last_bar(self.alpha3.symbol, timeframe='1min')
-                if bar3:
-                    sig3 = self.alpha3.on_bar_minute(bar3, ts)
-                    if sig3:
-                        self._process_signal(sig3, ev)
-                # alpha4 uses bars snapshot
-                bars = {s: self.datahandler.get_last_bar(s, timeframe='1min') for s in self.alpha4.symbols}
-                if any(bars.values()):
-                    sig4 = self.alpha4.on_bar(bars, ts)
-                    if sig4:
-                        self._process_signal(sig4, ev)
-            elif mtype == 'l2_update':
-                # pass to orderbook alpha
-                book = {'bids': ev.get('bids',[]), 'asks': ev.get('asks',[])}
-                sig5 = self.alpha5.on_book(book, ts)
-                if sig5:
-                    self._process_signal(sig5, ev)
+            # alpha2 breakout operates on single symbol
+            bar2 = self._last_bar(self.alpha2.symbol, timeframe='1min')
+            if bar2:
+                sig2 = self._alpha2_on_bar(bar2, ts)
+                if sig2:
+                    self._process_signal(sig2, ev)
+            # alpha3 uses minute bars
+            bar3 = self._last_bar(self.alpha3.symbol, timeframe='1min')
+            if bar3:
+                sig3 = self._alpha3_on_bar(bar3, ts)
+                if sig3:
+                    self._process_signal(sig3, ev)
+            # alpha4 uses bars snapshot
+            bars = {s: self._last_bar(s, timeframe='1min') for s in self.alpha4.symbols}
+            if any(bars.values()):
+                sig4 = self._alpha4_on_bar(bars, ts)
+                if sig4:
+                    self._process_signal(sig4, ev)
+        elif mtype == 'l2_update':
+            # pass to orderbook alpha
+            book = {'bids': ev.get('bids',[]), 'asks': ev.get('asks',[])}
+            sig5 = self._alpha5_on_book(book, ts)
+            if sig5:
+                self._process_signal(sig5, ev)
 
+    def finish(self, out_dir):
+        """Flush and close writers, then save metadata for reporting."""
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.screener is not None and self.screener.late_bars:
+            logger.warning('Pair screener skipped %d late 1min bars (older than its current row)', self.screener.late_bars)
+        for w in (self.market_writer, self.order_writer, self.fill_writer, self.equity_writer):
+            if w is not None:
+                w.close()
+        if out_dir is None:
+            return
         # after replay, save metadata and portfolio data for reporting
         meta = {
             'exec_model': self.exec_model.snapshot(),
@@ -130,6 +337,10 @@ class BacktestEngine:
         save_json_path = os.path.join(out_dir, 'replay_metadata.json')
         with open(save_json_path, 'w') as f:
             json.dump(meta, f, indent=2)
+        if self.instr.enabled:
+            self.instr.dump(os.path.join(out_dir, 'instrumentation.json'))
+        if self.metrics is not None:
+            self.metrics.dump(os.path.join(out_dir, 'metrics.json'))
 
     def _process_signal(self, sig, ev):
         """
@@ -138,6 +349,7 @@ class BacktestEngine:
         """
         alpha = sig.get('alpha','unknown')
         ts = sig.get('ts', ev.get('ts'))
+        self.instr.incr('signals.' + alpha)
         if alpha == 'alpha_1_pairs':
             # pair trade: map signal to two market orders at current top_price (last tick price)
             symbol_a, symbol_b = sig['symbols']
@@ -149,13 +361,18 @@ class BacktestEngine:
             lb = self._last_tick_price(symbol_b)
             if la is None or lb is None:
                 return
-            if sig['signal'] == 'short_a_long_b':
-                # short A -> sell A; long B -> buy B
-                self.order_manager.submit_market_order(alpha, symbol_a, 'sell', sig['size'], la, ts)
-                self.order_manager.submit_market_order(alpha, symbol_b, 'buy', sig['size'], lb, ts)
-            elif sig['signal'] == 'long_a_short_b':
-                self.order_manager.submit_market_order(alpha, symbol_a, 'buy', sig['size'], la, ts)
-                self.order_manager.submit_market_order(alpha, symbol_b, 'sell', sig['size'], lb, ts)
+            if sig['signal'] in ('short_a_long_b', 'long_a_short_b'):
+                # short A -> sell A; long B -> buy B (and vice versa); B is hedged with size * hedge_ratio
+                # units, rounded to the nearest lot, on the opposite side unless the ratio is negative
+                side_a, side_b = ('sell', 'buy') if sig['signal'] == 'short_a_long_b' else ('buy', 'sell')
+                hedge = sig.get('hedge_ratio', 1.0)
+                if hedge < 0:
+                    side_b = side_a
+                lot = self.exec_model.lot_size
+                size_b = round(sig['size'] * abs(hedge) / lot) * lot
+                self._order(alpha, symbol_a, side_a, sig['size'], la, ts)
+                if size_b:
+                    self._order(alpha, symbol_b, side_b, size_b, lb, ts)
             elif sig['signal'] == 'exit':
                 # exit logic omitted as a no-op for deterministic example
                 pass
@@ -170,11 +387,23 @@ class BacktestEngine:
                 'buy_aggressive':'buy','sell_aggressive':'sell'
             }
             side = side_map.get(sig.get('signal'), 'buy')
-            self.order_manager.submit_market_order(alpha, symbol, side, sig.get('size',1), top_price, ts)
+            self._order(alpha, symbol, side, sig.get('size',1), top_price, ts)
+
+    def _order(self, alpha, symbol, side, size, top_price, ts):
+        fill = self._submit_order(alpha, symbol, side, size, top_price, ts)
+        self.portfolio.apply_fill(fill, alpha)
+        return fill
 
     def _last_tick_price(self, symbol):
-        # quick lookup from datahandler buffers
-        buf = self.datahandler.tick_buffers.get(symbol, [])
-        if not buf:
-            return None
-        return buf[-1]['price']
+        # last ingested tick price, else the last bar close (bar mode)
+        price = self.datahandler.last_prices.get(symbol)
+        return self.last_close.get(symbol) if price is None else price
+
+def _discard(obj):
+    pass
+
+def _bar_at(cols, i):
+    ts_ns = int(cols['ts_ns'][i])
+    return {'open': float(cols['open'][i]), 'high': float(cols['high'][i]), 'low': float(cols['low'][i]),
+            'close': float(cols['close'][i]), 'volume': float(cols['volume'][i]),
+            'ts_ns': ts_ns, 'ts': format_bar_ts(ts_ns)}
@@ -1,8 +1,51 @@
-import quantstats as qs
+import os
 import pandas as pd
+from framework.ndjson import iter_ndjson, resolve_log_path
+from framework.portfolio import Portfolio
+from framework.metrics import OnlineMetrics
+from framework.timestamps import parse_iso_ns
+
+def equity_series(replay_dir, initial_cash=100000.0, sample_interval='1min'):
+    """
+    Mark-to-market equity curve of a replay, as a pandas.Series indexed by sample time.
+    Read from the run's equity_curve.ndjson; replay dirs written before it existed are rebuilt from
+    market_replayed + fill_log (positions marked at the last tick price, same sampling as the run).
+    """
+    path = resolve_log_path(os.path.join(replay_dir, 'equity_curve.ndjson'))
+    if os.path.exists(path):
+        samples = list(iter_ndjson(path))
+    else:
+        samples = _rebuild_equity(replay_dir, initial_cash, sample_interval)
+    if not samples:
+        return pd.Series(dtype=float)
+    idx = pd.to_datetime([s['ts'] for s in samples])
+    return pd.Series([s['equity'] for s in samples], index=idx, name='equity')
+
+def _rebuild_equity(replay_dir, initial_cash, sample_interval):
+    samples = []
+    metrics = OnlineMetrics(initial_cash, sample_interval=sample_interval, equity_writer=samples.append)
+    pf = Portfolio(initial_cash=initial_cash, metrics=metrics)
+    fills = iter_ndjson(resolve_log_path(os.path.join(replay_dir, 'fill_log.ndjson')))
+    pending = next(fills, None)
+    for ev in iter_ndjson(resolve_log_path(os.path.join(replay_dir, 'market_replayed.ndjson'))):
+        if ev.get('msg_type', 'tick') != 'tick':
+            continue
+        ts_ns = parse_iso_ns(ev['ts'])
+        # fills up to this timestamp; applying one before (rather than after) a same-timestamp mark
+        # leaves the equity after both unchanged, so sampled periods match the run
+        while pending is not None and parse_iso_ns(pending['ts']) <= ts_ns:
+            pf.apply_fill(pending)
+            pending = next(fills, None)
+        pf.mark(ev['symbol'], float(ev['price']), ts_ns)
+    while pending is not None:
+        pf.apply_fill(pending)
+        pending = next(fills, None)
+    metrics.close()
+    return samples
 
 def generate_report(equity_series, out_html="results/quantstats.html"):
     """
     equity_series: pandas.Series indexed by datetime with equity values (floats)
     """
+    import quantstats as qs
     qs.reports.html(equity_series, out_html)
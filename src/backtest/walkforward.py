@@ -0,0 +1,207 @@
+"""
+Walk-forward optimization over cached bars.
+The market log is turned into bars once (framework.bar_cache); folds are rolling [train | test]
+windows over those bars (zero-copy slices of the memory-mapped columns):
+- each train window is optimized with optuna (seeded TPE) when it is installed, otherwise with a
+  seeded random search over the same space; every trial is a summary-only bar-mode run (no logs)
+- the best trial's engine continues straight into the test window with a fresh portfolio, so the
+  out-of-sample run keeps the alphas' warm state instead of replaying a warm-up period
+- folds run concurrently in a process pool; the parent hashes the log and builds the cache entry
+  once, and workers map that entry by key, so overlapping fold windows share one copy of the bars
+  through the page cache rather than re-reading or copying them
+Alpha state is not carried across folds or between trials: every trial starts cold at its train
+window start (the test window is the only part that runs warm).
+Parameter space (walkforward.params), keyed by dotted config path:
+  alphas.alpha_3_mtf.fast: [5, 8, 13]               # choices
+  alphas.alpha_3_mtf.slow: {low: 20, high: 60, step: 2}
+"""
+import copy, json, os, random
+from concurrent.futures import ProcessPoolExecutor
+from framework.bars import timeframe_ns
+from framework.logger import setup_logger
+from framework.run_registry import flatten_metrics
+from framework.timestamps import format_iso_ns
+
+logger = setup_logger('walkforward')
+BASE_TF = '1min'
+
+def make_folds(start_ns, end_ns, train, test, step=None):
+    """Rolling windows [(train_start, train_end, test_end)] fully inside [start_ns, end_ns)."""
+    train_ns, test_ns = timeframe_ns(train), timeframe_ns(test)
+    step_ns = timeframe_ns(step) if step else test_ns
+    folds = []
+    t = start_ns
+    while t + train_ns + test_ns <= end_ns:
+        folds.append((t, t + train_ns, t + train_ns + test_ns))
+        t += step_ns
+    return folds
+
+def bars_span(bars, timeframe=BASE_TF):
+    """[first bar start, last bar end) over all symbols."""
+    starts = [c[timeframe]['ts_ns'] for c in bars.values() if len(c[timeframe]['ts_ns'])]
+    if not starts:
+        return None
+    return min(int(s[0]) for s in starts), max(int(s[-1]) for s in starts) + timeframe_ns(timeframe)
+
+def slice_bars(bars, lo, hi):
+    """Bars that end after lo and start before hi, per symbol/timeframe (views, no copies)."""
+    out = {}
+    for sym, by_tf in bars.items():
+        out[sym] = {}
+        for tf, cols in by_tf.items():
+            ts = cols['ts_ns']
+            i = int(ts.searchsorted(lo - timeframe_ns(tf), side='right'))
+            j = int(ts.searchsorted(hi, side='left'))
+            out[sym][tf] = {c: a[i:j] for c, a in cols.items()}
+    return out
+
+def apply_params(cfg, params):
+    cfg = copy.deepcopy(cfg)
+    for path, value in params.items():
+        node = cfg
+        keys = path.split('.')
+        for k in keys[:-1]:
+            node = node.setdefault(k, {})
+        node[keys[-1]] = value
+    return cfg
+
+def _is_int(spec):
+    return all(isinstance(spec.get(k, 1), int) for k in ('low', 'high', 'step'))
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = rng.choice(spec)
+        elif _is_int(spec):
+            params[name] = rng.randrange(spec['low'], spec['high'] + 1, spec.get('step', 1))
+        else:
+            params[name] = rng.uniform(spec['low'], spec['high'])
+    return params
+
+def suggest_params(trial, space):
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = trial.suggest_categorical(name, spec)
+        elif _is_int(spec):
+            params[name] = trial.suggest_int(name, spec['low'], spec['high'], step=spec.get('step', 1))
+        else:
+            params[name] = trial.suggest_float(name, spec['low'], spec['high'], log=spec.get('log', False))
+    return params
+
+def run_window(cfg, bars, engine=None):
+    """Summary-only bar-mode run; pass an engine to continue with its (warm) alpha state."""
+    from backtest.engine import BacktestEngine
+    if engine is None:
+        engine = BacktestEngine(cfg)
+    else:
+        engine.reset_portfolio()
+    engine.run_bars(bars, None)
+    return engine, engine.metrics.summary()
+
+def objective_value(summary, objective):
+    return flatten_metrics(summary).get(objective, float('nan'))
+
+def _better(value, incumbent, maximize):
+    if value != value:
+        return False
+    if incumbent != incumbent:
+        return True
+    return value > incumbent if maximize else value < incumbent
+
+def run_fold(job):
+    """One fold: optimize on the train window, evaluate the warm best engine on the test window."""
+    from framework.bar_cache import load_bars
+    cfg, wcfg = job['cfg'], job['cfg'].get('walkforward', {})
+    train_start, train_end, test_end = job['fold']
+    bars = job.get('bars')
+    if bars is None:
+        bars = load_bars(cfg, job['market_log'], key=job['cache_key'])
+    train_bars = slice_bars(bars, train_start, train_end)
+    space = wcfg.get('params', {})
+    objective = wcfg.get('objective', 'sharpe')
+    maximize = wcfg.get('direction', 'maximize') == 'maximize'
+    seed = cfg.get('seed', 0) + job['index']
+    n_trials = job['n_trials'] if space else 1
+    best = {'n': 0}
+
+    def evaluate(params):
+        engine, summary = run_window(apply_params(cfg, params), train_bars)
+        value = objective_value(summary, objective)
+        best['n'] += 1
+        # only the best engine is kept (its alpha state seeds the test window); nan ranks last
+        if 'value' not in best or _better(value, best['value'], maximize):
+            best.update(value=value, params=params, engine=engine)
+        return value
+
+    try:
+        import optuna
+    except ImportError:
+        optuna = None
+    if optuna is not None and space:
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(direction='maximize' if maximize else 'minimize',
+                                    sampler=optuna.samplers.TPESampler(seed=seed))
+        study.optimize(lambda t: evaluate(suggest_params(t, space)), n_trials=n_trials)
+    else:
+        rng = random.Random(seed)
+        for _ in range(n_trials):
+            evaluate(sample_params(space, rng))
+    best_value, best_params, best_engine = best['value'], best['params'], best['engine']
+    _, test_summary = run_window(None, slice_bars(bars, train_end, test_end), engine=best_engine)
+    return {
+        'fold': job['index'],
+        'train': [format_iso_ns(train_start), format_iso_ns(train_end)],
+        'test': [format_iso_ns(train_end), format_iso_ns(test_end)],
+        'trials': best['n'],
+        'best_params': best_params,
+        'train_objective': best_value,
+        'test_objective': objective_value(test_summary, objective),
+        'test_metrics': test_summary,
+    }
+
+def walk_forward(cfg, market_log, out_dir=None, workers=None, n_trials=None, registry=None):
+    """Run all folds (concurrently when workers > 1); writes walkforward.json into out_dir if given."""
+    from framework.bar_cache import bars_key, load_bars, open_bar_cache
+    wcfg = cfg.get('walkforward', {})
+    # hash the log and build (or hit) the cache entry once in the parent; workers open it by key
+    if open_bar_cache(cfg) is not None:
+        key = bars_key(cfg, market_log, registry=registry)
+        bars = load_bars(cfg, market_log, key=key)
+        shared = {'cache_key': key}
+    else:
+        bars = load_bars(cfg, market_log)
+        shared = {'bars': bars}  # no cache to map: workers get pickled copies
+    span = bars_span(bars)
+    folds = make_folds(*span, wcfg.get('train', '1D'), wcfg.get('test', '6H'), wcfg.get('step')) if span else []
+    if not folds:
+        raise ValueError(f"market log {market_log} is too short for train={wcfg.get('train')} test={wcfg.get('test')}")
+    n_trials = n_trials or wcfg.get('n_trials', 20)
+    workers = workers or wcfg.get('workers') or 1
+    jobs = [dict(shared, cfg=cfg, market_log=market_log, fold=f, index=i, n_trials=n_trials)
+            for i, f in enumerate(folds)]
+    logger.info('Walk-forward: %d folds x %d trials, %d workers', len(folds), n_trials, workers)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            results = list(ex.map(run_fold, jobs))
+    else:
+        results = [run_fold(dict(job, bars=bars)) for job in jobs]
+    test_values = [r['test_objective'] for r in results if r['test_objective'] == r['test_objective']]
+    compounded = 1.0
+    for r in results:
+        compounded *= 1.0 + r['test_metrics']['total_return']
+    out = {
+        'objective': wcfg.get('objective', 'sharpe'),
+        'folds': results,
+        'summary': {
+            'folds': len(results),
+            'test_objective_mean': sum(test_values) / len(test_values) if test_values else None,
+            'test_total_return': compounded - 1.0,
+        },
+    }
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, 'walkforward.json'), 'w') as f:
+            json.dump(out, f, indent=2, default=str)
+    return out
@@ -0,0 +1,193 @@
+"""
+Content-addressed on-disk bar cache.
+Bars derived from a market log are stored per entry in one packed file, bars.bin: every
+(symbol, timeframe, column) array (ts_ns int64; open/high/low/close/volume float64; indicator
+columns float64) at an aligned offset listed in the manifest. A hit maps the file once and hands
+out column views into that single memmap, so repeated runs share the page cache instead of
+re-parsing ticks, and an entry costs one file descriptor however many symbols it holds.
+- key: market-log content fingerprint + bar spec (timeframes, session_start, indicators, format version)
+- entries are written to a temp dir and renamed into place, so readers never see partial entries
+- the cache is bounded by max_bytes; least recently used entries (manifest mtime, touched on
+  every hit) are evicted first
+"""
+import json, os, shutil, time, uuid
+import numpy as np
+from framework.bars import BarRollup, sort_timeframes
+from framework.ndjson import iter_ndjson
+from framework.run_registry import file_fingerprint, input_key
+from framework.timestamps import parse_iso_ns
+
+FORMAT_VERSION = 2
+COLUMNS = ('ts_ns', 'open', 'high', 'low', 'close', 'volume')
+MANIFEST = 'manifest.json'
+DATA = 'bars.bin'
+_ALIGN = 64
+
+def bar_spec_key(market_fp, timeframes, session_start='00:00', indicators=()):
+    return input_key('bars', market_fp, ','.join(sort_timeframes(timeframes)), session_start or '00:00',
+                     ','.join(sorted(indicators)), FORMAT_VERSION)
+
+def bars_to_columns(bars):
+    """List of bar dicts -> {column: ndarray}."""
+    cols = {'ts_ns': np.fromiter((b['ts_ns'] for b in bars), dtype=np.int64, count=len(bars))}
+    for c in COLUMNS[1:]:
+        cols[c] = np.fromiter((b[c] for b in bars), dtype=np.float64, count=len(bars))
+    return cols
+
+def build_bars(market_log, timeframes, session_start='00:00', workers=None, indicators=None):
+    """
+    One streaming pass over the market log -> {symbol: {timeframe: {column: ndarray}}}, same rollup as DataHandler.
+    indicators: {name: fn(columns) -> ndarray of the same length}, added as extra columns per symbol/timeframe.
+    """
+    rollups = {}
+    tfs = sort_timeframes(timeframes)
+    for ev in iter_ndjson(market_log, workers=workers):
+        if ev.get('msg_type', 'tick') != 'tick' or 'price' not in ev:
+            continue
+        sym = ev['symbol']
+        rollup = rollups.get(sym)
+        if rollup is None:
+            rollup = rollups[sym] = BarRollup(tfs, session_start)
+        rollup.update(parse_iso_ns(ev['ts']), float(ev['price']), float(ev.get('size', 0.0)))
+    out = {sym: {tf: bars_to_columns(r.bars(tf)) for tf in tfs} for sym, r in rollups.items()}
+    for name, fn in (indicators or {}).items():
+        for by_tf in out.values():
+            for cols in by_tf.values():
+                cols[name] = np.asarray(fn(cols), dtype=np.float64)
+    return out
+
+class BarCache:
+    def __init__(self, root, max_bytes=2 << 30):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        os.makedirs(root, exist_ok=True)
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """{symbol: {timeframe: {column: memmap}}} or None on a miss."""
+        path = self.entry_dir(key)
+        manifest_path = os.path.join(path, MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        _touch(manifest_path)
+        if not manifest['bytes']:
+            return {sym: {tf: {c: np.empty(0, dtype=d) for c, (_, _, d) in cols.items()} for tf, cols in by_tf.items()}
+                    for sym, by_tf in manifest['arrays'].items()}
+        # one mapping (and one file descriptor) for the whole entry; columns are views into it
+        buf = np.memmap(os.path.join(path, DATA), dtype=np.uint8, mode='r')
+        out = {}
+        for sym, by_tf in manifest['arrays'].items():
+            out[sym] = {tf: {c: buf[off:off + n * np.dtype(d).itemsize].view(d) for c, (off, n, d) in cols.items()}
+                        for tf, cols in by_tf.items()}
+        return out
+
+    def put(self, key, bars, meta=None):
+        """Store {symbol: {timeframe: {column: array}}} under key; returns the entry dir."""
+        final = self.entry_dir(key)
+        if os.path.exists(os.path.join(final, MANIFEST)):
+            return final
+        tmp = os.path.join(self.root, f".tmp-{key}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(tmp)
+        # arrays: {symbol: {timeframe: {column: [offset, length, dtype]}}} into bars.bin
+        manifest = {'version': FORMAT_VERSION, 'meta': meta or {}, 'arrays': {}}
+        size = 0
+        with open(os.path.join(tmp, DATA), 'wb') as f:
+            for sym, by_tf in sorted(bars.items()):
+                manifest['arrays'][sym] = {}
+                for tf, cols in by_tf.items():
+                    manifest['arrays'][sym][tf] = {}
+                    for c, arr in cols.items():
+                        arr = np.ascontiguousarray(arr)
+                        pad = -size % _ALIGN
+                        f.write(b'\0' * pad)
+                        size += pad
+                        manifest['arrays'][sym][tf][c] = [size, len(arr), arr.dtype.str]
+                        f.write(arr.tobytes())
+                        size += arr.nbytes
+        manifest['bytes'] = size
+        with open(os.path.join(tmp, MANIFEST), 'w') as f:
+            json.dump(manifest, f)
+        _touch(os.path.join(tmp, MANIFEST))
+        try:
+            os.replace(tmp, final)
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+        return final
+
+    def get_or_build(self, key, builder, meta=None):
+        bars = self.get(key)
+        if bars is None:
+            self.put(key, builder(), meta=meta)
+            bars = self.get(key)
+        return bars
+
+    def entries(self):
+        """[(last_used_ns, bytes, key)] for complete entries, oldest first."""
+        out = []
+        for key in os.listdir(self.root):
+            manifest_path = os.path.join(self.root, key, MANIFEST)
+            if key.startswith('.') or not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path) as f:
+                size = json.load(f).get('bytes', 0)
+            out.append((os.stat(manifest_path).st_mtime_ns, size, key))
+        return sorted(out)
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            total -= size
+        return total
+
+def _touch(path):
+    # LRU clock: explicit ns timestamp (filesystem clocks are too coarse to order quick successive hits)
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+def open_bar_cache(cfg):
+    """BarCache from storage.bar_cache, or None when it is disabled (null)."""
+    storage = cfg.get('storage', {})
+    ccfg = storage.get('bar_cache', {})
+    if ccfg is None or ccfg is False:
+        return None
+    root = ccfg.get('path') or os.path.join(storage.get('base_path', 'results'), 'bar_cache')
+    return BarCache(root, max_bytes=ccfg.get('max_bytes', 2 << 30))
+
+def load_bars(cfg, market_log, registry=None, workers=None, indicators=None, key=None):
+    """
+    Bars for the configured spec, from the cache when possible (built and stored on a miss).
+    indicators ({name: fn(columns) -> ndarray}, see build_bars) are computed on a miss and cached
+    with the bars; the key covers their names and the package source, not the callables.
+    key: precomputed bars_key(...) for this log and spec, skipping the fingerprint.
+    """
+    bcfg = cfg.get('bars', {})
+    build = lambda: build_bars(market_log, bcfg.get('timeframes', ['1min']), bcfg.get('session_start', '00:00'),
+                               workers=workers, indicators=indicators)
+    cache = open_bar_cache(cfg)
+    if cache is None:
+        return build()
+    if key is None:
+        key = bars_key(cfg, market_log, registry=registry, indicators=indicators)
+    return cache.get_or_build(key, build, meta={'market_log': os.path.abspath(market_log)})
+
+def bars_key(cfg, market_log, registry=None, indicators=None):
+    """
+    Cache key of a market log's bars under cfg's bar spec. Hashes the log (unless the registry has
+    its fingerprint), so callers fanning out to workers compute it once and pass it along.
+    """
+    bcfg = cfg.get('bars', {})
+    market_fp = registry.fingerprint(market_log) if registry is not None else file_fingerprint(market_log)
+    return bar_spec_key(market_fp, bcfg.get('timeframes', ['1min']), bcfg.get('session_start', '00:00'), indicators or ())
@@ -0,0 +1,183 @@
+"""
+Incremental hierarchical bar rollups.
+Ticks build the base (smallest) timeframe; every higher timeframe is built from completed
+lower-timeframe bars (1min -> 5min -> 1H -> 1D) instead of re-resampling raw ticks.
+Alignment:
+- intraday buckets restart at every session start (session_start, UTC), so a bar never spans a
+  session boundary even when the timeframe does not divide the session length
+- daily-or-longer buckets are aligned to session_start
+- each timeframe must be a multiple of the one below it so buckets nest
+Times are integer epoch nanoseconds (framework.timestamps), so bucketing is integer arithmetic.
+Bars are dicts with open/high/low/close/volume, 'ts_ns' (bucket start) and 'ts' (the same instant
+as ISO-8601 with +00:00, formatted once per bucket and cached on the level), matching
+DataHandler.get_last_bar. current() is built once per tick and shared until the next update, so
+callers must treat returned bars as read-only.
+Completed bars are kept per level up to `history` (None = all, e.g. for one-off batch builds), so a
+long-running rollup stays bounded.
+"""
+import re
+from collections import deque
+from datetime import timedelta
+from framework.timestamps import format_bar_ts
+
+DAY_NS = 86400 * 1_000_000_000
+_UNITS = {'s': 1, 'S': 1, 'sec': 1, 'min': 60, 'T': 60, 'h': 3600, 'H': 3600, 'D': 86400, 'd': 86400, 'W': 604800}
+_TF_RE = re.compile(r'^(\d*)([A-Za-z]+)$')
+
+def parse_timeframe(tf):
+    """Pandas-style timeframe string ('1min', '5min', '1H', '1D', '30s') -> timedelta."""
+    m = _TF_RE.match(tf.strip())
+    if not m or m.group(2) not in _UNITS:
+        raise ValueError(f"unsupported timeframe {tf!r}")
+    return timedelta(seconds=int(m.group(1) or 1) * _UNITS[m.group(2)])
+
+def timeframe_ns(tf):
+    return int(parse_timeframe(tf).total_seconds()) * 1_000_000_000
+
+def parse_session_start(value):
+    """'HH:MM' (UTC) -> ns offset from midnight."""
+    hh, mm = (value or '00:00').split(':')
+    return (int(hh) * 3600 + int(mm) * 60) * 1_000_000_000
+
+def sort_timeframes(timeframes):
+    tfs = sorted(set(timeframes), key=parse_timeframe)
+    for lo, hi in zip(tfs, tfs[1:]):
+        if parse_timeframe(hi) % parse_timeframe(lo):
+            raise ValueError(f"timeframe {hi} is not a multiple of {lo}; rollup buckets would not nest")
+    return tfs
+
+class _Level:
+    __slots__ = ('tf', 'span', 'start', 'bar', 'history', '_ts_start', '_ts')
+
+    def __init__(self, tf, span, history=None):
+        self.tf = tf
+        self.span = span
+        self.start = None   # bucket start (epoch ns) of the forming bar
+        self.bar = None     # forming bar built from completed children (or ticks for the base level)
+        self.history = deque(maxlen=history)  # most recent completed bars
+        self._ts_start = None
+        self._ts = None
+
+    def stamp(self, start):
+        """ISO 'ts' for bucket `start`, formatted once per bucket."""
+        if start != self._ts_start:
+            self._ts_start, self._ts = start, format_bar_ts(start)
+        return self._ts
+
+class BarRollup:
+    """
+    Multi-timeframe bars for one symbol.
+    update(ts_ns, price, size) returns the list of (timeframe, bar) completed by this tick,
+    lowest timeframe first.
+    """
+    def __init__(self, timeframes=('1min',), session_start='00:00', history=None):
+        self.timeframes = sort_timeframes(timeframes)
+        self.session_offset = parse_session_start(session_start) if isinstance(session_start, str) else int(session_start)
+        self.levels = [_Level(tf, timeframe_ns(tf), history) for tf in self.timeframes]
+        self._by_tf = {lvl.tf: i for i, lvl in enumerate(self.levels)}
+        self._current = {}  # timeframe -> forming bar, valid until the next update
+        self.late_ticks = 0
+
+    def bucket(self, ts, span):
+        off = self.session_offset
+        if span >= DAY_NS:
+            return ts - (ts - off) % span
+        session = ts - (ts - off) % DAY_NS
+        return ts - (ts - session) % span
+
+    def update(self, ts, price, size):
+        completed = []
+        if self._current:
+            self._current.clear()
+        base = self.levels[0]
+        start = self.bucket(ts, base.span)
+        if base.start is not None and start != base.start:
+            if start < base.start:
+                # out-of-order tick for an already completed bucket: not folded into bars
+                self.late_ticks += 1
+                return completed
+            self._close(0, completed)
+            for i in range(1, len(self.levels)):
+                lvl = self.levels[i]
+                if self.bucket(ts, lvl.span) == lvl.start:
+                    break
+                self._close(i, completed)
+        if base.bar is None:
+            base.start = start
+            base.stamp(start)
+            base.bar = {'open': price, 'high': price, 'low': price, 'close': price, 'volume': size}
+        else:
+            b = base.bar
+            if price > b['high']:
+                b['high'] = price
+            if price < b['low']:
+                b['low'] = price
+            b['close'] = price
+            b['volume'] += size
+        return completed
+
+    def _close(self, i, completed):
+        lvl = self.levels[i]
+        bar = dict(lvl.bar)
+        bar['ts_ns'] = lvl.start
+        bar['ts'] = lvl.stamp(lvl.start)
+        lvl.history.append(bar)
+        completed.append((lvl.tf, bar))
+        start = lvl.start
+        lvl.bar = None
+        lvl.start = None
+        if i + 1 < len(self.levels):
+            self._fold(self.levels[i + 1], bar, start)
+
+    def _fold(self, lvl, child, child_start):
+        if lvl.bar is None:
+            lvl.start = self.bucket(child_start, lvl.span)
+            lvl.stamp(lvl.start)
+            lvl.bar = {'open': child['open'], 'high': child['high'], 'low': child['low'],
+                       'close': child['close'], 'volume': child['volume']}
+        else:
+            _merge_into(lvl.bar, child)
+
+    def current(self, timeframe):
+        """Forming bar for `timeframe`, including the in-progress lower-timeframe bars; None if no data."""
+        cached = self._current.get(timeframe)
+        if cached is not None:
+            return cached
+        i = self._by_tf[timeframe]
+        bar = None
+        start = None
+        # walk from the base level up: the in-progress child belongs to the parent's forming bucket
+        for lvl in self.levels[:i + 1]:
+            if lvl.bar is not None:
+                merged = dict(lvl.bar)
+                if bar is not None:
+                    _merge_into(merged, bar)
+                bar, start = merged, lvl.start
+            elif bar is not None:
+                start = self.bucket(start, lvl.span)
+        if bar is None:
+            return None
+        bar['ts_ns'] = start
+        bar['ts'] = self.levels[i].stamp(start)
+        self._current[timeframe] = bar
+        return bar
+
+    def completed(self, timeframe):
+        return self.levels[self._by_tf[timeframe]].history
+
+    def bars(self, timeframe):
+        """All kept bars for `timeframe` (completed + forming), oldest first."""
+        cur = self.current(timeframe)
+        bars = list(self.completed(timeframe))
+        if cur is not None:
+            bars.append(cur)
+        return bars
+
+def _merge_into(parent, child):
+    # parent is earlier in time than child
+    if child['high'] > parent['high']:
+        parent['high'] = child['high']
+    if child['low'] < parent['low']:
+        parent['low'] = child['low']
+    parent['close'] = child['close']
+    parent['volume'] += child['volume']
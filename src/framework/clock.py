@@ -1,22 +1,24 @@
-from datetime import timedelta, datetime, timezone
+from framework.timestamps import format_iso_ns, to_datetime, to_ns
 
 class Clock:
+    """
+    Simulation clock. Time is held as integer epoch nanoseconds (now_ns);
+    set/advance_to accept int ns, ISO strings or datetimes.
+    """
     def __init__(self):
-        self.now = None
+        self.now_ns = None
 
     def set(self, ts):
-        # ts: datetime (aware UTC) or ISO string
-        if isinstance(ts, str):
-            self.now = datetime.fromisoformat(ts.replace('Z','+00:00'))
-        else:
-            self.now = ts
+        # ts: int epoch ns, datetime (aware UTC) or ISO string
+        self.now_ns = to_ns(ts)
 
     def advance_to(self, ts):
         # set absolute time
-        if isinstance(ts, str):
-            self.now = datetime.fromisoformat(ts.replace('Z','+00:00'))
-        else:
-            self.now = ts
+        self.now_ns = to_ns(ts)
+
+    @property
+    def now(self):
+        return None if self.now_ns is None else to_datetime(self.now_ns)
 
     def iso(self):
-        return self.now.isoformat().replace('+00:00','Z')
+        return format_iso_ns(self.now_ns)
@@ -1,45 +1,94 @@
-import pandas as pd
-from collections import defaultdict
-import numpy as np
+from collections import defaultdict, deque
+from functools import partial
+from framework.bars import BarRollup, sort_timeframes
+from framework.timestamps import parse_iso_ns
 
 class DataHandler:
     """
-    Keeps tick buffers and can build bars deterministically.
+    Keeps tick buffers and builds bars deterministically.
+    Bars for the configured timeframes are maintained incrementally by a per-symbol BarRollup
+    (higher timeframes rolled up from completed lower-timeframe bars); any other timeframe gets its
+    own rollup on first request, seeded from the tick buffer and kept current by every later tick.
+    Tick timestamps are parsed to epoch ns once, on ingestion.
+    Memory is bounded for long (live) sessions: the last `history` ticks per symbol and completed
+    bars per timeframe are kept, plus the last price per symbol (last_prices).
     Stores bar_cache[symbol][timeframe] -> DataFrame
+    Subscribers registered with subscribe(symbol, timeframe, callback) receive
+    callback(symbol, timeframe, bar) for every completed bar.
     """
-    def __init__(self):
-        self.tick_buffers = defaultdict(list)
+    def __init__(self, timeframes=('1min',), session_start='00:00', history=10000):
+        self.history = history
+        self.tick_buffers = defaultdict(partial(deque, maxlen=history))
+        self.last_prices = {}
         self.bar_cache = defaultdict(dict)
+        self.timeframes = sort_timeframes(timeframes)
+        self.session_start = session_start
+        self.rollups = {}
+        self.adhoc_rollups = defaultdict(dict)  # symbol -> {timeframe: BarRollup} for unconfigured timeframes
+        self.subscribers = defaultdict(list)  # (symbol, timeframe) -> [callback]
 
-    def ingest_tick(self, tick):
-        # tick must have 'symbol' and 'ts' and 'price' and 'size'
+    def subscribe(self, symbol, timeframe, callback):
+        if timeframe not in self.timeframes:
+            if self.rollups:
+                raise ValueError(f"cannot add timeframe {timeframe} after ticks were ingested")
+            self.timeframes = sort_timeframes(self.timeframes + [timeframe])
+        self.subscribers[(symbol, timeframe)].append(callback)
+
+    def ingest_tick(self, tick, ts_ns=None):
+        # tick must have 'symbol' and 'ts' and 'price' and 'size'; ts_ns may be passed if already parsed
         sym = tick['symbol']
         self.tick_buffers[sym].append(tick)
+        self.last_prices[sym] = tick['price']
+        rollup = self.rollups.get(sym)
+        if rollup is None:
+            rollup = self.rollups[sym] = BarRollup(self.timeframes, self.session_start, self.history)
+        if ts_ns is None:
+            ts_ns = parse_iso_ns(tick['ts'])
+        price, size = float(tick['price']), float(tick.get('size', 0.0))
+        completed = rollup.update(ts_ns, price, size)
+        adhoc = self.adhoc_rollups.get(sym)
+        if adhoc:
+            for r in adhoc.values():
+                r.update(ts_ns, price, size)
+        if completed and self.subscribers:
+            for tf, bar in completed:
+                for cb in self.subscribers.get((sym, tf), ()):
+                    cb(sym, tf, bar)
 
     def build_bars(self, symbol, timeframe='1min'):
         # timeframe string pandas-compatible, e.g. '1min', '1H'
-        df = pd.DataFrame(self.tick_buffers[symbol])
-        if df.empty:
-            return None
-        # ensure datetime
-        df['ts'] = pd.to_datetime(df['ts'])
-        df = df.set_index('ts').sort_index()
-        if 'price' not in df.columns:
+        import pandas as pd
+        if timeframe in self.timeframes:
+            rollup = self.rollups.get(symbol)
+        else:
+            rollup = self._adhoc_rollup(symbol, timeframe)
+        if rollup is None:
             return None
-        ohlc = df['price'].resample(timeframe).ohlc()
-        vol = df['size'].resample(timeframe).sum().rename('volume')
-        bars = pd.concat([ohlc, vol], axis=1).dropna()
+        rows = rollup.bars(timeframe)
+        bars = pd.DataFrame(rows, columns=['ts_ns','open','high','low','close','volume'])
+        bars.index = pd.to_datetime(bars.pop('ts_ns'), unit='ns', utc=True)
+        bars.index.name = 'ts'
         self.bar_cache[symbol][timeframe] = bars
         return bars
 
+    def _adhoc_rollup(self, symbol, timeframe):
+        rollup = self.adhoc_rollups[symbol].get(timeframe)
+        if rollup is None:
+            ticks = [t for t in self.tick_buffers[symbol] if 'price' in t]
+            if not ticks:
+                return None
+            # seed from the buffer in timestamp order (stable for equal timestamps); ingest_tick keeps it current
+            keyed = sorted(((parse_iso_ns(t['ts']), i) for i, t in enumerate(ticks)))
+            rollup = BarRollup([timeframe], self.session_start, self.history)
+            for ts_ns, i in keyed:
+                rollup.update(ts_ns, float(ticks[i]['price']), float(ticks[i].get('size', 0.0)))
+            self.adhoc_rollups[symbol][timeframe] = rollup
+        return rollup
+
     def get_last_bar(self, symbol, timeframe='1min'):
-        if timeframe not in self.bar_cache[symbol]:
-            self.build_bars(symbol, timeframe)
-        bars = self.bar_cache[symbol].get(timeframe)
-        if bars is None or bars.empty:
-            return None
-        row = bars.iloc[-1]
-        # return dict with open/high/low/close/volume
-        return {'open': float(row['open']), 'high': float(row['high']),
-                'low': float(row['low']), 'close': float(row['close']),
-                'volume': float(row['volume']), 'ts': bars.index[-1].isoformat()}
+        # incremental path: the forming bar of the rollup, no rebuild
+        if timeframe in self.timeframes:
+            rollup = self.rollups.get(symbol)
+        else:
+            rollup = self._adhoc_rollup(symbol, timeframe)
+        return rollup.current(timeframe) if rollup is not None else None
@@ -0,0 +1,159 @@
+"""
+Low-overhead hot-path instrumentation.
+- Instrumentation.wrap(stage, fn) returns fn itself when disabled, so a disabled run pays nothing;
+  when enabled it returns a wrapper recording the call latency into a log2-bucketed histogram
+- counters for events/signals/orders
+- snapshot()/dump() produce a JSON document with count/mean/min/max/p50/p90/p99 per stage
+Stage timings are inclusive (e.g. 'order' includes the order/fill writes it triggers).
+Also holds the cProfile helpers used by `replay --profile`.
+"""
+import json, os, time
+
+_N_BUCKETS = 64
+
+class Histogram:
+    """Latency histogram in nanoseconds; bucket i holds values with bit_length i (constant memory)."""
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = [0] * _N_BUCKETS
+
+    def observe(self, ns):
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.buckets[min(ns.bit_length(), _N_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        # upper bound of the bucket containing the q-quantile, clipped to the observed max
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.buckets):
+            seen += c
+            if c and seen >= target:
+                return min((1 << i) - 1 if i else 0, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'total_ns': self.total,
+                'mean_ns': (self.total / self.count) if self.count else 0.0,
+                'min_ns': self.min or 0, 'max_ns': self.max,
+                'p50_ns': self.percentile(0.5), 'p90_ns': self.percentile(0.9), 'p99_ns': self.percentile(0.99),
+                'buckets_log2_ns': {str(i): c for i, c in enumerate(self.buckets) if c}}
+
+class Instrumentation:
+    """
+    Per-stage latency histograms and counters.
+    Disabled instances are inert: wrap() is the identity and incr()/observe() return immediately.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = bool(enabled)
+        self.histograms = {}
+        self.counters = {}
+        self._t0 = time.perf_counter_ns()
+
+    def histogram(self, stage):
+        h = self.histograms.get(stage)
+        if h is None:
+            h = self.histograms[stage] = Histogram()
+        return h
+
+    def wrap(self, stage, fn):
+        if not self.enabled:
+            return fn
+        observe = self.histogram(stage).observe
+        clock = time.perf_counter_ns
+        def timed(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(clock() - t0)
+        timed.__wrapped__ = fn
+        return timed
+
+    def observe(self, stage, ns):
+        if self.enabled:
+            self.histogram(stage).observe(ns)
+
+    def incr(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        return {'enabled': self.enabled,
+                'wall_ns': time.perf_counter_ns() - self._t0,
+                'stages': {k: h.to_dict() for k, h in sorted(self.histograms.items())},
+                'counters': dict(sorted(self.counters.items()))}
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+# shared disabled instance for callers that are not instrumented
+NULL_INSTRUMENTATION = Instrumentation(enabled=False)
+
+def _func_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        return name.strip('<>').replace(';', ',') or 'builtin'
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(';', ',')
+
+def write_folded_stacks(stats, path, max_depth=64):
+    """
+    Convert pstats.Stats into collapsed-stack lines ("root;child;leaf <usec>") understood by
+    flamegraph.pl / speedscope / inferno. cProfile only records caller->callee edges, so a callee's
+    time is split across its callers in proportion to the cumulative time of each edge.
+    """
+    raw = stats.stats
+    children = {}
+    for callee, (_cc, _nc, _tt, _ct, callers) in raw.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((callee, edge[3]))
+    roots = [f for f, v in raw.items() if not v[4]]
+    lines = {}
+    def walk(func, stack, share):
+        tt, ct = raw[func][2], raw[func][3]
+        stack = stack + [_func_label(func)]
+        self_us = int(tt * share * 1e6)
+        if self_us > 0:
+            key = ';'.join(stack)
+            lines[key] = lines.get(key, 0) + self_us
+        if len(stack) >= max_depth:
+            return
+        for child, edge_ct in children.get(func, ()):
+            child_ct = raw[child][3]
+            if child_ct <= 0 or _func_label(child) in stack:
+                continue
+            walk(child, stack, share * edge_ct / child_ct)
+    for r in roots:
+        walk(r, [], 1.0)
+    with open(path, 'w') as f:
+        for k, v in sorted(lines.items()):
+            f.write(f"{k} {v}\n")
+
+def run_profiled(fn, out_dir, *args, **kwargs):
+    """Run fn under cProfile; write profile.pstats, profile_top.txt and profile.folded into out_dir."""
+    import cProfile, io, pstats
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        os.makedirs(out_dir, exist_ok=True)
+        prof.dump_stats(os.path.join(out_dir, 'profile.pstats'))
+        stats = pstats.Stats(prof)
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats('cumulative').print_stats(50)
+        with open(os.path.join(out_dir, 'profile_top.txt'), 'w') as f:
+            f.write(buf.getvalue())
+        write_folded_stacks(stats, os.path.join(out_dir, 'profile.folded'))
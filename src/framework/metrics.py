@@ -0,0 +1,206 @@
+"""
+Online performance metrics, updated during a replay in constant memory (independent of run length):
+- equity is sampled once per `sample_interval` bucket; period returns feed Welford running
+  mean/variance and a downside sum of squares (Sharpe, Sortino, volatility); the still-open
+  period is included as a partial sample when summarizing
+- drawdown and drawdown duration are tracked on every equity update
+- with an equity_writer, each sampled period is also streamed out as {'ts', 'equity'} (the
+  mark-to-market equity curve the quantstats report is built from)
+- fills feed turnover, hit rate (share of position-reducing fills with positive realized P&L)
+  and per-alpha attribution (average-cost realized + mark-to-market unrealized P&L)
+Memory grows only with the number of alphas x symbols traded.
+"""
+import json, math, os
+from framework.bars import timeframe_ns
+from framework.timestamps import NS_PER_SEC, format_iso_ns
+
+SECONDS_PER_YEAR = 365 * 86400
+BUY_SIDES = ('buy','long','buy_aggressive')
+
+class _AlphaBook:
+    __slots__ = ('positions', 'avg_cost', 'realized', 'fees', 'fills', 'closing_fills', 'wins', 'notional')
+
+    def __init__(self):
+        self.positions = {}
+        self.avg_cost = {}
+        self.realized = 0.0
+        self.fees = 0.0
+        self.fills = 0
+        self.closing_fills = 0
+        self.wins = 0
+        self.notional = 0.0
+
+    def apply(self, symbol, qty, price, fee):
+        """qty is signed (+buy/-sell). Returns realized P&L of the reducing part, or None if nothing was reduced."""
+        self.fills += 1
+        self.fees += fee
+        self.notional += abs(qty) * price
+        pos = self.positions.get(symbol, 0.0)
+        avg = self.avg_cost.get(symbol, 0.0)
+        realized = None
+        if pos and (pos > 0) != (qty > 0):
+            closed = min(abs(qty), abs(pos))
+            realized = closed * (price - avg) * (1 if pos > 0 else -1) - fee
+            self.realized += realized + fee
+            self.closing_fills += 1
+            if realized > 0:
+                self.wins += 1
+        new_pos = pos + qty
+        if new_pos == 0:
+            self.avg_cost.pop(symbol, None)
+        elif pos == 0 or (pos > 0) != (new_pos > 0):
+            # opened, or flipped through zero: remaining size is at the fill price
+            self.avg_cost[symbol] = price
+        elif (pos > 0) == (qty > 0):
+            self.avg_cost[symbol] = (avg * abs(pos) + price * abs(qty)) / abs(new_pos)
+        self.positions[symbol] = new_pos
+        return realized
+
+    def unrealized(self, marks):
+        return sum(q * (marks.get(s, self.avg_cost.get(s, 0.0)) - self.avg_cost.get(s, 0.0))
+                   for s, q in self.positions.items() if q)
+
+class OnlineMetrics:
+    def __init__(self, initial_equity, sample_interval='1min', periods_per_year=None, equity_writer=None):
+        self.initial_equity = float(initial_equity)
+        self.equity_writer = equity_writer
+        self.sample_interval = sample_interval
+        self._span = timeframe_ns(sample_interval)
+        self.periods_per_year = periods_per_year or SECONDS_PER_YEAR * NS_PER_SEC / self._span
+        # sampling
+        self._bucket = None
+        self._last_sample_equity = float(initial_equity)
+        self.equity = float(initial_equity)
+        self.first_ts_ns = None
+        self.last_ts_ns = None
+        # return moments (Welford)
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._downside_sq = 0.0
+        self._equity_sum = 0.0
+        # drawdown
+        self._peak = float(initial_equity)
+        self._peak_ts = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_duration_ns = 0
+        # trading
+        self.traded_notional = 0.0
+        self.fills = 0
+        self.closing_fills = 0
+        self.wins = 0
+        self.alphas = {}
+        self.marks = {}
+
+    def on_equity(self, ts_ns, equity):
+        if self.first_ts_ns is None:
+            self.first_ts_ns = ts_ns
+            self._peak_ts = ts_ns
+        self.last_ts_ns = ts_ns
+        bucket = ts_ns - ts_ns % self._span
+        if self._bucket is None:
+            self._bucket = bucket
+        elif bucket != self._bucket:
+            # close the previous period with the last equity seen in it
+            self._add_return(self.equity)
+            self._write_sample()
+            self._bucket = bucket
+        self.equity = equity
+        if equity >= self._peak:
+            if self._peak_ts is not None and equity > self._peak:
+                self.max_drawdown_duration_ns = max(self.max_drawdown_duration_ns, ts_ns - self._peak_ts)
+            self._peak = equity
+            self._peak_ts = ts_ns
+        else:
+            dd = equity / self._peak - 1.0 if self._peak else 0.0
+            if dd < self.max_drawdown:
+                self.max_drawdown = dd
+
+    def _write_sample(self):
+        if self.equity_writer is not None:
+            self.equity_writer({'ts': format_iso_ns(self._bucket + self._span), 'equity': self.equity})
+
+    def close(self):
+        """Write the still-open period to the equity writer (end of run)."""
+        if self._bucket is not None:
+            self._write_sample()
+
+    def _add_return(self, equity):
+        self.n, self._mean, self._m2, self._downside_sq, self._equity_sum = self._moments(equity)
+        self._last_sample_equity = equity
+
+    def _moments(self, equity):
+        """Welford update with the period return ending at `equity`; returns the new state, no mutation."""
+        prev = self._last_sample_equity
+        r = equity / prev - 1.0 if prev else 0.0
+        n = self.n + 1
+        d = r - self._mean
+        mean = self._mean + d / n
+        return n, mean, self._m2 + d * (r - mean), self._downside_sq + (r * r if r < 0 else 0.0), self._equity_sum + equity
+
+    def on_mark(self, symbol, price):
+        self.marks[symbol] = price
+
+    def on_fill(self, fill, alpha=None):
+        alpha = alpha or fill.get('alpha') or 'unknown'
+        size = float(fill['size'])
+        price = float(fill['price'])
+        qty = size if fill['side'] in BUY_SIDES else -size
+        book = self.alphas.get(alpha)
+        if book is None:
+            book = self.alphas[alpha] = _AlphaBook()
+        realized = book.apply(fill['symbol'], qty, price, float(fill.get('fee', 0.0)))
+        self.traded_notional += size * price
+        self.fills += 1
+        if realized is not None:
+            self.closing_fills += 1
+            if realized > 0:
+                self.wins += 1
+
+    def summary(self):
+        # the open (last) period counts as a final partial sample; accumulator state is unchanged
+        if self._bucket is not None:
+            n, mean, m2, downside_sq, equity_sum = self._moments(self.equity)
+        else:
+            n, mean, m2, downside_sq, equity_sum = self.n, self._mean, self._m2, self._downside_sq, self._equity_sum
+        vol = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        downside = math.sqrt(downside_sq / n) if n else 0.0
+        ann = math.sqrt(self.periods_per_year)
+        # the drawdown still open at the end of the run counts towards the duration
+        open_dd = (self.last_ts_ns - self._peak_ts) if (self.last_ts_ns is not None and self.equity < self._peak) else 0
+        mean_equity = equity_sum / n if n else self.equity
+        return {
+            'start': format_iso_ns(self.first_ts_ns) if self.first_ts_ns is not None else None,
+            'end': format_iso_ns(self.last_ts_ns) if self.last_ts_ns is not None else None,
+            'sample_interval': self.sample_interval,
+            'periods': n,
+            'initial_equity': self.initial_equity,
+            'final_equity': self.equity,
+            'total_return': self.equity / self.initial_equity - 1.0 if self.initial_equity else 0.0,
+            'mean_return': mean,
+            'volatility': vol,
+            'annualized_volatility': vol * ann,
+            'sharpe': (mean / vol * ann) if vol > 0 else 0.0,
+            'sortino': (mean / downside * ann) if downside > 0 else 0.0,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_duration_s': max(self.max_drawdown_duration_ns, open_dd) / NS_PER_SEC,
+            'traded_notional': self.traded_notional,
+            'turnover': self.traded_notional / mean_equity if mean_equity else 0.0,
+            'fills': self.fills,
+            'closing_fills': self.closing_fills,
+            'hit_rate': self.wins / self.closing_fills if self.closing_fills else 0.0,
+            'alphas': {name: {
+                'fills': b.fills,
+                'traded_notional': b.notional,
+                'realized_pnl': b.realized - b.fees,
+                'unrealized_pnl': b.unrealized(self.marks),
+                'pnl': b.realized - b.fees + b.unrealized(self.marks),
+                'fees': b.fees,
+                'hit_rate': b.wins / b.closing_fills if b.closing_fills else 0.0,
+            } for name, b in sorted(self.alphas.items())},
+        }
+
+    def dump(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,225 @@
+"""
+ndjson I/O with transparent compression, selected by file extension:
+  .ndjson      plain text
+  .ndjson.gz   gzip (stdlib), written with mtime=0 so identical content gives identical bytes
+  .ndjson.xz   xz/lzma (stdlib)
+  .ndjson.bgz  block-framed gzip: independent gzip members that each hold whole lines, plus a
+               sidecar '<path>.idx' (one JSON entry per block: offset, length, lines, first_ts).
+               Any gzip reader can stream it sequentially; with the index, blocks can be
+               decompressed in parallel and readers can seek to the block containing a timestamp.
+Everything streams; no reader or writer materializes the whole file.
+"""
+import bisect, gzip, io, json, lzma, os, zlib
+from framework.timestamps import parse_iso_ns, to_ns
+
+COMPRESSION_SUFFIXES = {'gz': '.gz', 'xz': '.xz', 'bgz': '.bgz'}
+BLOCK_SIZE = 1 << 20  # uncompressed bytes per .bgz block
+
+def compression_of(path):
+    for name, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return name
+    return None
+
+def with_compression(path, compression):
+    """Append the suffix for `compression` ('gz', 'xz', 'bgz', None/'none') to a log path."""
+    if not compression or compression == 'none':
+        return path
+    return path + COMPRESSION_SUFFIXES[compression]
+
+def resolve_log_path(path):
+    """Return `path` if it exists, else the first existing compressed variant, else `path` unchanged."""
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return path
+
+def index_path(path):
+    return path + '.idx'
+
+class BlockFramedWriter:
+    """
+    Text writer for .bgz files. Buffers text and emits one gzip member per ~block_size bytes,
+    always cutting at a line boundary, and maintains the sidecar block index.
+    """
+    def __init__(self, path, mode='w', block_size=BLOCK_SIZE, compresslevel=6):
+        self.path = path
+        self.block_size = int(block_size)
+        self.compresslevel = compresslevel
+        self.index = []
+        if 'a' in mode and os.path.exists(path):
+            self.index = read_block_index(path) or []
+        self._f = open(path, 'ab' if 'a' in mode else 'wb')
+        self._offset = self._f.tell()
+        self._parts = []
+        self._size = 0
+        self.closed = False
+
+    def write(self, s):
+        self._parts.append(s)
+        self._size += len(s)
+        if self._size >= self.block_size:
+            self._emit(final=False)
+        return len(s)
+
+    def _emit(self, final):
+        text = ''.join(self._parts)
+        cut = len(text) if final else text.rfind('\n') + 1
+        if cut <= 0:
+            return
+        block, rest = text[:cut], text[cut:]
+        self._parts = [rest] if rest else []
+        self._size = len(rest)
+        data = block.encode('utf-8')
+        member = gzip.compress(data, compresslevel=self.compresslevel, mtime=0)
+        first_ts = None
+        try:
+            first_ts = json.loads(block[:block.find('\n')] if '\n' in block else block).get('ts')
+        except (ValueError, AttributeError):
+            pass
+        self._f.write(member)
+        self.index.append({'offset': self._offset, 'length': len(member),
+                           'lines': block.count('\n'), 'first_ts': first_ts})
+        self._offset += len(member)
+
+    def flush(self):
+        # blocks are only cut on size or close; flush pushes completed blocks to disk
+        self._f.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        if self._size:
+            self._emit(final=True)
+        self._f.close()
+        with open(index_path(self.path), 'w') as f:
+            for entry in self.index:
+                f.write(json.dumps(entry) + '\n')
+        self.closed = True
+
+def read_block_index(path):
+    ipath = index_path(path)
+    if not os.path.exists(ipath):
+        return None
+    with open(ipath, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def open_text(path, mode='r', errors=None):
+    """Open an ndjson log for text reading/writing ('r', 'w', 'a'), compressed according to its extension."""
+    comp = compression_of(path)
+    if comp is None:
+        return open(path, mode, encoding='utf-8', errors=errors)
+    if comp == 'xz':
+        return lzma.open(path, mode + 't', encoding='utf-8', errors=errors)
+    if 'r' not in mode and comp == 'bgz':
+        return BlockFramedWriter(path, mode)
+    # .gz, and sequential reads of .bgz (concatenated gzip members)
+    if 'r' in mode:
+        raw = gzip.GzipFile(path, 'rb')
+    else:
+        raw = gzip.GzipFile(path, mode + 'b', mtime=0)
+    return io.TextIOWrapper(raw, encoding='utf-8', errors=errors)
+
+def _read_block(path, entry):
+    with open(path, 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    # zlib releases the GIL while inflating, so threads decompress blocks in parallel
+    return zlib.decompress(data, wbits=31).decode('utf-8')
+
+def iter_blocks(path, index, start_block=0, workers=4):
+    """Yield decompressed block texts in order, decompressing up to 2*workers blocks ahead."""
+    from concurrent.futures import ThreadPoolExecutor
+    entries = index[start_block:]
+    if workers <= 1:
+        for e in entries:
+            yield _read_block(path, e)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        pending = []
+        it = iter(entries)
+        for e in it:
+            pending.append(ex.submit(_read_block, path, e))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            text = pending.pop(0).result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(ex.submit(_read_block, path, nxt))
+            yield text
+
+def block_for_ts(index, ts):
+    """
+    Index of the last block whose first_ts <= ts (ISO string or epoch ns).
+    Compared as epoch ns: ISO text does not sort chronologically when zero microseconds are
+    omitted ('...01Z' sorts after '...01.500000Z').
+    """
+    keys = [parse_iso_ns(e['first_ts']) if e.get('first_ts') else -1 for e in index]
+    return max(bisect.bisect_right(keys, to_ns(ts)) - 1, 0)
+
+def iter_lines(path, workers=None, start_ts=None):
+    """
+    Stream text lines of an ndjson log, whatever its compression.
+    For indexed .bgz files, `workers` > 1 decompresses blocks in parallel and `start_ts`
+    skips straight to the block containing that timestamp (earlier lines in that block are still yielded).
+    Other formats are read sequentially and ignore both options.
+    """
+    index = read_block_index(path) if compression_of(path) == 'bgz' else None
+    if index is not None and (workers or start_ts):
+        start = block_for_ts(index, start_ts) if start_ts else 0
+        for text in iter_blocks(path, index, start_block=start, workers=workers or 1):
+            yield from text.splitlines()
+        return
+    with open_text(path, 'r') as f:
+        for line in f:
+            yield line
+
+def iter_ndjson(path, workers=None, start_ts=None):
+    loads = json.loads
+    for line in iter_lines(path, workers=workers, start_ts=start_ts):
+        if line.strip():
+            yield loads(line)
+
+class BufferedNDJSONWriter:
+    """
+    Buffered ndjson writer: one JSON object per line, flushed to disk in batches
+    instead of reopening the file for every event. Compression follows the path extension.
+    Instances are callable, so they can be passed anywhere a writer function is expected
+    (e.g. OrderManager order/fill writers).
+    """
+    def __init__(self, path, mode='a', buffer_lines=1024):
+        self.path = path
+        self.buffer_lines = int(buffer_lines)
+        self._buf = []
+        self._f = open_text(path, mode)
+
+    def __call__(self, obj):
+        self._buf.append(json.dumps(obj, default=str))
+        if len(self._buf) >= self.buffer_lines:
+            self.flush()
+
+    def write_many(self, objs):
+        for obj in objs:
+            self(obj)
+
+    def flush(self):
+        if self._buf:
+            self._f.write('\n'.join(self._buf))
+            self._f.write('\n')
+            self._buf = []
+        self._f.flush()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
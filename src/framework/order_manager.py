@@ -1,5 +1,6 @@
 import uuid
 import json
+from collections import OrderedDict
 from framework.execution_model import DeterministicExecutionModel
 from datetime import datetime
 
@@ -7,13 +8,17 @@ class OrderManager:
     """
     Accepts signals and creates deterministic orders + fills using DeterministicExecutionModel.
     Writes ndjson logs via provided writers (functions).
+    `orders` keeps the last `history` order/fill pairs (0: none, None: unbounded); the order and
+    fill logs are the full record, so a long live session does not grow memory.
     """
-    def __init__(self, exec_model: DeterministicExecutionModel, order_log_writer, fill_log_writer, fee_per_trade=0.0):
+    def __init__(self, exec_model: DeterministicExecutionModel, order_log_writer, fill_log_writer, fee_per_trade=0.0,
+                 history=0):
         self.exec_model = exec_model
         self.order_log_writer = order_log_writer
         self.fill_log_writer = fill_log_writer
         self.fee_per_trade = fee_per_trade
-        self.orders = {}  # order_id -> order dict
+        self.history = history
+        self.orders = OrderedDict()  # order_id -> {'order', 'fill'}, oldest first
 
     def submit_market_order(self, alpha_name, symbol, side, size, top_price, ts):
         order_id = str(uuid.uuid4())
@@ -30,6 +35,10 @@ class OrderManager:
         self.order_log_writer(order)
         # deterministically produce fill
         fill = self.exec_model.fill_market(order_id, symbol, side, size, top_price, ts, fee_per_trade=self.fee_per_trade)
-        self.fill_log_writer(fill.to_dict())
-        self.orders[order_id] = {'order': order, 'fill': fill.to_dict()}
-        return fill.to_dict()
+        fill = fill.to_dict()
+        self.fill_log_writer(fill)
+        if self.history != 0:
+            self.orders[order_id] = {'order': order, 'fill': fill}
+            if self.history is not None and len(self.orders) > self.history:
+                self.orders.popitem(last=False)
+        return fill
@@ -1,4 +1,6 @@
+from collections import deque
 from decimal import Decimal, getcontext
+from framework.timestamps import parse_iso_ns
 
 getcontext().prec = 12
 
@@ -6,15 +8,39 @@ class Portfolio:
     """
     Simple portfolio accounting for replication purpose.
     Tracks positions, cash, trade log, per-alpha pnl aggregation.
+    mark(symbol, price, ts_ns) revalues open positions at the last price (float, incremental);
+    with an OnlineMetrics attached, every mark and fill feeds it the mark-to-market equity.
+    trade_log/equity_history keep the last `history` fills (0: none, None: unbounded); fill_log
+    on disk and OnlineMetrics are the full record.
     """
-    def __init__(self, initial_cash=100000.0):
+    def __init__(self, initial_cash=100000.0, metrics=None, history=0):
         self.cash = Decimal(initial_cash)
         self.positions = {}  # symbol -> Decimal(size)
-        self.trade_log = []
-        self.equity_history = []  # tuples (ts_iso, equity_decimal)
+        self.history = history
+        self.trade_log = deque(maxlen=history)
+        self.equity_history = deque(maxlen=history)  # tuples (ts_iso, equity_float)
         self.per_alpha_pnl = {}
+        self.marks = {}  # symbol -> last price
+        self._cash_f = float(self.cash)
+        self._qty = {}   # symbol -> float position, for mark-to-market
+        self._mtm = 0.0  # sum(qty * mark)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.marks = self.marks  # shared last prices for unrealized attribution
 
-    def apply_fill(self, fill: dict):
+    def mark(self, symbol, price, ts_ns):
+        last = self.marks.get(symbol)
+        self.marks[symbol] = price
+        qty = self._qty.get(symbol)
+        if qty and last is not None:
+            self._mtm += qty * (price - last)
+        if self.metrics is not None:
+            self.metrics.on_equity(ts_ns, self._cash_f + self._mtm)
+
+    def market_value(self):
+        return self._cash_f + self._mtm
+
+    def apply_fill(self, fill: dict, alpha=None):
         # fill dict keys: order_id, symbol, side, size, price, ts, fee
         size = Decimal(str(fill['size']))
         price = Decimal(str(fill['price']))
@@ -29,14 +55,20 @@ class Portfolio:
             # sell reduces position
             self.positions[symbol] = self.positions.get(symbol, Decimal('0')) - size
             self.cash += notional - fee
-        # record trade
-        self.trade_log.append(fill)
-        # update equity snapshot (we do not have market-to-market valuation here; equity = cash + sum(0) for deterministic test)
-        equity = self.cash  # for replication tests we compare trade-level P&L sums
-        self.equity_history.append((fill['ts'], float(equity)))
+        qty = float(size) if side in ('buy','long','buy_aggressive') else -float(size)
+        self._qty[symbol] = self._qty.get(symbol, 0.0) + qty
+        self._mtm += qty * self.marks.setdefault(symbol, float(price))
+        self._cash_f = float(self.cash)
+        if self.metrics is not None:
+            self.metrics.on_fill(fill, alpha)
+            self.metrics.on_equity(parse_iso_ns(fill['ts']), self._cash_f + self._mtm)
+        if self.history != 0:
+            # record trade and cash snapshot (for replication tests we compare trade-level P&L sums)
+            self.trade_log.append(fill)
+            self.equity_history.append((fill['ts'], self._cash_f))
         # accumulate per-alpha pnl by order_id alpha mapping (alpha must be embedded in fill['order_id'] mapping externally)
         # per-alpha handling done by caller
 
     def get_equity_series(self):
         # return as simple list [(ts, equity)]
-        return self.equity_history
+        return list(self.equity_history)
@@ -1,22 +1,37 @@
 import json
 from datetime import datetime
 from typing import Iterator
+from framework.instrumentation import NULL_INSTRUMENTATION
+from framework.ndjson import iter_lines
+from framework.timestamps import parse_iso_ns, to_ns
 
 class ReplayEngine:
     """
     Streams ticks (and L2 events) from an ndjson market log in chronological order.
     Each line must be a JSON object with at least: msg_type, ts, symbol, (price,size) or (bids,asks)
+    Compressed logs (.gz/.xz/.bgz) are detected by extension; indexed .bgz logs are
+    decompressed with `workers` threads.
+    start_ts (ISO string or epoch ns) skips events before it; indexed .bgz logs seek straight to
+    the block containing it.
     """
-    def __init__(self, market_log_path, seed=0):
+    def __init__(self, market_log_path, seed=0, instrumentation=None, workers=None, start_ts=None):
         self.market_log_path = market_log_path
         self.seed = seed
+        self.instr = instrumentation or NULL_INSTRUMENTATION
+        self.workers = workers
+        self.start_ts = start_ts
 
     def stream_events(self):
-        with open(self.market_log_path, 'r') as f:
-            for line in f:
-                if not line.strip():
+        loads = self.instr.wrap('parse', json.loads)
+        start_ns = to_ns(self.start_ts) if self.start_ts is not None else None
+        for line in iter_lines(self.market_log_path, workers=self.workers, start_ts=self.start_ts):
+            if not line.strip():
+                continue
+            ev = loads(line)
+            if start_ns is not None:
+                if parse_iso_ns(ev['ts']) < start_ns:
                     continue
-                ev = json.loads(line)
-                # ensure ts normalized to ISO string
-                ev['ts'] = ev['ts']
-                yield ev
+                start_ns = None  # chronological log: everything after this is in range
+            # ensure ts normalized to ISO string
+            ev['ts'] = ev['ts']
+            yield ev
@@ -0,0 +1,204 @@
+"""
+Local run catalog (SQLite, stdlib only).
+Every replay, simulator run and comparison registers:
+- runs: kind, config hash, seed, market-log fingerprint and the derived input_key (unique),
+  so a run with identical inputs replaces its previous entry and can be served from cache.
+  Every input_key also covers code_version(), a digest of the package source, so a code change
+  never serves results computed by older code.
+- metrics: flattened numeric summary metrics, indexed by (name, value) for top-N queries
+- artifacts: output paths by name
+Market-log fingerprints are streaming blake2b digests, cached by (path, size, mtime_ns) so an
+unchanged multi-GB log is hashed once.
+"""
+import functools, hashlib, json, os, sqlite3, time
+
+# config sections that do not change a run's results
+NON_RESULT_KEYS = ('storage', 'logging', 'instrumentation', 'live', 'walkforward', 'daemon')
+_CHUNK = 1 << 20
+_SRC_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created_ns INTEGER NOT NULL,
+    config_hash TEXT,
+    seed INTEGER,
+    market_fp TEXT,
+    input_key TEXT NOT NULL UNIQUE,
+    out_dir TEXT,
+    params TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_kind_created ON runs(kind, created_ns);
+CREATE INDEX IF NOT EXISTS runs_market ON runs(market_fp);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_name_value ON metrics(name, value);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id TEXT NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(str(p).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+def config_hash(cfg):
+    """Hash of the result-relevant part of a config (NON_RESULT_KEYS sections excluded)."""
+    relevant = {k: v for k, v in (cfg or {}).items() if k not in NON_RESULT_KEYS}
+    return _digest(json.dumps(relevant, sort_keys=True, default=str))
+
+def file_fingerprint(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Digest of every .py file under the source root (paths and contents), computed once per process."""
+    h = hashlib.blake2b(digest_size=16)
+    for root, dirs, files in os.walk(_SRC_ROOT):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                h.update(os.path.relpath(path, _SRC_ROOT).encode())
+                with open(path, 'rb') as f:
+                    h.update(f.read())
+    return h.hexdigest()
+
+def input_key(kind, *parts):
+    return _digest(kind, code_version(), *parts)
+
+def flatten_metrics(summary, prefix=''):
+    """Nested metrics dict -> {'a.b': float} for numeric leaves."""
+    out = {}
+    for k, v in (summary or {}).items():
+        name = prefix + str(k)
+        if isinstance(v, dict):
+            out.update(flatten_metrics(v, name + '.'))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[name] = float(v)
+    return out
+
+def registry_path(cfg):
+    storage = cfg.get('storage', {})
+    return storage.get('registry', os.path.join(storage.get('base_path', 'results'), 'runs.sqlite'))
+
+def open_registry(cfg):
+    """RunRegistry for a config, or None when storage.registry is set to null/false."""
+    storage = cfg.get('storage', {})
+    if 'registry' in storage and not storage['registry']:
+        return None
+    return RunRegistry(registry_path(cfg))
+
+class RunRegistry:
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fingerprint(self, path):
+        """Content digest of a file, recomputed only when its size or mtime changed."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.conn.execute('SELECT size, mtime_ns, digest FROM fingerprints WHERE path=?', (path,)).fetchone()
+        if row is not None and row['size'] == st.st_size and row['mtime_ns'] == st.st_mtime_ns:
+            return row['digest']
+        digest = file_fingerprint(path)
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO fingerprints(path, size, mtime_ns, digest) VALUES (?,?,?,?)',
+                              (path, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def register(self, kind, key, out_dir=None, cfg=None, seed=None, market_fp=None,
+                 metrics=None, artifacts=None, params=None):
+        """Insert (or replace the run with the same input key); returns run_id."""
+        run_id = key[:16]
+        with self.conn:
+            self.conn.execute('DELETE FROM runs WHERE input_key=?', (key,))
+            self.conn.execute('INSERT INTO runs(run_id, kind, created_ns, config_hash, seed, market_fp, input_key, out_dir, params) '
+                              'VALUES (?,?,?,?,?,?,?,?,?)',
+                              (run_id, kind, time.time_ns(), config_hash(cfg) if cfg is not None else None,
+                               seed, market_fp, key, out_dir, json.dumps(params, default=str) if params else None))
+            self.conn.executemany('INSERT INTO metrics(run_id, name, value) VALUES (?,?,?)',
+                                  [(run_id, n, v) for n, v in flatten_metrics(metrics).items()])
+            self.conn.executemany('INSERT INTO artifacts(run_id, name, path) VALUES (?,?,?)',
+                                  [(run_id, n, p) for n, p in (artifacts or {}).items() if p])
+        return run_id
+
+    def find(self, key):
+        """Registered run with this input key whose artifacts all still exist, else None."""
+        row = self.conn.execute('SELECT * FROM runs WHERE input_key=?', (key,)).fetchone()
+        if row is None:
+            return None
+        run = self._run(row)
+        if not all(os.path.exists(p) for p in run['artifacts'].values()):
+            return None
+        return run
+
+    def get(self, run_id):
+        row = self.conn.execute('SELECT * FROM runs WHERE run_id=?', (run_id,)).fetchone()
+        return self._run(row) if row is not None else None
+
+    def list_runs(self, kind=None, limit=20):
+        sql = 'SELECT * FROM runs' + (' WHERE kind=?' if kind else '') + ' ORDER BY created_ns DESC LIMIT ?'
+        args = (kind, limit) if kind else (limit,)
+        return [self._run(r, details=False) for r in self.conn.execute(sql, args)]
+
+    def top(self, metric, n=10, kind=None, ascending=False):
+        """Top-n runs by one metric (descending unless ascending=True)."""
+        order = 'ASC' if ascending else 'DESC'
+        sql = ('SELECT r.*, m.value AS metric_value FROM metrics m JOIN runs r ON r.run_id = m.run_id '
+               'WHERE m.name=?' + (' AND r.kind=?' if kind else '') +
+               f' ORDER BY m.value {order} LIMIT ?')
+        args = (metric, kind, n) if kind else (metric, n)
+        out = []
+        for r in self.conn.execute(sql, args):
+            run = self._run(r, details=False)
+            run[metric] = r['metric_value']
+            out.append(run)
+        return out
+
+    def _run(self, row, details=True):
+        run = {k: row[k] for k in ('run_id', 'kind', 'created_ns', 'config_hash', 'seed', 'market_fp', 'input_key', 'out_dir')}
+        run['params'] = json.loads(row['params']) if row['params'] else {}
+        if details:
+            rid = row['run_id']
+            run['metrics'] = {r['name']: r['value'] for r in
+                              self.conn.execute('SELECT name, value FROM metrics WHERE run_id=?', (rid,))}
+            run['artifacts'] = {r['name']: r['path'] for r in
+                                self.conn.execute('SELECT name, path FROM artifacts WHERE run_id=?', (rid,))}
+        return run
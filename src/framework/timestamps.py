@@ -0,0 +1,87 @@
+"""
+Integer epoch-nanosecond timestamps.
+Internally time is an int (ns since 1970-01-01 UTC); ISO-8601 strings are parsed once at the
+ingestion edge and formatted only where a string is written out.
+- parse_iso_ns caches the epoch value of each 'YYYY-MM-DDTHH:MM' prefix, so consecutive ticks
+  in the same minute cost two int() calls for seconds and fraction
+- format_iso_ns reproduces datetime.isoformat() output exactly (microseconds only when non-zero),
+  so logs and bar timestamps stay byte-identical
+"""
+import calendar
+from datetime import datetime, timezone
+
+NS_PER_US = 1_000
+NS_PER_SEC = 1_000_000_000
+NS_PER_MIN = 60 * NS_PER_SEC
+_CACHE_MAX = 1 << 16
+_minute_cache = {}   # 'YYYY-MM-DDTHH:MM' -> epoch ns
+_format_cache = {}   # epoch minute ns -> 'YYYY-MM-DDTHH:MM'
+
+def _minute_ns(prefix):
+    ns = _minute_cache.get(prefix)
+    if ns is None:
+        if len(_minute_cache) >= _CACHE_MAX:
+            _minute_cache.clear()
+        secs = calendar.timegm((int(prefix[0:4]), int(prefix[5:7]), int(prefix[8:10]),
+                                int(prefix[11:13]), int(prefix[14:16]), 0))
+        ns = _minute_cache[prefix] = secs * NS_PER_SEC
+    return ns
+
+def _tz_offset_ns(tz):
+    if not tz or tz == 'Z':
+        return 0
+    sign = -1 if tz[0] == '-' else 1
+    digits = tz[1:].replace(':', '')
+    return sign * (int(digits[0:2]) * 3600 + int(digits[2:4] or 0) * 60) * NS_PER_SEC
+
+def parse_iso_ns(s):
+    """'2025-10-01T00:00:01.250000Z' (or +HH:MM offset, or naive = UTC) -> epoch ns."""
+    if len(s) >= 19 and s[10] in 'T ' and s[13] == ':' and s[16] == ':':
+        ns = _minute_ns(s[:16]) + int(s[17:19]) * NS_PER_SEC
+        i = 19
+        if len(s) > 19 and s[19] == '.':
+            j = 20
+            while j < len(s) and s[j].isdigit():
+                j += 1
+            ns += int(s[20:j][:9].ljust(9, '0'))
+            i = j
+        return ns - _tz_offset_ns(s[i:])
+    # anything unusual (date only, compact forms) goes through the stdlib parser
+    dt = datetime.fromisoformat(s.replace('Z', '+00:00'))
+    return to_ns(dt)
+
+def to_ns(value):
+    """int ns / ISO string / datetime (naive = UTC) -> epoch ns."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return parse_iso_ns(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * NS_PER_SEC + delta.microseconds * NS_PER_US
+
+def format_iso_ns(ns, suffix='Z'):
+    """
+    epoch ns -> ISO-8601 in UTC, same text as datetime.isoformat() ('+00:00' replaced by `suffix`).
+    Sub-microsecond digits are truncated, as datetime cannot represent them either.
+    """
+    minute, rem = divmod(ns, NS_PER_MIN)
+    head = _format_cache.get(minute)
+    if head is None:
+        if len(_format_cache) >= _CACHE_MAX:
+            _format_cache.clear()
+        t = datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+        head = _format_cache[minute] = f"{t.year:04d}-{t.month:02d}-{t.day:02d}T{t.hour:02d}:{t.minute:02d}"
+    sec, sub = divmod(rem, NS_PER_SEC)
+    us = sub // NS_PER_US
+    if us:
+        return f"{head}:{sec:02d}.{us:06d}{suffix}"
+    return f"{head}:{sec:02d}{suffix}"
+
+def format_bar_ts(ns):
+    """Bar timestamps keep the pandas/datetime isoformat style with an explicit +00:00 offset."""
+    return format_iso_ns(ns, suffix='+00:00')
+
+def to_datetime(ns):
+    return datetime.fromtimestamp(ns // NS_PER_SEC, tz=timezone.utc).replace(microsecond=(ns % NS_PER_SEC) // NS_PER_US)
@@ -0,0 +1 @@
+# live package
@@ -0,0 +1,160 @@
+"""
+Pluggable live feed adapters.
+Each adapter exposes an async iterator of raw venue messages via events(); the
+ingestion pipeline normalizes them to the ndjson market event schema:
+  tick:      {'msg_type':'tick','symbol','ts','price','size'}
+  l2_update: {'msg_type':'l2_update','symbol','ts','bids':[{'price','size'}...],'asks':[...]}
+"""
+import asyncio, json
+from framework.timestamps import format_iso_ns
+
+TICK_TYPES = ('tick', 'trade')
+L2_TYPES = ('l2_update', 'l2', 'book', 'orderbook')
+
+def _iso_from_epoch_ms(ms):
+    return format_iso_ns(int(ms) * 1_000_000)
+
+def _levels(levels):
+    # accept [[price, size], ...] or [{'price':..,'size':..}, ...]
+    out = []
+    for lvl in levels or []:
+        if isinstance(lvl, dict):
+            out.append({'price': float(lvl['price']), 'size': float(lvl['size'])})
+        else:
+            out.append({'price': float(lvl[0]), 'size': float(lvl[1])})
+    return out
+
+def normalize_event(raw):
+    """
+    Map a raw venue message to the canonical market event schema.
+    Events already in canonical form are returned unchanged so recorded logs replay byte-identically.
+    Returns None for messages that are neither trades nor book updates (heartbeats, acks).
+    """
+    if raw.get('msg_type') in ('tick', 'l2_update'):
+        return raw
+    mtype = raw.get('type')
+    if mtype is None:
+        mtype = 'l2_update' if ('bids' in raw or 'asks' in raw) else 'tick' if 'price' in raw else None
+    ts = raw.get('ts')
+    if ts is None and raw.get('timestamp') is not None:
+        ts = _iso_from_epoch_ms(raw['timestamp'])
+    if ts is None or raw.get('symbol') is None:
+        return None
+    if mtype in TICK_TYPES:
+        size = raw.get('size', raw.get('amount', 0.0))
+        return {'msg_type':'tick','symbol':raw['symbol'],'ts':ts,'price':float(raw['price']),'size':float(size)}
+    if mtype in L2_TYPES:
+        return {'msg_type':'l2_update','symbol':raw['symbol'],'ts':ts,
+                'bids':_levels(raw.get('bids')),'asks':_levels(raw.get('asks'))}
+    return None
+
+class FeedAdapter:
+    """
+    Base class for feed adapters. Subclasses implement events() as an async generator
+    yielding raw message dicts; close() releases the connection.
+    """
+    name = 'feed'
+
+    async def events(self):
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def close(self):
+        pass
+
+class TCPFeedAdapter(FeedAdapter):
+    """
+    Reads newline-delimited JSON from a TCP stream (e.g. the local stand-in exchange
+    in simulator/local_exchange.py). Because the pipeline only reads the socket when it
+    has queue space, a slow consumer pushes back on the sender through TCP flow control.
+    """
+    def __init__(self, host='127.0.0.1', port=9100, symbols=None, name='tcp', read_limit=2**20):
+        self.host = host
+        self.port = port
+        self.symbols = symbols
+        self.name = name
+        self.read_limit = read_limit
+        self._writer = None
+
+    async def events(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=self.read_limit)
+        if self.symbols:
+            self._writer.write((json.dumps({'op':'subscribe','symbols':list(self.symbols)}) + '\n').encode())
+            await self._writer.drain()
+        loads = json.loads
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                yield loads(line)
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+
+class CCXTProFeedAdapter(FeedAdapter):
+    """
+    Streams trades and order books from a ccxt.pro exchange (websocket).
+    ccxt is imported lazily so the rest of the live stack works without it.
+    One watch task runs per symbol and stream; if one fails (disconnect, auth error, bad symbol)
+    its exception is re-raised from events(), so the pipeline logs it instead of waiting forever.
+    """
+    def __init__(self, exchange_id, symbols, book_depth=10, with_books=True, name=None):
+        self.exchange_id = exchange_id
+        self.symbols = list(symbols)
+        self.book_depth = book_depth
+        self.with_books = with_books
+        self.name = name or exchange_id
+        self._exchange = None
+
+    async def _watch(self, coro_fn, symbol, out):
+        try:
+            while True:
+                res = await coro_fn(symbol)
+                if isinstance(res, list):
+                    for t in res:
+                        await out.put({'type':'trade','symbol':symbol,'timestamp':t['timestamp'],
+                                       'price':t['price'],'amount':t['amount']})
+                else:
+                    await out.put({'type':'book','symbol':symbol,'timestamp':res['timestamp'] or self._exchange.milliseconds(),
+                                   'bids':res['bids'][:self.book_depth],'asks':res['asks'][:self.book_depth]})
+        except Exception as e:
+            await out.put(e)  # hand the failure to events(); cancellation still propagates
+
+    def _make_exchange(self):
+        import ccxt.pro as ccxtpro
+        return getattr(ccxtpro, self.exchange_id)({'enableRateLimit': True})
+
+    async def events(self):
+        self._exchange = self._make_exchange()
+        out = asyncio.Queue(maxsize=1024)
+        tasks = [asyncio.ensure_future(self._watch(self._exchange.watch_trades, s, out)) for s in self.symbols]
+        if self.with_books:
+            tasks += [asyncio.ensure_future(self._watch(self._exchange.watch_order_book, s, out)) for s in self.symbols]
+        try:
+            while True:
+                item = await out.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.close()
+
+    async def close(self):
+        if self._exchange is not None:
+            await self._exchange.close()
+            self._exchange = None
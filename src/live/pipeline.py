@@ -0,0 +1,199 @@
+"""
+Asyncio ingestion pipeline for live feeds.
+- one producer task per FeedAdapter reads raw messages and normalizes them
+- ticks go into a bounded asyncio.Queue; when it is full the producer waits (lossless backpressure,
+  which in turn stops reading the socket)
+- L2 snapshots go into an L2Buffer with an explicit overflow policy (conflate/drop_oldest/drop_newest/block)
+- every event is stamped with a sequence number on receipt; a single consumer drains both in
+  batches, merging the two by sequence number, so `handler` sees (and the recorded market log
+  keeps) arrival order across ticks and L2
+  (handler is normally BacktestEngine.on_event, which records it with the buffered market writer
+  and runs the same alpha/OrderManager path as replay)
+Memory is bounded by tick_queue_size + l2_queue_size events regardless of burst size (the
+engine side keeps bars.history bars/ticks, see DataHandler, and backtest.trade_history
+orders/fills, see OrderManager and Portfolio).
+"""
+import asyncio
+from collections import OrderedDict, deque
+from framework.logger import setup_logger
+from live.feeds import normalize_event
+
+logger = setup_logger('live')
+
+L2_POLICIES = ('conflate', 'drop_oldest', 'drop_newest', 'block')
+
+class L2Buffer:
+    """
+    Bounded buffer for L2 book snapshots.
+    Policies when a snapshot arrives:
+      conflate    - keep only the latest snapshot per symbol (snapshots are full books, so older ones are stale);
+                    it takes the queue position of its own arrival; if the buffer is full of distinct
+                    symbols, the oldest symbol's snapshot is dropped
+      drop_oldest - FIFO, evict the oldest snapshot when full
+      drop_newest - FIFO, discard the incoming snapshot when full
+      block       - FIFO, producer waits for space (lossless)
+    Items are kept as (seq, event), in seq order; seq defaults to a buffer-local counter.
+    """
+    def __init__(self, maxsize=1000, policy='conflate'):
+        if policy not in L2_POLICIES:
+            raise ValueError(f"unknown L2 policy {policy!r}, expected one of {L2_POLICIES}")
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self._items = OrderedDict() if policy == 'conflate' else deque()
+        self._space = asyncio.Event()
+        self._space.set()
+        self.conflated = 0
+        self.dropped = 0
+        self.high_watermark = 0
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, ev, seq=None):
+        if seq is None:
+            seq = self._seq
+            self._seq += 1
+        if self.policy == 'conflate':
+            key = ev['symbol']
+            if key in self._items:
+                # replace the stale snapshot; the new one is delivered at its own arrival position
+                self._items[key] = (seq, ev)
+                self._items.move_to_end(key)
+                self.conflated += 1
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popitem(last=False)
+                self.dropped += 1
+            self._items[key] = (seq, ev)
+        else:
+            while len(self._items) >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return
+                else:
+                    self._space.clear()
+                    await self._space.wait()
+            self._items.append((seq, ev))
+        if len(self._items) > self.high_watermark:
+            self.high_watermark = len(self._items)
+
+    def head_seq(self):
+        """Sequence number of the next snapshot, or None when empty."""
+        if not self._items:
+            return None
+        if self.policy == 'conflate':
+            return next(iter(self._items.values()))[0]
+        return self._items[0][0]
+
+    def pop(self):
+        item = self._items.popitem(last=False)[1] if self.policy == 'conflate' else self._items.popleft()
+        self._space.set()
+        return item[1]
+
+    def drain(self, limit):
+        out = []
+        while self._items and len(out) < limit:
+            out.append(self.pop())
+        return out
+
+class IngestionPipeline:
+    """
+    Consumes one or more FeedAdapters into `handler(event)`.
+    run() returns when every adapter is exhausted (or after `duration` seconds / stop()).
+    """
+    def __init__(self, adapters, handler, tick_queue_size=10000, l2_queue_size=1000,
+                 l2_policy='conflate', batch_size=512):
+        self.adapters = list(adapters)
+        self.handler = handler
+        self.batch_size = int(batch_size)
+        self.tick_queue_size = int(tick_queue_size)
+        self.l2_queue_size = int(l2_queue_size)
+        self.l2_policy = l2_policy
+        self.stats = {'received': 0, 'ignored': 0, 'ticks': 0, 'l2': 0, 'dispatched': 0,
+                      'tick_queue_high_watermark': 0}
+        self._stopping = False
+        self._seq = 0
+
+    async def _produce(self, adapter):
+        ticks, l2, wake = self._ticks, self._l2, self._wake
+        stats = self.stats
+        async for raw in adapter.events():
+            stats['received'] += 1
+            ev = normalize_event(raw)
+            if ev is None:
+                stats['ignored'] += 1
+                continue
+            seq = self._seq
+            self._seq += 1
+            if ev['msg_type'] == 'tick':
+                stats['ticks'] += 1
+                await ticks.put((seq, ev))
+                if ticks.qsize() > stats['tick_queue_high_watermark']:
+                    stats['tick_queue_high_watermark'] = ticks.qsize()
+            else:
+                stats['l2'] += 1
+                await l2.put(ev, seq)
+            wake.set()
+            if self._stopping:
+                break
+
+    async def _consume(self, producers):
+        ticks, l2, wake = self._ticks, self._l2, self._wake
+        handler, batch = self.handler, self.batch_size
+        head = None  # next (seq, tick), already taken off the tick queue
+        while True:
+            n = 0
+            while n < batch:
+                if head is None and not ticks.empty():
+                    head = ticks.get_nowait()
+                l2_seq = l2.head_seq()
+                if head is not None and (l2_seq is None or head[0] < l2_seq):
+                    handler(head[1])
+                    head = None
+                elif l2_seq is not None:
+                    handler(l2.pop())
+                else:
+                    break
+                n += 1
+            self.stats['dispatched'] += n
+            if n:
+                # let producers refill the queues before the next batch
+                await asyncio.sleep(0)
+                continue
+            if all(p.done() for p in producers):
+                break
+            wake.clear()
+            await wake.wait()
+
+    async def run(self, duration=None):
+        self._ticks = asyncio.Queue(maxsize=self.tick_queue_size)
+        self._l2 = L2Buffer(maxsize=self.l2_queue_size, policy=self.l2_policy)
+        self._wake = asyncio.Event()
+        producers = [asyncio.ensure_future(self._produce(a)) for a in self.adapters]
+        for p in producers:
+            p.add_done_callback(lambda _: self._wake.set())
+        consumer = asyncio.ensure_future(self._consume(producers))
+        try:
+            await asyncio.wait_for(asyncio.shield(consumer), timeout=duration)
+        except asyncio.TimeoutError:
+            self.stop()
+            for p in producers:
+                p.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+            self._wake.set()
+            await consumer
+        for p in producers:
+            if not p.cancelled() and p.exception() is not None:
+                logger.error('feed adapter failed: %r', p.exception())
+        self.stats['l2_conflated'] = self._l2.conflated
+        self.stats['l2_dropped'] = self._l2.dropped
+        self.stats['l2_high_watermark'] = self._l2.high_watermark
+        logger.info('IngestionPipeline finished: %s', self.stats)
+        return self.stats
+
+    def stop(self):
+        self._stopping = True
@@ -0,0 +1,138 @@
+"""
+Local stand-in exchange for offline testing of the live ingestion pipeline.
+Serves newline-delimited JSON market events over TCP to every connecting client:
+- either replays an existing ndjson market log, or
+- generates deterministic synthetic ticks/L2 snapshots (same generators as the sandbox simulator)
+A client may send {"op":"subscribe","symbols":[...]} to filter the stream.
+`rate` caps events per second (0 = as fast as the socket accepts, useful for burst tests).
+"""
+import argparse, asyncio, json
+from datetime import datetime, timedelta, timezone
+from framework.logger import setup_logger
+from simulator.sandbox_simulator import generate_tick, generate_l2
+
+logger = setup_logger('exchange')
+
+SYMBOLS = ['SYM_A','SYM_B','SYM_C','SYM_D','SYM_E']
+BASE_PRICES = {'SYM_A':100.0,'SYM_B':98.0,'SYM_C':150.0,'SYM_D':50.0,'SYM_E':200.0}
+
+def synthetic_events(n_events, start='2025-10-01T00:00:00Z', symbols=None, l2_every=5):
+    """Deterministic synthetic stream: one tick per symbol per second, an L2 snapshot for the last symbol every l2_every seconds."""
+    symbols = symbols or SYMBOLS
+    ts = datetime.fromisoformat(start.replace('Z','+00:00')).astimezone(timezone.utc)
+    n = 0
+    while n < n_events:
+        for s in symbols:
+            yield generate_tick(s, BASE_PRICES.get(s, 100.0), ts)
+            n += 1
+            if s == symbols[-1] and ts.second % l2_every == 0:
+                yield generate_l2(s, BASE_PRICES.get(s, 100.0), ts)
+                n += 1
+            if n >= n_events:
+                return
+        ts += timedelta(seconds=1)
+
+def market_log_events(path):
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class LocalExchange:
+    """
+    asyncio TCP server streaming market events. `source` is a zero-arg callable returning a fresh
+    iterable of event dicts for each connection.
+    """
+    def __init__(self, source, host='127.0.0.1', port=0, rate=0, chunk=256):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.rate = float(rate)
+        self.chunk = int(chunk)
+        self.server = None
+        self.sent = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info('LocalExchange listening on %s:%s', self.host, self.port)
+        return self
+
+    async def _read_subscriptions(self, reader, filt):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if msg.get('op') == 'subscribe':
+                filt.clear()
+                filt.update(msg.get('symbols') or [])
+
+    async def _handle(self, reader, writer):
+        filt = set()
+        sub_task = asyncio.ensure_future(self._read_subscriptions(reader, filt))
+        # give an immediately-sent subscribe message a chance to land before streaming starts
+        await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        n = 0
+        buf = []
+        try:
+            for ev in self.source():
+                if filt and ev.get('symbol') not in filt:
+                    continue
+                buf.append(json.dumps(ev, default=str))
+                n += 1
+                if len(buf) >= self.chunk:
+                    writer.write(('\n'.join(buf) + '\n').encode())
+                    buf = []
+                    # drain() suspends while the client's receive window is full (backpressure)
+                    await writer.drain()
+                    if self.rate > 0:
+                        ahead = n / self.rate - (loop.time() - t0)
+                        if ahead > 0:
+                            await asyncio.sleep(ahead)
+            if buf:
+                writer.write(('\n'.join(buf) + '\n').encode())
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.sent += n
+            sub_task.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+async def _serve(args):
+    if args.market_log:
+        source = lambda: market_log_events(args.market_log)
+    else:
+        source = lambda: synthetic_events(args.events, start=args.start)
+    ex = await LocalExchange(source, host=args.host, port=args.port, rate=args.rate).start()
+    async with ex.server:
+        await ex.server.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--market_log', default=None)
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--start', default='2025-10-01T00:00:00Z')
+    parser.add_argument('--rate', type=float, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
@@ -8,6 +8,7 @@ This allows a local end-to-end replication test.
 import argparse, os, json, random, time
 from datetime import datetime, timedelta, timezone
 from framework.logger import setup_logger
+from framework.ndjson import BufferedNDJSONWriter, open_text, with_compression
 from framework.execution_model import DeterministicExecutionModel
 from framework.order_manager import OrderManager
 from framework.datahandler import DataHandler
@@ -23,8 +24,8 @@ def iso_now(ts):
     return ts.isoformat().replace('+00:00','Z')
 
 def ndjson_writer(path, obj):
-    with open(path,'a') as f:
-        f.write(json.dumps(obj, default=str) + '\\n')
+    with open_text(path,'a') as f:
+        f.write(json.dumps(obj, default=str) + '\n')
 
 def generate_tick(symbol, base_price, ts, vol=1.0):
     # deterministic modified price based on ts.second for variability
@@ -45,102 +46,117 @@ def create_simulated_run(cfg, run_id='run_local_001', duration_seconds=60):
     """
     base_out = cfg['storage']['base_path']
     os.makedirs(base_out, exist_ok=True)
-    market_path = os.path.join(base_out, f"{run_id}_market.ndjson")
-    order_path = os.path.join(base_out, f"{run_id}_order.ndjson")
-    fill_path = os.path.join(base_out, f"{run_id}_fill.ndjson")
-    signal_path = os.path.join(base_out, f"{run_id}_signal.ndjson")
+    comp = cfg['storage'].get('compression')
+    market_path = with_compression(os.path.join(base_out, f"{run_id}_market.ndjson"), comp)
+    order_path = with_compression(os.path.join(base_out, f"{run_id}_order.ndjson"), comp)
+    fill_path = with_compression(os.path.join(base_out, f"{run_id}_fill.ndjson"), comp)
+    signal_path = with_compression(os.path.join(base_out, f"{run_id}_signal.ndjson"), comp)
     # remove existing files
     for p in (market_path, order_path, fill_path, signal_path):
         try:
             os.remove(p)
         except FileNotFoundError:
             pass
+    market_w = BufferedNDJSONWriter(market_path)
+    order_w = BufferedNDJSONWriter(order_path)
+    fill_w = BufferedNDJSONWriter(fill_path)
+    signal_w = BufferedNDJSONWriter(signal_path)
 
-    # deterministic seed
-    seed = cfg.get('seed', 0)
-    random.seed(seed)
+    # writers are closed even if the run fails, so partial logs are flushed and handles released
+    try:
+        # deterministic seed
+        seed = cfg.get('seed', 0)
+        random.seed(seed)
 
-    # symbols and base prices
-    symbols = ['SYM_A','SYM_B','SYM_C','SYM_D','SYM_E']
-    base_prices = {'SYM_A':100.0,'SYM_B':98.0,'SYM_C':150.0,'SYM_D':50.0,'SYM_E':200.0}
+        # symbols and base prices
+        symbols = ['SYM_A','SYM_B','SYM_C','SYM_D','SYM_E']
+        base_prices = {'SYM_A':100.0,'SYM_B':98.0,'SYM_C':150.0,'SYM_D':50.0,'SYM_E':200.0}
 
-    # prepare components
-    exec_model = DeterministicExecutionModel(slippage_abs=cfg['backtest'].get('slippage_abs',0.0),
-                                            slippage_pct=cfg['backtest'].get('slippage_pct',0.0),
-                                            tick_size=0.01,lot_size=1.0,seed=seed)
-    datahandler = DataHandler()
-    om = OrderManager(exec_model, lambda o: ndjson_writer(order_path,o), lambda f: ndjson_writer(fill_path,f),
-                      fee_per_trade=cfg['backtest'].get('commission_per_trade',0.0))
+        # prepare components
+        exec_model = DeterministicExecutionModel(slippage_abs=cfg['backtest'].get('slippage_abs',0.0),
+                                                slippage_pct=cfg['backtest'].get('slippage_pct',0.0),
+                                                tick_size=0.01,lot_size=1.0,seed=seed)
+        bcfg = cfg.get('bars',{})
+        datahandler = DataHandler(timeframes=bcfg.get('timeframes',['1min']), session_start=bcfg.get('session_start','00:00'))
+        om = OrderManager(exec_model, order_w, fill_w,
+                          fee_per_trade=cfg['backtest'].get('commission_per_trade',0.0),
+                          history=cfg['backtest'].get('trade_history', 0))
 
-    # instantiate alphas (use same config)
-    acfg = cfg.get('alphas',{})
-    alpha1 = AlphaPairs('SYM_A','SYM_B', lookback=acfg.get('alpha_1_pairs',{}).get('lookback',60),
-                        z_enter=acfg.get('alpha_1_pairs',{}).get('z_enter',2.0),
-                        z_exit=acfg.get('alpha_1_pairs',{}).get('z_exit',0.5), seed=seed)
-    alpha2 = AlphaBreakout('SYM_C', lookback=acfg.get('alpha_2_breakout',{}).get('lookback',20))
-    alpha3 = AlphaMTF('SYM_D', fast=acfg.get('alpha_3_mtf',{}).get('fast',8), slow=acfg.get('alpha_3_mtf',{}).get('slow',34))
-    alpha4 = AlphaMultiAsset(acfg.get('alpha_4_multi_asset',{}).get('symbols',['SYM_A','SYM_B','SYM_C']))
-    alpha5 = AlphaOrderbook('SYM_E', imbalance_threshold=acfg.get('alpha_5_orderbook',{}).get('imbalance_threshold',0.2))
+        # instantiate alphas (use same config)
+        acfg = cfg.get('alphas',{})
+        alpha1 = AlphaPairs('SYM_A','SYM_B', lookback=acfg.get('alpha_1_pairs',{}).get('lookback',60),
+                            z_enter=acfg.get('alpha_1_pairs',{}).get('z_enter',2.0),
+                            z_exit=acfg.get('alpha_1_pairs',{}).get('z_exit',0.5), seed=seed)
+        alpha2 = AlphaBreakout('SYM_C', lookback=acfg.get('alpha_2_breakout',{}).get('lookback',20))
+        alpha3 = AlphaMTF('SYM_D', fast=acfg.get('alpha_3_mtf',{}).get('fast',8), slow=acfg.get('alpha_3_mtf',{}).get('slow',34),
+                          htf=acfg.get('alpha_3_mtf',{}).get('htf'), htf_span=acfg.get('alpha_3_mtf',{}).get('htf_span',6))
+        if alpha3.htf:
+            datahandler.subscribe(alpha3.symbol, alpha3.htf, alpha3.on_htf_bar)
+        alpha4 = AlphaMultiAsset(acfg.get('alpha_4_multi_asset',{}).get('symbols',['SYM_A','SYM_B','SYM_C']))
+        alpha5 = AlphaOrderbook('SYM_E', imbalance_threshold=acfg.get('alpha_5_orderbook',{}).get('imbalance_threshold',0.2))
 
-    # run deterministic ticks
-    start_ts = datetime.utcnow().replace(tzinfo=timezone.utc)
-    ts = start_ts
-    end_ts = start_ts + timedelta(seconds=duration_seconds)
-    logger.info("Simulator starting run %s from %s to %s", run_id, iso_now(start_ts), iso_now(end_ts))
-    while ts < end_ts:
-        for s in symbols:
-            tick = generate_tick(s, base_prices[s], ts)
-            ndjson_writer(market_path, tick)
-            datahandler.ingest_tick(tick)
-            # build 1min bars when ts.second == 0 (approx simulate)
-            # simpler: attempt to get last bars and call alphas if possible
-            bar_s = datahandler.get_last_bar(s, timeframe='1min')
-            # pair alpha check
-            bar_a = datahandler.get_last_bar(alpha1.symbol_a, timeframe='1min')
-            bar_b = datahandler.get_last_bar(alpha1.symbol_b, timeframe='1min')
-            if bar_a and bar_b:
-                sig = alpha1.on_bar(bar_a, bar_b, tick['ts'])
-                if sig:
-                    ndjson_writer(signal_path, sig)
-                    # process pair signal into two market orders
-                    if sig['signal'] == 'short_a_long_b':
-                        om.submit_market_order(sig['alpha'], alpha1.symbol_a, 'sell', 1, datahandler.get_last_bar(alpha1.symbol_a)['close'], tick['ts'])
-                        om.submit_market_order(sig['alpha'], alpha1.symbol_b, 'buy', 1, datahandler.get_last_bar(alpha1.symbol_b)['close'], tick['ts'])
-                    elif sig['signal'] == 'long_a_short_b':
-                        om.submit_market_order(sig['alpha'], alpha1.symbol_a, 'buy', 1, datahandler.get_last_bar(alpha1.symbol_a)['close'], tick['ts'])
-                        om.submit_market_order(sig['alpha'], alpha1.symbol_b, 'sell', 1, datahandler.get_last_bar(alpha1.symbol_b)['close'], tick['ts'])
-            # breakout
-            bar2 = datahandler.get_last_bar(alpha2.symbol, timeframe='1min')
-            if bar2:
-                sig2 = alpha2.on_bar(bar2, tick['ts'])
-                if sig2:
-                    ndjson_writer(signal_path, sig2)
-                    om.submit_market_order(sig2['alpha'], sig2['symbol'], 'buy', sig2['size'], bar2['close'], tick['ts'])
-            # MTF
-            bar3 = datahandler.get_last_bar(alpha3.symbol, timeframe='1min')
-            if bar3:
-                sig3 = alpha3.on_bar_minute(bar3, tick['ts'])
-                if sig3:
-                    ndjson_writer(signal_path, sig3)
-                    om.submit_market_order(sig3['alpha'], sig3['symbol'], 'buy' if sig3['signal']=='long' else 'sell', sig3['size'], bar3['close'], tick['ts'])
-            # multiasset
-            bars = {x: datahandler.get_last_bar(x, timeframe='1min') for x in alpha4.symbols}
-            if any(bars.values()):
-                sig4 = alpha4.on_bar(bars, tick['ts'])
-                if sig4:
-                    ndjson_writer(signal_path, sig4)
-                    om.submit_market_order(sig4['alpha'], sig4['symbol'], 'buy', sig4['size'], bars[sig4['symbol']]['close'], tick['ts'])
-            # l2 events for SYM_E every 5 seconds
-            if ts.second % 5 == 0 and s == 'SYM_E':
-                l2 = generate_l2('SYM_E', base_prices['SYM_E'], ts)
-                ndjson_writer(market_path, l2)
-                sig5 = alpha5.on_book({'bids': l2['bids'], 'asks': l2['asks']}, l2['ts'])
-                if sig5:
-                    ndjson_writer(signal_path, sig5)
-                    # pick top price for SYM_E
-                    top_price = l2['bids'][0]['price'] if sig5['signal'].startswith('buy') else l2['asks'][0]['price']
-                    om.submit_market_order(sig5['alpha'], sig5['symbol'], 'buy' if sig5['signal'].startswith('buy') else 'sell', sig5['size'], top_price, l2['ts'])
-        ts += timedelta(seconds=1)
+        # run deterministic ticks
+        start_ts = datetime.utcnow().replace(tzinfo=timezone.utc)
+        ts = start_ts
+        end_ts = start_ts + timedelta(seconds=duration_seconds)
+        logger.info("Simulator starting run %s from %s to %s", run_id, iso_now(start_ts), iso_now(end_ts))
+        while ts < end_ts:
+            for s in symbols:
+                tick = generate_tick(s, base_prices[s], ts)
+                market_w(tick)
+                datahandler.ingest_tick(tick)
+                # build 1min bars when ts.second == 0 (approx simulate)
+                # simpler: attempt to get last bars and call alphas if possible
+                bar_s = datahandler.get_last_bar(s, timeframe='1min')
+                # pair alpha check
+                bar_a = datahandler.get_last_bar(alpha1.symbol_a, timeframe='1min')
+                bar_b = datahandler.get_last_bar(alpha1.symbol_b, timeframe='1min')
+                if bar_a and bar_b:
+                    sig = alpha1.on_bar(bar_a, bar_b, tick['ts'])
+                    if sig:
+                        signal_w(sig)
+                        # process pair signal into two market orders
+                        if sig['signal'] == 'short_a_long_b':
+                            om.submit_market_order(sig['alpha'], alpha1.symbol_a, 'sell', 1, datahandler.get_last_bar(alpha1.symbol_a)['close'], tick['ts'])
+                            om.submit_market_order(sig['alpha'], alpha1.symbol_b, 'buy', 1, datahandler.get_last_bar(alpha1.symbol_b)['close'], tick['ts'])
+                        elif sig['signal'] == 'long_a_short_b':
+                            om.submit_market_order(sig['alpha'], alpha1.symbol_a, 'buy', 1, datahandler.get_last_bar(alpha1.symbol_a)['close'], tick['ts'])
+                            om.submit_market_order(sig['alpha'], alpha1.symbol_b, 'sell', 1, datahandler.get_last_bar(alpha1.symbol_b)['close'], tick['ts'])
+                # breakout
+                bar2 = datahandler.get_last_bar(alpha2.symbol, timeframe='1min')
+                if bar2:
+                    sig2 = alpha2.on_bar(bar2, tick['ts'])
+                    if sig2:
+                        signal_w(sig2)
+                        om.submit_market_order(sig2['alpha'], sig2['symbol'], 'buy', sig2['size'], bar2['close'], tick['ts'])
+                # MTF
+                bar3 = datahandler.get_last_bar(alpha3.symbol, timeframe='1min')
+                if bar3:
+                    sig3 = alpha3.on_bar_minute(bar3, tick['ts'])
+                    if sig3:
+                        signal_w(sig3)
+                        om.submit_market_order(sig3['alpha'], sig3['symbol'], 'buy' if sig3['signal']=='long' else 'sell', sig3['size'], bar3['close'], tick['ts'])
+                # multiasset
+                bars = {x: datahandler.get_last_bar(x, timeframe='1min') for x in alpha4.symbols}
+                if any(bars.values()):
+                    sig4 = alpha4.on_bar(bars, tick['ts'])
+                    if sig4:
+                        signal_w(sig4)
+                        om.submit_market_order(sig4['alpha'], sig4['symbol'], 'buy', sig4['size'], bars[sig4['symbol']]['close'], tick['ts'])
+                # l2 events for SYM_E every 5 seconds
+                if ts.second % 5 == 0 and s == 'SYM_E':
+                    l2 = generate_l2('SYM_E', base_prices['SYM_E'], ts)
+                    market_w(l2)
+                    sig5 = alpha5.on_book({'bids': l2['bids'], 'asks': l2['asks']}, l2['ts'])
+                    if sig5:
+                        signal_w(sig5)
+                        # pick top price for SYM_E
+                        top_price = l2['bids'][0]['price'] if sig5['signal'].startswith('buy') else l2['asks'][0]['price']
+                        om.submit_market_order(sig5['alpha'], sig5['symbol'], 'buy' if sig5['signal'].startswith('buy') else 'sell', sig5['size'], top_price, l2['ts'])
+            ts += timedelta(seconds=1)
+    finally:
+        for w in (market_w, order_w, fill_w, signal_w):
+            w.close()
     # write run metadata
     meta = {'run_id': run_id, 'seed': cfg.get('seed'), 'start_ts': iso_now(start_ts), 'end_ts': iso_now(end_ts)}
     ndjson_writer(os.path.join(cfg['storage']['base_path'], f"{run_id}_metadata.json"), meta)
@@ -163,4 +179,13 @@ if __name__ == '__main__':
     with open(args.config,'r') as f:
         cfg = yaml.safe_load(f)
     out = create_simulated_run(cfg, run_id=args.run_id, duration_seconds=args.duration)
+    from framework.run_registry import open_registry, config_hash, input_key
+    registry = open_registry(cfg)
+    if registry is not None:
+        # sandbox runs start at wall-clock time, so each one is a distinct entry (registered, never served from cache)
+        market_fp = registry.fingerprint(out['market_log'])
+        registry.register('simulate', input_key('simulate', config_hash(cfg), cfg.get('seed'), market_fp),
+                          out_dir=cfg['storage']['base_path'], cfg=cfg, seed=cfg.get('seed'), market_fp=market_fp,
+                          artifacts=out, params={'run_id': args.run_id, 'duration': args.duration})
+        registry.close()
     print(json.dumps(out, indent=2))
@@ -0,0 +1,318 @@
+"""
+Benchmark suite with deterministic synthetic workloads and regression tracking.
+Usage:
+  python -m src.tools.benchmark generate --scale small
+  python -m src.tools.benchmark run --scale small --out results/bench/current.json [--cases replay,bars] [--repeat 3]
+  python -m src.tools.benchmark compare <baseline.json> <current.json> [--threshold 0.10]
+
+Scales (events / symbols): small 10k/5, medium 1M/50, large 10M/1000; override with --events/--symbols.
+Every case runs in a fresh spawned process so peak RSS (ru_maxrss) is attributable to that case.
+`compare` exits with status 1 when throughput drops or peak RSS grows by more than the threshold.
+"""
+import argparse, json, os, platform, random, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+SCALES = {
+    'small': {'events': 10_000, 'symbols': 5},
+    'medium': {'events': 1_000_000, 'symbols': 50},
+    'large': {'events': 10_000_000, 'symbols': 1000},
+}
+CASES = ('replay', 'parse', 'bars', 'alphas', 'execution', 'comparator')
+WORKLOAD_DIR = os.path.join('results', 'bench', 'workloads')
+# the configured alphas trade SYM_A..SYM_E, so those names come first
+NAMED_SYMBOLS = ['SYM_A', 'SYM_B', 'SYM_C', 'SYM_D', 'SYM_E']
+START = '2025-10-01T00:00:00Z'
+
+def symbol_names(n_symbols):
+    return [NAMED_SYMBOLS[i] if i < len(NAMED_SYMBOLS) else f"SYM_{i:04d}" for i in range(n_symbols)]
+
+def iter_workload(n_events, n_symbols, seed=20251106, l2_every=10):
+    """
+    Deterministic market events: each second every symbol prints one tick (random-walk price),
+    and every l2_every seconds SYM_E (or the last symbol) publishes a 3-level L2 snapshot.
+    """
+    rng = random.Random(seed)
+    symbols = symbol_names(n_symbols)
+    book_sym = 'SYM_E' if 'SYM_E' in symbols else symbols[-1]
+    prices = {s: 50.0 + 150.0 * rng.random() for s in symbols}
+    ts = datetime.fromisoformat(START.replace('Z', '+00:00'))
+    n = 0
+    step = 0
+    while True:
+        iso = ts.isoformat().replace('+00:00', 'Z')
+        for s in symbols:
+            p = prices[s] = round(prices[s] * (1 + rng.gauss(0, 0.0005)), 4)
+            yield {'msg_type': 'tick', 'symbol': s, 'ts': iso, 'price': p, 'size': float(rng.randint(1, 10))}
+            n += 1
+            if n >= n_events:
+                return
+        if step % l2_every == 0:
+            p = prices[book_sym]
+            yield {'msg_type': 'l2_update', 'symbol': book_sym, 'ts': iso,
+                   'bids': [{'price': round(p * (1 - 0.0001 * i), 4), 'size': rng.randint(5, 20)} for i in range(3)],
+                   'asks': [{'price': round(p * (1 + 0.0001 * i), 4), 'size': rng.randint(5, 20)} for i in range(3)]}
+            n += 1
+            if n >= n_events:
+                return
+        step += 1
+        ts += timedelta(seconds=1)
+
+def workload_path(n_events, n_symbols, seed, workload_dir=WORKLOAD_DIR):
+    return os.path.join(workload_dir, f"bench_{n_events}e_{n_symbols}s_{seed}.ndjson")
+
+def generate_workload(n_events, n_symbols, seed=20251106, workload_dir=WORKLOAD_DIR, force=False):
+    """Write the workload market log once (streamed, constant memory) and return its path."""
+    path = workload_path(n_events, n_symbols, seed, workload_dir)
+    if os.path.exists(path) and not force:
+        return path
+    os.makedirs(workload_dir, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        buf = []
+        for ev in iter_workload(n_events, n_symbols, seed):
+            buf.append(json.dumps(ev))
+            if len(buf) >= 4096:
+                f.write('\n'.join(buf) + '\n')
+                buf = []
+        if buf:
+            f.write('\n'.join(buf) + '\n')
+    os.replace(tmp, path)
+    return path
+
+def _bench_config(base_path):
+    return {'seed': 20251106, 'storage': {'base_path': base_path},
+            'backtest': {'initial_cash': 100000.0, 'slippage_abs': 0.0, 'slippage_pct': 0.0001,
+                         'commission_per_trade': 0.0},
+            'alphas': {}}
+
+def _synthetic_bars(n, seed=7):
+    rng = random.Random(seed)
+    px = 100.0
+    for i in range(n):
+        o = px
+        px = px * (1 + rng.gauss(0, 0.001))
+        yield {'open': o, 'high': max(o, px) * 1.0005, 'low': min(o, px) * 0.9995, 'close': px,
+               'volume': 10.0, 'ts': f"bar{i}"}
+
+# --- cases: each returns its operation count, or a dict of per-component timings ---
+
+def case_replay(market_log, tmp):
+    from backtest.engine import BacktestEngine
+    from framework.replay import ReplayEngine
+    class CountingReplay(ReplayEngine):
+        n = 0
+        def stream_events(self):
+            for ev in super().stream_events():
+                self.n += 1
+                yield ev
+    re = CountingReplay(market_log)
+    BacktestEngine(_bench_config(tmp)).run_replay(re, os.path.join(tmp, 'replay'))
+    return re.n
+
+def case_parse(market_log, tmp):
+    from framework.replay import ReplayEngine
+    n = 0
+    for _ in ReplayEngine(market_log).stream_events():
+        n += 1
+    return n
+
+def case_bars(market_log, tmp):
+    from framework.datahandler import DataHandler
+    from framework.replay import ReplayEngine
+    dh = DataHandler()
+    n = 0
+    for ev in ReplayEngine(market_log).stream_events():
+        if ev.get('msg_type', 'tick') != 'tick':
+            continue
+        dh.ingest_tick(ev)
+        dh.get_last_bar(ev['symbol'], timeframe='1min')
+        n += 1
+    return n
+
+def case_alphas(market_log, tmp, n_bars=20000):
+    from alphas.alpha_pairs import AlphaPairs
+    from alphas.alpha_breakout import AlphaBreakout
+    from alphas.alpha_mtf import AlphaMTF
+    from alphas.alpha_multiasset import AlphaMultiAsset
+    from alphas.alpha_orderbook import AlphaOrderbook
+    bars_a = list(_synthetic_bars(n_bars, seed=1))
+    bars_b = list(_synthetic_bars(n_bars, seed=2))
+    book = {'bids': [{'price': 99.9, 'size': 12}, {'price': 99.8, 'size': 11}],
+            'asks': [{'price': 100.1, 'size': 10}, {'price': 100.2, 'size': 9}]}
+    timings = {}
+    def timed(name, fn, bars):
+        t0 = time.perf_counter()
+        for bar in bars:
+            fn(bar)
+        elapsed = time.perf_counter() - t0
+        timings[name] = {'seconds': elapsed, 'ops': len(bars), 'ops_per_sec': len(bars) / max(elapsed, 1e-12)}
+    a1 = AlphaPairs('SYM_A', 'SYM_B')
+    pairs = list(zip(bars_a, bars_b))
+    timed('alpha_1_pairs', lambda ab: a1.on_bar(ab[0], ab[1], ab[0]['ts']), pairs)
+    a2 = AlphaBreakout('SYM_C')
+    timed('alpha_2_breakout', lambda a: a2.on_bar(a, a['ts']), bars_a)
+    a3 = AlphaMTF('SYM_D')
+    timed('alpha_3_mtf', lambda a: a3.on_bar_minute(a, a['ts']), bars_a)
+    a4 = AlphaMultiAsset(['SYM_A', 'SYM_B', 'SYM_C'])
+    timed('alpha_4_multi_asset', lambda a: a4.on_bar({'SYM_A': a}, a['ts']), bars_a)
+    a5 = AlphaOrderbook('SYM_E')
+    timed('alpha_5_orderbook', lambda a: a5.on_book(book, a['ts']), bars_a)
+    return timings
+
+def case_execution(market_log, tmp, n=200000):
+    from framework.execution_model import DeterministicExecutionModel
+    em = DeterministicExecutionModel(slippage_pct=0.0001, seed=1)
+    for i in range(n):
+        em.fill_market(str(i), 'SYM_A', 'buy', 1.0, 100.0 + (i % 100) * 0.01, START)
+    return n
+
+def case_comparator(market_log, tmp, n=100000):
+    from framework.execution_model import DeterministicExecutionModel
+    from tools.compare_runs import compare
+    import contextlib, io
+    em = DeterministicExecutionModel(slippage_pct=0.0001, seed=1)
+    prefix = os.path.join(tmp, 'sandbox')
+    replay_dir = os.path.join(tmp, 'replay_cmp')
+    os.makedirs(replay_dir, exist_ok=True)
+    with open(prefix + '_fill.ndjson', 'w') as fs, open(os.path.join(replay_dir, 'fill_log.ndjson'), 'w') as fr:
+        for i in range(n):
+            d = em.fill_market(str(i), 'SYM_A', 'buy' if i % 2 else 'sell', 1.0, 100.0 + (i % 100) * 0.01, START).to_dict()
+            d['alpha'] = f"alpha_{i % 5}"
+            line = json.dumps(d) + '\n'
+            fs.write(line)
+            fr.write(line)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        compare(prefix, replay_dir, os.path.join(tmp, 'results.json'))
+    elapsed = time.perf_counter() - t0
+    return {'seconds': elapsed, 'ops': n, 'ops_per_sec': n / max(elapsed, 1e-12)}
+
+def _peak_rss_kb():
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def _run_case_in_process(case, market_log):
+    """Entry point of the child process: run one case, print a JSON result line."""
+    fn = globals()['case_' + case]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        res = fn(market_log, tmp)
+        elapsed = time.perf_counter() - t0
+    if isinstance(res, dict) and 'seconds' not in res:
+        out = {'components': res, 'seconds': elapsed}
+    elif isinstance(res, dict):
+        out = res
+    else:
+        out = {'seconds': elapsed, 'ops': res, 'ops_per_sec': res / max(elapsed, 1e-12)}
+    out['peak_rss_kb'] = _peak_rss_kb()
+    print(json.dumps(out))
+
+def run_case(case, market_log, timeout=None):
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = src_dir + os.pathsep + env.get('PYTHONPATH', '')
+    proc = subprocess.run([sys.executable, '-m', 'tools.benchmark', '_case', case, market_log],
+                          capture_output=True, text=True, env=env, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError(f"benchmark case {case} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def _flatten(results):
+    """{'case' or 'case.component': {ops_per_sec, peak_rss_kb}} for comparison."""
+    flat = {}
+    for case, r in results.get('cases', {}).items():
+        if 'components' in r:
+            for comp, cr in r['components'].items():
+                flat[f"{case}.{comp}"] = {'ops_per_sec': cr['ops_per_sec']}
+            flat[case] = {'peak_rss_kb': r.get('peak_rss_kb')}
+        else:
+            flat[case] = {'ops_per_sec': r.get('ops_per_sec'), 'peak_rss_kb': r.get('peak_rss_kb')}
+    return flat
+
+def find_regressions(baseline, current, threshold=0.10):
+    """
+    Compare two result documents. A regression is a throughput drop or a peak-RSS increase
+    larger than `threshold` (relative). Returns a list of dicts describing each regression.
+    """
+    regressions = []
+    base, cur = _flatten(baseline), _flatten(current)
+    for key in sorted(set(base) & set(cur)):
+        b, c = base[key], cur[key]
+        if b.get('ops_per_sec') and c.get('ops_per_sec') is not None:
+            change = c['ops_per_sec'] / b['ops_per_sec'] - 1.0
+            if change < -threshold:
+                regressions.append({'benchmark': key, 'metric': 'ops_per_sec', 'baseline': b['ops_per_sec'],
+                                    'current': c['ops_per_sec'], 'change': round(change, 4)})
+        if b.get('peak_rss_kb') and c.get('peak_rss_kb') is not None:
+            change = c['peak_rss_kb'] / b['peak_rss_kb'] - 1.0
+            if change > threshold:
+                regressions.append({'benchmark': key, 'metric': 'peak_rss_kb', 'baseline': b['peak_rss_kb'],
+                                    'current': c['peak_rss_kb'], 'change': round(change, 4)})
+    return regressions
+
+def run_suite(n_events, n_symbols, seed=20251106, cases=CASES, repeat=1, workload_dir=WORKLOAD_DIR):
+    market_log = generate_workload(n_events, n_symbols, seed, workload_dir)
+    results = {'metadata': {'created': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+                            'python': platform.python_version(), 'platform': platform.platform(),
+                            'events': n_events, 'symbols': n_symbols, 'seed': seed, 'repeat': repeat},
+               'cases': {}}
+    for case in cases:
+        runs = [run_case(case, market_log) for _ in range(repeat)]
+        # keep the fastest run: least disturbed by other load on the machine
+        results['cases'][case] = min(runs, key=lambda r: r['seconds'])
+        print(f"{case}: {json.dumps(results['cases'][case])}", file=sys.stderr)
+    return results
+
+def main(argv=None):
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='cmd')
+    for name in ('generate', 'run'):
+        s = sub.add_parser(name)
+        s.add_argument('--scale', choices=sorted(SCALES), default='small')
+        s.add_argument('--events', type=int, default=None)
+        s.add_argument('--symbols', type=int, default=None)
+        s.add_argument('--seed', type=int, default=20251106)
+        s.add_argument('--workload_dir', default=WORKLOAD_DIR)
+    r = sub.choices['run']
+    r.add_argument('--cases', default=','.join(CASES))
+    r.add_argument('--repeat', type=int, default=1)
+    r.add_argument('--out', default=os.path.join('results', 'bench', 'current.json'))
+    c = sub.add_parser('compare')
+    c.add_argument('baseline')
+    c.add_argument('current')
+    c.add_argument('--threshold', type=float, default=0.10)
+    k = sub.add_parser('_case')
+    k.add_argument('case', choices=CASES)
+    k.add_argument('market_log')
+    args = p.parse_args(argv)
+    if args.cmd in ('generate', 'run'):
+        n_events = args.events or SCALES[args.scale]['events']
+        n_symbols = args.symbols or SCALES[args.scale]['symbols']
+        if args.cmd == 'generate':
+            print(generate_workload(n_events, n_symbols, args.seed, args.workload_dir))
+            return 0
+        cases = [x for x in args.cases.split(',') if x]
+        results = run_suite(n_events, n_symbols, args.seed, cases, args.repeat, args.workload_dir)
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print("Wrote benchmark results to", args.out)
+        return 0
+    if args.cmd == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = find_regressions(baseline, current, args.threshold)
+        print(json.dumps({'threshold': args.threshold, 'regressions': regressions}, indent=2))
+        return 1 if regressions else 0
+    if args.cmd == '_case':
+        _run_case_in_process(args.case, args.market_log)
+        return 0
+    p.print_help()
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
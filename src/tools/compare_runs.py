@@ -1,14 +1,18 @@
 """
 Compare sandbox run vs replay run and produce results.json according to required schema.
 Usage:
-  python -m src.tools.compare_runs <sandbox_dir_prefix> <replay_out_dir> <out_results_json>
+  python -m src.tools.compare_runs <sandbox_dir_prefix> <replay_out_dir> <out_results_json> [--config configs/config.yaml]
+
+The result is registered in the config's run registry (storage.registry, as for replay/backtest;
+nothing is registered when it is null). --registry <path> overrides it.
 
 sandbox_dir_prefix: path prefix used in simulator outputs, e.g. results/run_local_001
 replay_out_dir: directory with 'fill_log.ndjson' and 'order_log.ndjson' created by backtest replay
 """
-import json, os, sys
+import argparse, json, os
 from collections import defaultdict
 from datetime import datetime
+from framework.ndjson import open_text, resolve_log_path
 
 """def load_ndjson(path):
     items = []
@@ -25,16 +29,18 @@ def load_ndjson(path):
     """
     Robust NDJSON loader.
     - If file missing -> returns empty list
+    - Compressed variants (<path>.gz/.xz/.bgz) are found and decompressed transparently
     - For each physical line:
         * try json.loads(line) (fast path)
         * otherwise attempt to parse multiple JSON objects from the line using raw_decode
     - Skips empty lines and logs/parses as many valid objects as possible (best-effort).
     """
     items = []
+    path = resolve_log_path(path)
     if not os.path.exists(path):
         return items
     decoder = json.JSONDecoder()
-    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+    with open_text(path, 'r', errors='ignore') as f:
         for lineno, raw in enumerate(f, start=1):
             s = raw.strip()
             if not s:
@@ -84,7 +90,7 @@ def summarize_trades(fills):
         per_alpha[alpha]['trades'] += 1
     return per_alpha
 
-def compare(sandbox_prefix, replay_dir, out_path):
+def compare(sandbox_prefix, replay_dir, out_path, registry=None):
     # paths produced by simulator: <sandbox_prefix>_market.ndjson, <sandbox_prefix>_fill.ndjson, etc
     sandbox_market = sandbox_prefix + "_market.ndjson"
     sandbox_fill = sandbox_prefix + "_fill.ndjson"
@@ -169,10 +175,43 @@ def compare(sandbox_prefix, replay_dir, out_path):
         json.dump(results, f, indent=2)
 
     print("Wrote results to", out_path)
+    if registry is not None:
+        register_result(registry, results, out_path, sandbox_fill, replay_fill)
     return results
 
+def register_result(registry, results, out_path, sandbox_fill, replay_fill):
+    from framework.run_registry import input_key
+    sandbox_fill, replay_fill = resolve_log_path(sandbox_fill), resolve_log_path(replay_fill)
+    fps = [registry.fingerprint(p) if os.path.exists(p) else '' for p in (sandbox_fill, replay_fill)]
+    pnl = results['portfolio_pnl']
+    metrics = {'sandbox_pnl': pnl['sandbox_pnl'], 'backtest_pnl': pnl['backtest_pnl'],
+               'pnl_match': 1.0 if pnl['pnl_match'] == 'PASS' else 0.0,
+               'alphas': {k: {'trades': v['trades'], 'pnl': v['pnl'], 'match': 1.0 if v['match'] == 'PASS' else 0.0}
+                          for k, v in results['alphas'].items()}}
+    return registry.register('compare', input_key('compare', *fps), out_dir=os.path.dirname(out_path) or '.',
+                             metrics=metrics, artifacts={'results': out_path, **results['mismatch_reports']},
+                             params={'sandbox_fill': sandbox_fill, 'replay_fill': replay_fill})
+
+def open_compare_registry(config_path, registry_path=None):
+    """Registry from --registry if given, else the config's storage.registry (None when disabled)."""
+    from framework.run_registry import RunRegistry, open_registry
+    if registry_path:
+        return RunRegistry(registry_path)
+    import yaml
+    with open(config_path) as f:
+        return open_registry(yaml.safe_load(f) or {})
+
 if __name__ == '__main__':
-    if len(sys.argv) < 4:
-        print("usage: compare_runs <sandbox_prefix> <replay_dir> <out_path>")
-        raise SystemExit(1)
-    compare(sys.argv[1], sys.argv[2], sys.argv[3])
+    p = argparse.ArgumentParser(description='Compare a sandbox run with a replay run')
+    p.add_argument('sandbox_prefix')
+    p.add_argument('replay_dir')
+    p.add_argument('out_path')
+    p.add_argument('--config', default='configs/config.yaml')
+    p.add_argument('--registry', default=None, help='registry path (overrides storage.registry in the config)')
+    args = p.parse_args()
+    registry = open_compare_registry(args.config, args.registry)
+    try:
+        compare(args.sandbox_prefix, args.replay_dir, args.out_path, registry=registry)
+    finally:
+        if registry is not None:
+            registry.close()
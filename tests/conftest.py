@@ -0,0 +1,41 @@
+import json, math, random
+from datetime import datetime, timedelta, timezone
+import pytest
+
+SYMBOLS = ('SYM_A', 'SYM_B', 'SYM_C', 'SYM_D', 'SYM_E')
+
+def _events(minutes, seed, step=3):
+    """
+    One tick per symbol every `step` seconds, plus a 3-level SYM_E book every 30s.
+    SYM_B follows SYM_A with a mean-reverting spread, so the pairs alpha trades.
+    """
+    rng = random.Random(seed)
+    ts = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    common, spread = 0.0, 0.0
+    walk = {s: 0.0 for s in SYMBOLS[2:]}
+    base = {'SYM_A': 100.0, 'SYM_B': 98.0, 'SYM_C': 150.0, 'SYM_D': 50.0, 'SYM_E': 200.0}
+    for sec in range(0, minutes * 60, step):
+        iso = ts.isoformat().replace('+00:00', 'Z')
+        common += rng.gauss(0, 0.0004)
+        spread = 0.98 * spread + rng.gauss(0, 0.0004)
+        for s in walk:
+            walk[s] += rng.gauss(0, 0.0005)
+        logp = {'SYM_A': common + spread, 'SYM_B': common - spread, **walk}
+        for s in SYMBOLS:
+            yield {'msg_type': 'tick', 'symbol': s, 'ts': iso, 'price': round(base[s] * math.exp(logp[s]), 4),
+                   'size': float(rng.randint(1, 10))}
+        if sec % 30 == 0:
+            p = round(base['SYM_E'] * math.exp(logp['SYM_E']), 4)
+            yield {'msg_type': 'l2_update', 'symbol': 'SYM_E', 'ts': iso,
+                   'bids': [{'price': round(p * (1 - 0.0001 * i), 4), 'size': rng.randint(5, 20)} for i in range(3)],
+                   'asks': [{'price': round(p * (1 + 0.0001 * i), 4), 'size': rng.randint(5, 20)} for i in range(3)]}
+        ts += timedelta(seconds=step)
+
+@pytest.fixture(scope='session')
+def market_log(tmp_path_factory):
+    """Path to a 60 minute, 5 symbol market log (~6k events), written once per test session."""
+    path = tmp_path_factory.mktemp('market') / 'market.ndjson'
+    with open(path, 'w') as f:
+        for ev in _events(60, seed=11):
+            f.write(json.dumps(ev) + '\n')
+    return str(path)
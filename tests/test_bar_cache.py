@@ -0,0 +1,78 @@
+import json, os, resource, yaml
+import numpy as np
+from framework.bar_cache import BarCache, bar_spec_key, build_bars, load_bars
+from framework.datahandler import DataHandler
+from framework.ndjson import iter_ndjson
+from backtest.engine import BacktestEngine
+
+TFS = ['1min', '5min']
+
+def test_cached_bars_match_datahandler(tmp_path, market_log):
+    log = market_log
+    dh = DataHandler(timeframes=TFS)
+    for ev in iter_ndjson(log):
+        if ev['msg_type'] == 'tick':
+            dh.ingest_tick(ev)
+    cfg = {'bars': {'timeframes': TFS}, 'storage': {'bar_cache': {'path': str(tmp_path / 'cache')}}}
+    bars = load_bars(cfg, log)
+    assert isinstance(bars['SYM_A']['1min']['close'], np.memmap)
+    for sym in ('SYM_A', 'SYM_E'):
+        for tf in TFS:
+            expected = dh.rollups[sym].bars(tf)
+            cols = bars[sym][tf]
+            assert list(cols['ts_ns']) == [b['ts_ns'] for b in expected]
+            assert list(cols['close']) == [b['close'] for b in expected]
+            assert list(cols['volume']) == [b['volume'] for b in expected]
+    # second load is a hit on the same entry
+    assert len(BarCache(str(tmp_path / 'cache')).entries()) == 1
+    assert list(load_bars(cfg, log)['SYM_B']['1min']['open']) == list(bars['SYM_B']['1min']['open'])
+
+def test_indicator_columns_are_cached_with_bars(tmp_path, market_log):
+    cfg = {'bars': {'timeframes': TFS}, 'storage': {'bar_cache': {'path': str(tmp_path / 'cache')}}}
+    calls = []
+    def range_pct(cols):
+        calls.append(1)
+        return (cols['high'] - cols['low']) / cols['close']
+    first = load_bars(cfg, market_log, indicators={'range_pct': range_pct})
+    again = load_bars(cfg, market_log, indicators={'range_pct': range_pct})
+    cols = again['SYM_C']['5min']
+    assert np.allclose(cols['range_pct'], (cols['high'] - cols['low']) / cols['close'])
+    assert len(calls) == len(first) * len(TFS)  # computed on the miss only
+    # plain bars live under a different key
+    assert 'range_pct' not in load_bars(cfg, market_log)['SYM_C']['5min']
+
+def test_cache_hit_uses_one_descriptor_for_many_symbols(tmp_path):
+    n = 300
+    cols = {c: np.arange(50, dtype=np.int64 if c == 'ts_ns' else np.float64) for c in ('ts_ns', 'open', 'high', 'low', 'close', 'volume')}
+    cache = BarCache(str(tmp_path))
+    cache.put('k', {f'S{i}': {tf: cols for tf in TFS} for i in range(n)})
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # far fewer descriptors than the n * len(TFS) * 6 columns in the entry
+    resource.setrlimit(resource.RLIMIT_NOFILE, (len(os.listdir('/proc/self/fd')) + 32, hard))
+    try:
+        bars = cache.get('k')
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert len(bars) == n and list(bars[f'S{n - 1}']['5min']['close']) == list(cols['close'])
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = BarCache(str(tmp_path), max_bytes=12_000)  # room for two entries
+    cols = {'ts_ns': np.arange(300, dtype=np.int64), 'close': np.ones(300)}
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'X': {'1min': cols}})
+        cache.get('a')  # keep 'a' hot
+    assert sorted(k for _, _, k in cache.entries()) == ['a', 'c']
+
+def test_bar_mode_engine_trades_from_cached_bars(tmp_path, market_log):
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['bars']['timeframes'] = TFS
+    bars = build_bars(market_log, TFS)
+    be = BacktestEngine(cfg)
+    be.run_bars(bars, str(tmp_path / 'out'))
+    metrics = json.loads((tmp_path / 'out' / 'metrics.json').read_text())
+    assert metrics['fills'] > 0 and 'alpha_4_multi_asset' in metrics['alphas']
+    assert metrics['periods'] == len(bars['SYM_A']['1min']['ts_ns'])
+    # no events are replayed in bar mode, so there is no market_replayed log to register
+    assert be.market_log_path is None and not (tmp_path / 'out' / 'market_replayed.ndjson').exists()
+    assert (tmp_path / 'out' / 'fill_log.ndjson').exists()
@@ -0,0 +1,106 @@
+import random
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from framework.bars import BarRollup
+from framework.datahandler import DataHandler
+from framework.timestamps import to_ns
+
+def _ticks(n=5000, seed=3):
+    rng = random.Random(seed)
+    ts = datetime(2025, 10, 1, 22, 0, tzinfo=timezone.utc)
+    px = 100.0
+    for _ in range(n):
+        ts += timedelta(seconds=rng.randint(1, 90))
+        px = round(px + rng.gauss(0, 0.05), 4)
+        yield {'symbol': 'SYM_A', 'ts': ts.isoformat().replace('+00:00', 'Z'), 'price': px, 'size': float(rng.randint(1, 5))}
+
+def test_rollup_matches_pandas_resample_per_timeframe():
+    dh = DataHandler(timeframes=['1min', '5min', '1H', '1D'])
+    completed = []
+    dh.subscribe('SYM_A', '1H', lambda sym, tf, bar: completed.append(bar))
+    ticks = list(_ticks())
+    for t in ticks:
+        dh.ingest_tick(t)
+    df = pd.DataFrame(ticks)
+    df['ts'] = pd.to_datetime(df['ts'])
+    df = df.set_index('ts')
+    for tf, freq in [('1min', '1min'), ('5min', '5min'), ('1H', '1h'), ('1D', '1D')]:
+        expected = pd.concat([df['price'].resample(freq).ohlc(), df['size'].resample(freq).sum().rename('volume')], axis=1).dropna()
+        got = dh.build_bars('SYM_A', tf)
+        assert list(got.index) == list(expected.index)
+        assert (got[['open', 'high', 'low', 'close', 'volume']].values == expected.values).all()
+    assert len(completed) == len(dh.build_bars('SYM_A', '1H')) - 1
+    assert dh.get_last_bar('SYM_A', '1H')['ts'] == dh.build_bars('SYM_A', '1H').index[-1].isoformat()
+
+def test_intraday_bars_restart_at_session_boundary():
+    # 150min does not divide the 24h session, so the last bucket of each session is clipped
+    r = BarRollup(['30min', '150min'], session_start='13:30')
+    start = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+    for i in range(24 * 60):
+        r.update(to_ns(start + timedelta(minutes=i)), 100.0, 1.0)
+    starts = [datetime.fromisoformat(b['ts']) for b in r.completed('150min')]
+    session = lambda t: (t - timedelta(hours=13, minutes=30)).date()
+    for s, nxt in zip(starts, starts[1:]):
+        # a bucket ends at the next bucket or the session start, whichever is first
+        assert session(s) == session(nxt - timedelta(minutes=1))
+    # previous session's last bucket (12:00) is cut short at 13:30, where the new session starts
+    assert starts[:2] == [datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc), datetime(2025, 10, 1, 13, 30, tzinfo=timezone.utc)]
+    assert r.completed('150min')[0]['volume'] == 90.0
+
+def test_bar_ts_formatted_once_per_bucket(monkeypatch):
+    import framework.bars as bars
+    fmt, calls = bars.format_bar_ts, []
+    monkeypatch.setattr(bars, 'format_bar_ts', lambda ns: calls.append(ns) or fmt(ns))
+    r = BarRollup(['1min', '5min'])
+    ticks = list(_ticks(300))
+    for t in ticks:
+        r.update(to_ns(t['ts']), t['price'], t['size'])
+        cur = r.current('1min')
+        for _ in range(8):  # the engine asks for the forming bars several times per tick
+            assert r.current('1min') is cur
+            assert r.current('5min')['ts'] == fmt(r.current('5min')['ts_ns'])
+        assert cur['ts'] == fmt(cur['ts_ns'])
+    minutes = {to_ns(t['ts']) // 60_000_000_000 for t in ticks}
+    assert len(calls) <= len(minutes) + len({m // 5 for m in minutes})
+
+def test_datahandler_keeps_bounded_history():
+    dh = DataHandler(timeframes=['1min', '5min'], history=50)
+    ticks = list(_ticks(2000))
+    for t in ticks:
+        dh.ingest_tick(t)
+    assert len(dh.tick_buffers['SYM_A']) == 50
+    assert dh.last_prices['SYM_A'] == ticks[-1]['price']
+    assert len(dh.rollups['SYM_A'].completed('1min')) == 50
+    assert len(dh.rollups['SYM_A'].completed('5min')) == 50
+    assert dh.build_bars('SYM_A', '1min').index[-1].isoformat() == dh.get_last_bar('SYM_A', '1min')['ts']
+
+def test_unconfigured_timeframe_last_bar_stays_current():
+    dh = DataHandler(timeframes=['1min'])
+    ticks = list(_ticks(600))
+    for t in ticks[:300]:
+        dh.ingest_tick(t)
+    assert dh.get_last_bar('SYM_A', '15min') is not None
+    for t in ticks[300:]:
+        dh.ingest_tick(t)
+    fresh = DataHandler(timeframes=['15min'])
+    for t in ticks:
+        fresh.ingest_tick(t)
+    assert dh.get_last_bar('SYM_A', '15min') == fresh.get_last_bar('SYM_A', '15min')
+
+def test_mtf_alpha_advances_once_per_minute_bar():
+    from alphas.alpha_mtf import AlphaMTF
+    per_tick, per_bar = AlphaMTF('SYM_A', fast=3, slow=5), AlphaMTF('SYM_A', fast=3, slow=5)
+    dh = DataHandler(timeframes=['1min'])
+    tick_sigs, prev = [], None
+    for t in _ticks(3000):
+        dh.ingest_tick(t)
+        bar = dh.get_last_bar('SYM_A', '1min')
+        if prev is not None and bar['ts_ns'] != prev['ts_ns']:
+            tick_sigs.append(last_sig)
+        last_sig = per_tick.on_bar_minute(bar, t['ts'])
+        prev = bar
+    # feeding every tick gives the same decision at each bar's last tick as feeding completed bars once
+    bar_sigs = [per_bar.on_bar_minute(b, b['ts']) for b in dh.rollups['SYM_A'].completed('1min')]
+    assert per_tick.n_bars == len(bar_sigs)
+    strip = lambda sigs: [s and s['signal'] for s in sigs]
+    assert strip(tick_sigs) == strip(bar_sigs)
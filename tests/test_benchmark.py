@@ -0,0 +1,22 @@
+import hashlib
+from tools.benchmark import generate_workload, find_regressions
+
+def test_workload_generation_is_deterministic(tmp_path):
+    p1 = generate_workload(2000, 7, seed=1, workload_dir=str(tmp_path / 'a'))
+    p2 = generate_workload(2000, 7, seed=1, workload_dir=str(tmp_path / 'b'))
+    digest = lambda p: hashlib.sha256(open(p, 'rb').read()).hexdigest()
+    assert digest(p1) == digest(p2)
+    assert sum(1 for _ in open(p1)) == 2000
+
+def test_find_regressions_flags_throughput_and_rss_beyond_threshold():
+    base = {'cases': {'parse': {'ops_per_sec': 1000.0, 'peak_rss_kb': 100},
+                      'alphas': {'components': {'alpha_2_breakout': {'ops_per_sec': 500.0}}, 'peak_rss_kb': 100}}}
+    cur = {'cases': {'parse': {'ops_per_sec': 950.0, 'peak_rss_kb': 150},
+                     'alphas': {'components': {'alpha_2_breakout': {'ops_per_sec': 300.0}}, 'peak_rss_kb': 100}}}
+    found = {(r['benchmark'], r['metric']) for r in find_regressions(base, cur, threshold=0.10)}
+    assert found == {('parse', 'peak_rss_kb'), ('alphas.alpha_2_breakout', 'ops_per_sec')}
+
+def test_comparator_rate_uses_the_reported_interval(tmp_path):
+    from tools.benchmark import case_comparator
+    res = case_comparator(None, str(tmp_path), n=2000)
+    assert abs(res['ops_per_sec'] * res['seconds'] - res['ops']) < 1e-6 * res['ops']
@@ -0,0 +1,41 @@
+import json, os, subprocess, sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+REPORTING = ('quantstats', 'matplotlib', 'pandas')
+HEAVY = REPORTING + ('alphas.alpha_mtf',)
+
+def _import_probe(stmt, heavy=HEAVY):
+    code = ("import sys, time, json; sys.path.insert(0, %r); t0 = time.perf_counter(); %s; "
+            "print(json.dumps({'seconds': time.perf_counter() - t0, 'heavy': [m for m in %r if m in sys.modules]}))"
+            % (SRC, stmt, heavy))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_cli_import_is_light_and_fast():
+    res = _import_probe("import runpy; runpy.run_path(%r, run_name='cli')" % os.path.join(SRC, '__main__.py'))
+    assert res['heavy'] == []
+    assert res['seconds'] < 0.5
+
+def test_engine_import_defers_alphas_and_reporting():
+    res = _import_probe("import backtest.engine")
+    assert res['heavy'] == []
+    assert res['seconds'] < 0.5
+
+def test_replay_run_does_not_load_reporting_stack(tmp_path):
+    import yaml
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['storage'].update(base_path=str(tmp_path), registry=None, bar_cache=None)
+    config = tmp_path / 'config.yaml'
+    config.write_text(yaml.safe_dump(cfg))
+    log = tmp_path / 'market.ndjson'
+    with open(log, 'w') as f:
+        for i in range(600):
+            ts = '2025-10-01T00:%02d:%02dZ' % (i // 60, i % 60)
+            for sym in ('SYM_A', 'SYM_B', 'SYM_C', 'SYM_D'):
+                f.write(json.dumps({'msg_type': 'tick', 'symbol': sym, 'ts': ts, 'price': 100.0 + (i % 7) * 0.1, 'size': 1.0}) + '\n')
+    argv = ['cli', 'replay', '--config', str(config), '--market_log', str(log), '--out_dir', str(tmp_path / 'out')]
+    res = _import_probe("import runpy; sys.argv = %r; runpy.run_path(%r, run_name='__main__')" % (argv, os.path.join(SRC, '__main__.py')),
+                        heavy=REPORTING)
+    assert res['heavy'] == []
+    assert (tmp_path / 'out' / 'fill_log.ndjson').stat().st_size > 0
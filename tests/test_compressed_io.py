@@ -0,0 +1,48 @@
+import gzip
+import pytest
+from framework.ndjson import BufferedNDJSONWriter, iter_ndjson, iter_lines, read_block_index, resolve_log_path
+
+EVENTS = [{'msg_type': 'tick', 'symbol': 'SYM_A', 'ts': f"2025-10-01T00:{i // 60:02d}:{i % 60:02d}Z",
+           'price': 100.0 + i * 0.01, 'size': 1.0} for i in range(3000)]
+
+@pytest.mark.parametrize('suffix', ['', '.gz', '.xz', '.bgz'])
+def test_roundtrip_by_extension(tmp_path, suffix):
+    path = str(tmp_path / ('market.ndjson' + suffix))
+    with BufferedNDJSONWriter(path, mode='w', buffer_lines=100) as w:
+        w.write_many(EVENTS)
+    assert list(iter_ndjson(path)) == EVENTS
+    assert resolve_log_path(str(tmp_path / 'market.ndjson')) == path
+
+def test_block_framed_parallel_read_and_seek(tmp_path):
+    from framework import ndjson
+    path = str(tmp_path / 'market.ndjson.bgz')
+    w = ndjson.BlockFramedWriter(path, block_size=4096)
+    for ev in EVENTS:
+        w.write(ndjson.json.dumps(ev) + '\n')
+    w.close()
+    index = read_block_index(path)
+    assert len(index) > 10 and sum(e['lines'] for e in index) == len(EVENTS)
+    # plain gzip readers see one stream of concatenated members
+    assert gzip.open(path, 'rt').read().count('\n') == len(EVENTS)
+    assert list(iter_ndjson(path, workers=4)) == EVENTS
+    seek_ts = EVENTS[2000]['ts']
+    tail = list(iter_ndjson(path, start_ts=seek_ts))
+    assert tail[0]['ts'] <= seek_ts and tail[-1] == EVENTS[-1] and len(tail) < len(EVENTS)
+
+def test_block_seek_compares_timestamps_not_text():
+    from framework.ndjson import block_for_ts
+    index = [{'first_ts': '2025-10-01T00:00:01Z'}, {'first_ts': '2025-10-01T00:00:01.500000Z'},
+             {'first_ts': '2025-10-01T00:00:02Z'}]
+    assert block_for_ts(index, '2025-10-01T00:00:01.700000Z') == 1
+    assert block_for_ts(index, '2025-10-01T00:00:01.200000Z') == 0
+
+def test_replay_start_ts_skips_earlier_events(tmp_path):
+    from framework import ndjson
+    from framework.replay import ReplayEngine
+    path = str(tmp_path / 'market.ndjson.bgz')
+    w = ndjson.BlockFramedWriter(path, block_size=4096)
+    for ev in EVENTS:
+        w.write(ndjson.json.dumps(ev) + '\n')
+    w.close()
+    got = list(ReplayEngine(path, start_ts=EVENTS[2000]['ts']).stream_events())
+    assert [e['ts'] for e in got] == [e['ts'] for e in EVENTS[2000:]]
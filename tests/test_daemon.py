@@ -0,0 +1,68 @@
+import json, threading, yaml
+from backtest.daemon import PackedEvents, ReplayDaemon, submit
+from backtest.engine import BacktestEngine
+from framework.ndjson import iter_ndjson
+from framework.replay import ReplayEngine
+from framework.run_registry import RunRegistry
+
+def test_packed_events_round_trip(market_log):
+    packed = PackedEvents(market_log)
+    dumps = [json.dumps(ev) for ev in packed.stream_events()]
+    assert dumps == [json.dumps(ev) for ev in iter_ndjson(market_log)]
+    assert '"size": 17' in ''.join(dumps)  # integer L2 sizes stay integers
+    assert packed.symbols == ['SYM_A', 'SYM_B', 'SYM_C', 'SYM_D', 'SYM_E']
+    assert packed.n_raw == 0
+    assert packed.events.dtype.hasobject is False and packed.levels.dtype.hasobject is False
+
+def test_packed_events_keep_unusual_events_verbatim(tmp_path):
+    events = [{'msg_type': 'tick', 'symbol': 'X', 'ts': '2025-10-01T00:00:00Z', 'price': 100, 'size': 2.5},
+              {'msg_type': 'tick', 'symbol': 'X', 'ts': '2025-10-01T00:00:01Z', 'price': 100.5, 'size': 1, 'venue': 'a'},
+              {'msg_type': 'heartbeat', 'ts': '2025-10-01T00:00:01Z'},
+              {'symbol': 'X', 'ts': '2025-10-01T00:00:02Z', 'price': 101.0, 'size': 1.0},
+              {'msg_type': 'l2_update', 'symbol': 'X', 'ts': '2025-10-01T00:00:02Z',
+               'bids': [{'price': 100.9, 'size': 3}], 'asks': [{'price': 101, 'size': 4.0}]}]
+    path = tmp_path / 'odd.ndjson'
+    path.write_text(''.join(json.dumps(ev) + '\n' for ev in events))
+    packed = PackedEvents(str(path))
+    assert [json.dumps(ev) for ev in packed.stream_events()] == [json.dumps(ev) for ev in events]
+    assert packed.n_raw == 3
+
+def test_daemon_replays_hot_data_and_sweeps(tmp_path, market_log):
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['bars']['timeframes'] = ['1min', '5min']
+    cfg['storage'].update(bar_cache={'path': str(tmp_path / 'cache')}, registry=str(tmp_path / 'runs.sqlite'))
+    log = market_log
+    direct = BacktestEngine(cfg)
+    direct.run_replay(ReplayEngine(log, seed=cfg.get('seed', 0)), str(tmp_path / 'direct'))
+
+    d = ReplayDaemon(cfg, [log], port=0, workers=2).start()
+    t = threading.Thread(target=d.serve_forever, daemon=True)
+    t.start()
+    try:
+        status = submit('/status', port=d.port)
+        assert status['market_logs'][log]['events'] > 0
+        tick = submit('/replay', {'market_log': log, 'mode': 'tick'}, port=d.port)
+        assert tick['ok'] and tick['metrics']['fills'] == direct.metrics.summary()['fills'] > 0
+        logged = submit('/replay', {'market_log': log, 'mode': 'tick', 'out_dir': str(tmp_path / 'daemon')}, port=d.port)
+        assert logged['ok']
+        with open(tmp_path / 'daemon' / 'market_replayed.ndjson', 'rb') as a, open(direct.market_log_path, 'rb') as b:
+            assert a.read() == b.read()
+        bar = submit('/replay', {'market_log': log, 'mode': 'bar'}, port=d.port)
+        assert bar['ok']
+        trials = [{'alphas.alpha_3_mtf.fast': 5}, {'alphas.alpha_3_mtf.fast': 8}]
+        sweep = submit('/sweep', {'market_log': log, 'mode': 'bar', 'trials': trials}, port=d.port)
+        assert len(sweep) == 2 and all(r['ok'] for r in sweep)
+        assert sweep[0]['metrics'] != sweep[1]['metrics']
+        # every job is in the registry, looked up by the run_id it returned
+        with RunRegistry(str(tmp_path / 'runs.sqlite')) as reg:
+            runs = [reg.get(r['run_id']) for r in (tick, bar, *sweep)]
+        assert [r['params']['mode'] for r in runs] == ['tick', 'bar', 'bar', 'bar']
+        assert runs[0]['metrics']['fills'] == tick['metrics']['fills']
+        missing = submit('/replay', {'market_log': 'nope.ndjson'}, port=d.port)
+        assert not missing['ok'] and 'not loaded' in missing['error']
+        submit('/shutdown', {}, port=d.port)
+        t.join(timeout=10)
+        assert not t.is_alive()
+    finally:
+        d.close()
@@ -0,0 +1,24 @@
+from framework.instrumentation import Instrumentation, Histogram
+
+def test_disabled_instrumentation_is_identity():
+    instr = Instrumentation(enabled=False)
+    fn = lambda x: x + 1
+    assert instr.wrap('stage', fn) is fn
+    instr.incr('events.tick')
+    assert instr.snapshot()['stages'] == {} and instr.snapshot()['counters'] == {}
+
+def test_enabled_instrumentation_records_stage_latency():
+    instr = Instrumentation(enabled=True)
+    fn = instr.wrap('stage', lambda x: x + 1)
+    assert [fn(i) for i in range(10)] == list(range(1, 11))
+    instr.incr('events.tick', 3)
+    snap = instr.snapshot()
+    assert snap['stages']['stage']['count'] == 10
+    assert snap['counters'] == {'events.tick': 3}
+
+def test_histogram_percentiles_are_bucket_bounds():
+    h = Histogram()
+    for ns in [100] * 90 + [10000] * 10:
+        h.observe(ns)
+    assert h.percentile(0.5) == 127
+    assert h.percentile(0.99) == 10000
@@ -0,0 +1,88 @@
+import asyncio
+from live.feeds import CCXTProFeedAdapter, TCPFeedAdapter, normalize_event
+from live.pipeline import IngestionPipeline, L2Buffer
+from simulator.local_exchange import LocalExchange, synthetic_events
+
+def test_l2_buffer_conflates_per_symbol():
+    async def run():
+        buf = L2Buffer(maxsize=10, policy='conflate')
+        for i in range(3):
+            await buf.put({'symbol': 'SYM_E', 'seq': i})
+        await buf.put({'symbol': 'SYM_A', 'seq': 9})
+        return buf.drain(100), buf.conflated
+    out, conflated = asyncio.run(run())
+    assert [e['seq'] for e in out] == [2, 9]
+    assert conflated == 2
+
+def test_normalize_ccxt_style_trade():
+    ev = normalize_event({'type': 'trade', 'symbol': 'X', 'timestamp': 0, 'price': 1, 'amount': 2})
+    assert ev == {'msg_type': 'tick', 'symbol': 'X', 'ts': '1970-01-01T00:00:00Z', 'price': 1.0, 'size': 2.0}
+
+def test_ccxt_watch_failure_is_raised_from_events():
+    class Exchange:
+        async def watch_trades(self, symbol):
+            if symbol == 'BAD/USDT':
+                raise ValueError('bad symbol')
+            await asyncio.sleep(0.01)
+            return [{'timestamp': 0, 'price': 1.0, 'amount': 2.0}]
+        async def close(self):
+            pass
+    class Adapter(CCXTProFeedAdapter):
+        def _make_exchange(self):
+            return Exchange()
+    async def run():
+        adapter = Adapter('fake', ['BTC/USDT', 'BAD/USDT'], with_books=False)
+        try:
+            async for _ in adapter.events():
+                pass
+        except ValueError as e:
+            return str(e)
+    assert asyncio.run(asyncio.wait_for(run(), timeout=5)) == 'bad symbol'
+
+def test_pipeline_against_local_exchange_is_bounded_and_lossless_for_ticks():
+    n_events = 20000
+    received = []
+    async def run():
+        ex = await LocalExchange(lambda: synthetic_events(n_events)).start()
+        pipeline = IngestionPipeline([TCPFeedAdapter(port=ex.port)], received.append,
+                                     tick_queue_size=64, l2_queue_size=4, batch_size=32)
+        stats = await pipeline.run(duration=30)
+        await ex.close()
+        return stats
+    stats = asyncio.run(run())
+    expected_ticks = sum(1 for e in synthetic_events(n_events) if e['msg_type'] == 'tick')
+    assert sum(1 for e in received if e['msg_type'] == 'tick') == expected_ticks
+    assert stats['received'] == n_events
+    assert stats['tick_queue_high_watermark'] <= 64
+
+def test_pipeline_dispatches_ticks_and_l2_in_arrival_order():
+    received = []
+    async def run():
+        ex = await LocalExchange(lambda: synthetic_events(3000)).start()
+        pipeline = IngestionPipeline([TCPFeedAdapter(port=ex.port)], received.append,
+                                     tick_queue_size=16, l2_queue_size=2, l2_policy='block', batch_size=8)
+        await pipeline.run(duration=30)
+        await ex.close()
+    asyncio.run(run())
+    assert received == list(synthetic_events(3000))
+
+def test_live_engine_state_is_bounded(market_log, tmp_path):
+    import json, yaml
+    from backtest.engine import BacktestEngine
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['bars']['history'] = 50
+    cfg['backtest']['trade_history'] = 20
+    be = BacktestEngine(cfg)
+    be._make_writers(str(tmp_path))
+    with open(market_log) as f:
+        for line in f:
+            be.on_event(json.loads(line))
+    be.finish(str(tmp_path))
+    with open(be.fill_log_path) as f:
+        n_fills = sum(1 for _ in f)
+    assert n_fills > 20
+    assert len(be.order_manager.orders) == 20
+    assert len(be.portfolio.trade_log) == 20
+    assert all(len(b) <= 50 for b in be.datahandler.tick_buffers.values())
+    assert all(len(lvl.history) <= 50 for r in be.datahandler.rollups.values() for lvl in r.levels)
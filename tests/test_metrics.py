@@ -0,0 +1,82 @@
+import json, math
+from framework.metrics import OnlineMetrics
+from framework.portfolio import Portfolio
+from framework.timestamps import NS_PER_MIN, parse_iso_ns
+
+T0 = parse_iso_ns('2025-10-01T00:00:00Z')
+
+def test_returns_drawdown_match_batch_computation():
+    m = OnlineMetrics(100.0, sample_interval='1min')
+    equity = [100.0, 102.0, 99.0, 101.0, 98.0, 103.0]
+    for i, e in enumerate(equity):
+        m.on_equity(T0 + i * NS_PER_MIN, e)
+    s = m.summary()
+    # returns are measured from the initial equity; the open last minute counts as a partial period
+    rets = [b / a - 1 for a, b in zip([100.0] + equity[:-1], equity)]
+    mean = sum(rets) / len(rets)
+    std = math.sqrt(sum((r - mean) ** 2 for r in rets) / (len(rets) - 1))
+    assert s['periods'] == 6
+    assert math.isclose(s['mean_return'], mean) and math.isclose(s['volatility'], std)
+    assert math.isclose(s['sharpe'], mean / std * math.sqrt(365 * 24 * 60))
+    assert math.isclose(s['max_drawdown'], 98.0 / 102.0 - 1)
+    assert s['max_drawdown_duration_s'] == 240.0  # 102 at t1, new high at t5
+    assert s['final_equity'] == 103.0
+
+def test_portfolio_feeds_fills_marks_and_attribution(tmp_path):
+    m = OnlineMetrics(1000.0)
+    pf = Portfolio(initial_cash=1000.0, metrics=m)
+    pf.mark('A', 10.0, T0)
+    pf.apply_fill({'symbol': 'A', 'side': 'buy', 'size': 2, 'price': 10.0, 'fee': 0.0,
+                   'ts': '2025-10-01T00:00:00Z'}, 'alpha_x')
+    pf.mark('A', 12.0, T0 + NS_PER_MIN)
+    assert pf.market_value() == 1004.0
+    pf.apply_fill({'symbol': 'A', 'side': 'sell', 'size': 1, 'price': 12.0, 'fee': 0.0,
+                   'ts': '2025-10-01T00:01:00Z'}, 'alpha_x')
+    pf.apply_fill({'symbol': 'A', 'side': 'sell', 'size': 1, 'price': 9.0, 'fee': 0.0,
+                   'ts': '2025-10-01T00:01:00Z'}, 'alpha_y')
+    m.dump(str(tmp_path / 'metrics.json'))
+    s = json.loads((tmp_path / 'metrics.json').read_text())
+    assert s['fills'] == 3 and s['closing_fills'] == 1 and s['hit_rate'] == 1.0
+    assert s['traded_notional'] == 20.0 + 12.0 + 9.0
+    x, y = s['alphas']['alpha_x'], s['alphas']['alpha_y']
+    assert x['realized_pnl'] == 2.0 and x['unrealized_pnl'] == 2.0  # 1 left at cost 10, mark 12
+    assert y['unrealized_pnl'] == -3.0  # short 1 at 9, mark 12
+
+def test_report_equity_curve_is_marked_to_market(tmp_path):
+    import os, yaml
+    from backtest.engine import BacktestEngine
+    from backtest.quantstats_report import equity_series
+    from framework.replay import ReplayEngine
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    log = tmp_path / 'market.ndjson'
+    with open(log, 'w') as f:
+        for i in range(1800):
+            ts = '2025-10-01T%02d:%02d:%02dZ' % (i // 3600, i // 60 % 60, i % 60)
+            for k, sym in enumerate(('SYM_A', 'SYM_B', 'SYM_C', 'SYM_D')):
+                px = 100.0 + k + 2.0 * math.sin(i / (40.0 + 7 * k))
+                f.write(json.dumps({'msg_type': 'tick', 'symbol': sym, 'ts': ts, 'price': round(px, 4), 'size': 1.0}) + '\n')
+    out = tmp_path / 'out'
+    be = BacktestEngine(cfg)
+    be.run_replay(ReplayEngine(str(log)), str(out))
+    curve = equity_series(str(out))
+    assert len(curve) == 30
+    assert curve.iloc[-1] == be.portfolio.market_value()
+    assert curve.iloc[-1] != float(be.portfolio.cash)  # open positions are valued, not just cash
+    # replay dirs without the curve are rebuilt from the market and fill logs
+    os.remove(out / 'equity_curve.ndjson')
+    rebuilt = equity_series(str(out))
+    assert list(rebuilt.index) == list(curve.index)
+    assert max(abs(rebuilt - curve)) < 1e-6
+
+def test_portfolio_trade_history_is_opt_in_and_capped():
+    fills = [{'symbol': 'A', 'side': 'buy' if i % 2 else 'sell', 'size': 1, 'price': 10.0 + i, 'fee': 0.0,
+              'ts': f'2025-10-01T00:00:{i:02d}Z'} for i in range(10)]
+    off, capped = Portfolio(initial_cash=1000.0), Portfolio(initial_cash=1000.0, history=3)
+    for f in fills:
+        off.apply_fill(f)
+        capped.apply_fill(f)
+    assert not off.trade_log and off.get_equity_series() == []
+    assert list(capped.trade_log) == fills[-3:]
+    assert capped.get_equity_series()[-1] == (fills[-1]['ts'], float(capped.cash))
+    assert off.positions == capped.positions and off.cash == capped.cash
@@ -0,0 +1,79 @@
+import numpy as np
+import yaml
+from alphas.pair_screener import PairScreener
+from alphas.alpha_pairs import MultiPairAlpha
+from backtest.engine import BacktestEngine
+from framework.bar_cache import build_bars
+
+def _prices(n_sym=20, n_bars=600, seed=7):
+    rng = np.random.default_rng(seed)
+    logp = np.cumsum(rng.normal(0, 0.001, (n_bars, n_sym)), axis=0) + np.log(100.0)
+    # symbol 3 = symbol 11 + a mean-reverting AR(1) spread (phi 0.8)
+    spread = np.zeros(n_bars)
+    for t in range(1, n_bars):
+        spread[t] = 0.8 * spread[t - 1] + rng.normal(0, 0.0005)
+    logp[:, 3] = logp[:, 11] + spread
+    return np.exp(logp)
+
+def test_incremental_moments_match_batch():
+    px = _prices()
+    sc = PairScreener([f"S{i}" for i in range(px.shape[1])], window=100, refresh_every=0)
+    for row in px[:357]:
+        sc.update(row)
+    x = np.log(px[357 - 101:357]) - np.log(px[0])
+    cur, prev = x[1:], x[:-1]
+    assert np.allclose(sc.q_cur, cur.T @ cur) and np.allclose(sc.q_prev, prev.T @ prev)
+    assert np.allclose(sc.lag, cur.T @ prev) and np.allclose(sc.s_cur, cur.sum(axis=0))
+
+def test_mean_reverting_pair_ranks_first_and_feeds_multi_pair_alpha():
+    px = _prices()
+    book = MultiPairAlpha(lookback=30)
+    sc = PairScreener([f"S{i}" for i in range(px.shape[1])], window=240, top_k=3, refresh_every=60,
+                      min_corr=0.5, on_refresh=book.set_pairs)
+    for row in px[:300]:
+        sc.update(row)
+    best = sc.pairs[0]
+    assert best['pair'] == ('S3', 'S11')
+    assert 0.6 < best['phi'] < 0.9 and 1 < best['half_life'] < 6
+    kept = book.alphas[('S3', 'S11')]
+    for row in px[300:360]:
+        sc.update(row)
+    assert book.alphas[('S3', 'S11')] is kept  # still selected: price history is preserved
+    assert ('S3', 'S11') in book.pairs_for('S11') and len(book.alphas) == 3
+    # ...and the hedge ratio follows the latest ranking
+    assert kept.hedge_ratio == next(p['hedge_ratio'] for p in sc.pairs if p['pair'] == ('S3', 'S11'))
+
+def test_late_bars_are_counted_not_placed():
+    sc = PairScreener(['A', 'B'], window=10, refresh_every=0)
+    bar = lambda ts, px: {'ts_ns': ts, 'close': px}
+    sc.on_bar('A', '1min', bar(60, 1.0)); sc.on_bar('B', '1min', bar(60, 1.0))
+    sc.on_bar('A', '1min', bar(120, 1.1))   # commits the 60 row
+    sc.on_bar('B', '1min', bar(60, 2.0))    # that row is already committed
+    sc.on_bar('B', '1min', bar(120, 1.2)); sc.on_bar('A', '1min', bar(180, 1.3))
+    sc.on_bar('B', '1min', bar(120, 9.9))   # older than the 180 row being collected
+    assert sc.late_bars == 2 and sc.count == 2 and list(sc._last) == [1.1, 1.2]
+
+def test_pair_legs_are_sized_by_hedge_ratio():
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    be = BacktestEngine(cfg)
+    be._make_writers(None)
+    be.last_close.update(SYM_A=100.0, SYM_B=50.0)
+    sig = {'alpha': 'alpha_1_pairs', 'signal': 'long_a_short_b', 'size': 3, 'hedge_ratio': 2.0,
+           'symbols': ('SYM_A', 'SYM_B'), 'ts': '2025-10-01T00:01:00Z'}
+    be._process_signal(sig, {})
+    assert be.portfolio.positions == {'SYM_A': 3, 'SYM_B': -6}
+    be._process_signal(dict(sig, hedge_ratio=-0.5), {})  # negative ratio: both legs on the same side
+    assert be.portfolio.positions == {'SYM_A': 6, 'SYM_B': -4}
+
+def test_engine_trades_screened_pairs_in_bar_mode(market_log):
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['alphas']['alpha_1_pairs']['lookback'] = 10
+    cfg['alphas']['alpha_1_pairs']['z_enter'] = 1.0
+    cfg['alphas']['alpha_1_pairs']['screener'].update(enabled=True, window=30, refresh_every=10, min_corr=0.0)
+    bars = build_bars(market_log, ['1min', '5min'])
+    be = BacktestEngine(cfg)
+    be.run_bars(bars, None)
+    assert be.pairs_book.alphas
+    assert be.metrics.summary()['alphas']['alpha_1_pairs']['fills'] > 0
@@ -0,0 +1,97 @@
+import json, os, yaml
+from framework import run_registry
+from framework.run_registry import RunRegistry, config_hash, input_key
+
+def test_register_dedup_and_top(tmp_path):
+    log = tmp_path / 'm.ndjson'
+    log.write_text('{"a": 1}\n')
+    with RunRegistry(str(tmp_path / 'runs.sqlite')) as reg:
+        fp = reg.fingerprint(str(log))
+        assert reg.fingerprint(str(log)) == fp  # served from the (path, size, mtime) cache
+        for sharpe, seed in [(1.5, 1), (0.2, 2), (2.5, 3), (2.0, 3)]:
+            key = input_key('replay', config_hash({'seed': seed}), seed, fp)
+            reg.register('replay', key, out_dir=str(tmp_path), seed=seed, market_fp=fp,
+                         metrics={'sharpe': sharpe, 'alphas': {'a1': {'pnl': sharpe}}}, artifacts={'log': str(log)})
+        # seed 3 registered twice: the second run replaced the first
+        assert len(reg.list_runs()) == 3
+        top = reg.top('sharpe', n=2)
+        assert [r['sharpe'] for r in top] == [2.0, 1.5]
+        run = reg.find(input_key('replay', config_hash({'seed': 3}), 3, fp))
+        assert run['metrics'] == {'sharpe': 2.0, 'alphas.a1.pnl': 2.0}
+        os.remove(log)
+        assert reg.find(input_key('replay', config_hash({'seed': 3}), 3, fp)) is None  # artifacts gone
+
+def test_input_key_covers_source_code(tmp_path, monkeypatch):
+    (tmp_path / 'mod.py').write_text('X = 1\n')
+    monkeypatch.setattr(run_registry, '_SRC_ROOT', str(tmp_path))
+    try:
+        run_registry.code_version.cache_clear()
+        before = input_key('replay', 'cfg', 0, 'fp')
+        (tmp_path / 'mod.py').write_text('X = 2\n')
+        run_registry.code_version.cache_clear()
+        assert input_key('replay', 'cfg', 0, 'fp') != before
+    finally:
+        monkeypatch.undo()
+        run_registry.code_version.cache_clear()
+
+def _cli(tmp_path, **storage):
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('cli', os.path.join('src', '__main__.py'))
+    cli = importlib.util.module_from_spec(spec); spec.loader.exec_module(cli)
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['storage'].update({'registry': str(tmp_path / 'runs.sqlite'), 'bar_cache': None, **storage})
+    cfg_path = tmp_path / 'cfg.yaml'
+    cfg_path.write_text(yaml.safe_dump(cfg))
+    return cli, str(cfg_path)
+
+def test_cli_replay_is_served_from_registry_only_when_asked(tmp_path, market_log):
+    cli, cfg_path = _cli(tmp_path)
+    first, second, third = tmp_path / 'r1', tmp_path / 'r2', tmp_path / 'r3'
+    cli.main(['replay', '--config', cfg_path, '--market_log', market_log, '--out_dir', str(first)])
+    mtime = os.path.getmtime(first / 'fill_log.ndjson')
+    cli.main(['replay', '--config', cfg_path, '--market_log', market_log, '--out_dir', str(second), '--cached'])
+    with RunRegistry(str(tmp_path / 'runs.sqlite')) as reg:
+        runs = reg.list_runs(kind='replay')
+    assert len(runs) == 1 and runs[0]['out_dir'] == str(first)
+    assert os.path.getmtime(first / 'fill_log.ndjson') == mtime
+    assert (second / 'fill_log.ndjson').read_text() == (first / 'fill_log.ndjson').read_text()
+    assert json.loads((second / 'metrics.json').read_text()) == json.loads((first / 'metrics.json').read_text())
+    # without --cached the replay is recomputed and re-registered under the same key
+    cli.main(['replay', '--config', cfg_path, '--market_log', market_log, '--out_dir', str(third)])
+    with RunRegistry(str(tmp_path / 'runs.sqlite')) as reg:
+        assert [r['out_dir'] for r in reg.list_runs(kind='replay')] == [str(third)]
+
+def test_cli_cache_distinguishes_compression(tmp_path, market_log):
+    cli, cfg_path = _cli(tmp_path)
+    cli.main(['replay', '--config', cfg_path, '--market_log', market_log, '--out_dir', str(tmp_path / 'plain')])
+    cli, gz_cfg = _cli(tmp_path, compression='gz')
+    cli.main(['replay', '--config', gz_cfg, '--market_log', market_log, '--out_dir', str(tmp_path / 'gz'), '--cached'])
+    assert (tmp_path / 'gz' / 'fill_log.ndjson.gz').exists()
+    assert not (tmp_path / 'gz' / 'fill_log.ndjson').exists()
+
+def test_cli_runs_without_registry_exits_cleanly(tmp_path):
+    import pytest
+    cli, cfg_path = _cli(tmp_path, registry=None)
+    with pytest.raises(SystemExit, match='storage.registry'):
+        cli.main(['runs', 'list', '--config', cfg_path])
+
+def test_compare_registers_into_config_registry_or_none(tmp_path):
+    from tools.compare_runs import compare, open_compare_registry
+    (tmp_path / 'replay').mkdir()
+    fill = json.dumps({'alpha': 'a', 'side': 'buy', 'price': 1.0, 'size': 1.0}) + '\n'
+    (tmp_path / 'sandbox_fill.ndjson').write_text(fill)
+    (tmp_path / 'replay' / 'fill_log.ndjson').write_text(fill)
+    out = tmp_path / 'out' / 'results.json'
+    out.parent.mkdir()
+    _, cfg_path = _cli(tmp_path)
+    registry = open_compare_registry(cfg_path)
+    try:
+        compare(str(tmp_path / 'sandbox'), str(tmp_path / 'replay'), str(out), registry=registry)
+        assert [r['kind'] for r in registry.list_runs()] == ['compare']
+    finally:
+        registry.close()
+    _, off_path = _cli(tmp_path, registry=None)
+    assert open_compare_registry(off_path) is None
+    compare(str(tmp_path / 'sandbox'), str(tmp_path / 'replay'), str(out), registry=None)
+    assert not (out.parent / 'runs.sqlite').exists()
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from framework.clock import Clock
+from framework.timestamps import format_bar_ts, format_iso_ns, parse_iso_ns, to_ns
+
+SAMPLES = ['2025-10-01T00:00:00Z', '2025-10-01T23:59:59.999999Z', '2025-10-01T12:30:05.250000Z',
+           '2025-10-01T12:30:05.25Z', '2025-10-01T14:30:05+02:00', '2024-02-29T00:00:01.000001+00:00']
+
+def test_parse_matches_stdlib():
+    for s in SAMPLES:
+        dt = datetime.fromisoformat(s.replace('Z', '+00:00'))
+        assert parse_iso_ns(s) == to_ns(dt)
+    assert parse_iso_ns('2025-10-01T00:00:00.123456789Z') % 1_000_000_000 == 123456789
+
+def test_format_is_byte_identical_to_isoformat():
+    for s in SAMPLES:
+        dt = datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone(timezone.utc)
+        ns = parse_iso_ns(s)
+        assert format_iso_ns(ns) == dt.isoformat().replace('+00:00', 'Z')
+        assert format_bar_ts(ns) == dt.isoformat()
+
+def test_clock_holds_integer_ns():
+    c = Clock()
+    c.set('2025-10-01T00:00:01.500000Z')
+    assert c.now_ns == parse_iso_ns('2025-10-01T00:00:01.5Z')
+    c.advance_to(c.now_ns + 500_000_000)
+    assert c.iso() == '2025-10-01T00:00:02Z'
+    assert c.now == datetime(2025, 10, 1, 0, 0, 2, tzinfo=timezone.utc)
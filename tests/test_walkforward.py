@@ -0,0 +1,44 @@
+import yaml
+from backtest.walkforward import make_folds, slice_bars, walk_forward
+from framework.bar_cache import build_bars
+from framework.timestamps import NS_PER_MIN
+
+def test_make_folds_roll_by_test_window():
+    H = 60 * NS_PER_MIN
+    assert make_folds(0, 10 * H, '4H', '2H') == [(0, 4 * H, 6 * H), (2 * H, 6 * H, 8 * H), (4 * H, 8 * H, 10 * H)]
+
+def test_slice_bars_keeps_higher_timeframe_bar_closing_inside(market_log):
+    bars = build_bars(market_log, ['1min', '5min'])
+    s = slice_bars(bars, 7 * NS_PER_MIN + int(bars['SYM_A']['1min']['ts_ns'][0]), 10**20)
+    first_1m, first_5m = int(s['SYM_A']['1min']['ts_ns'][0]), int(s['SYM_A']['5min']['ts_ns'][0])
+    assert first_5m < first_1m < first_5m + 5 * NS_PER_MIN
+
+def _cfg(tmp_path):
+    with open('configs/config.yaml') as f:
+        cfg = yaml.safe_load(f)
+    cfg['bars']['timeframes'] = ['1min', '5min']
+    cfg['storage']['bar_cache'] = {'path': str(tmp_path / 'cache')}
+    cfg['walkforward'].update(train='20min', test='10min', n_trials=3)
+    return cfg
+
+def test_walk_forward_folds_in_parallel(tmp_path, market_log):
+    cfg, log = _cfg(tmp_path), market_log
+    serial = walk_forward(cfg, log, workers=1)
+    parallel = walk_forward(cfg, log, out_dir=str(tmp_path / 'wf'), workers=2)
+    assert len(parallel['folds']) == 4  # 60min log: train 20min + test 10min, stepping 10min
+    strip = lambda r: [(f['best_params'], f['test_metrics']['fills']) for f in r['folds']]
+    assert strip(serial) == strip(parallel)
+    assert all(f['test_metrics']['fills'] > 0 for f in parallel['folds'])
+    assert (tmp_path / 'wf' / 'walkforward.json').exists()
+
+def test_fold_workers_open_the_parent_cache_entry_by_key(tmp_path, market_log):
+    from backtest.walkforward import run_fold
+    from framework.bar_cache import bars_key, load_bars
+    cfg = _cfg(tmp_path)
+    key = bars_key(cfg, market_log)
+    bars = load_bars(cfg, market_log, key=key)
+    start = int(bars['SYM_A']['1min']['ts_ns'][0])
+    job = {'cfg': cfg, 'cache_key': key, 'index': 0, 'n_trials': 1,
+           'fold': (start, start + 20 * NS_PER_MIN, start + 30 * NS_PER_MIN),
+           'market_log': str(tmp_path / 'missing.ndjson')}  # never read or hashed: the key is enough
+    assert run_fold(job)['trials'] == 1